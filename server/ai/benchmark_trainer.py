@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+"""
+Trainer Benchmark Harness
+Per-stage wall time, CPU time, peak RSS and artifact size on synthetic datasets
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import platform
+import argparse
+import tempfile
+import threading
+import multiprocessing
+import resource
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+
+from joblib.externals.loky import get_reusable_executor
+
+import memory_efficient_trainer as trainer
+from similarity_index import similarity_index_files
+from embedding_index import embedding_index_files
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+STAGES = ['load', 'tfidf', 'encode', 'salary', 'salary_table', 'clusters', 'similarity', 'dump', 'load_model']
+
+# Vocabulary for the synthetic generator (same columns as job_recommendation_dataset.csv)
+TITLES = ['Software Engineer', 'Data Scientist', 'Machine Learning Engineer', 'Frontend Developer',
+          'Backend Developer', 'DevOps Engineer', 'Product Manager', 'Data Analyst', 'QA Engineer',
+          'Mobile Developer', 'Cloud Architect', 'Security Analyst', 'UX Designer', 'Business Analyst']
+SENIORITY = ['', 'Junior ', 'Senior ', 'Lead ', 'Principal ']
+SKILLS = ['Python', 'Java', 'JavaScript', 'TypeScript', 'React', 'Node.js', 'SQL', 'AWS', 'Docker',
+          'Kubernetes', 'Machine Learning', 'TensorFlow', 'PyTorch', 'Django', 'Flask', 'Go', 'Rust',
+          'Excel', 'Tableau', 'Power BI', 'Spark', 'Hadoop', 'Linux', 'Git', 'CI/CD', 'Figma',
+          'Communication', 'Agile', 'Scrum', 'C++', 'C#', '.NET', 'Azure', 'GCP', 'MongoDB', 'PostgreSQL']
+INDUSTRIES = ['Software', 'Finance', 'Healthcare', 'Education', 'Retail', 'Manufacturing',
+              'Telecommunications', 'Energy', 'Media', 'Consulting']
+LOCATIONS = ['San Francisco', 'New York', 'Austin', 'Seattle', 'Remote', 'Boston', 'Chicago',
+             'Los Angeles', 'Denver', 'Atlanta', 'London', 'Berlin', 'Toronto', 'Bangalore', 'Colombo']
+EXPERIENCE_LEVELS = ['Entry Level', 'Mid Level', 'Senior Level', 'Executive']
+
+
+def generate_synthetic_dataset(n_rows, path, seed=42, chunk_rows=100000):
+    """
+    Write a deterministic dataset with the job_recommendation_dataset.csv schema
+
+    Rows are generated and written in chunks, so 1M+ rows need little memory.
+    """
+    rng = np.random.default_rng(seed)
+    base_salary = {'Entry Level': 45000, 'Mid Level': 70000, 'Senior Level': 100000, 'Executive': 150000}
+
+    with open(path, 'w', newline='') as f:
+        for start in range(0, n_rows, chunk_rows):
+            n = min(chunk_rows, n_rows - start)
+            experience = rng.choice(EXPERIENCE_LEVELS, n, p=[0.3, 0.35, 0.25, 0.1])
+            n_skills = rng.integers(1, 8, n)
+            skills = [', '.join(rng.choice(SKILLS, k, replace=False)) for k in n_skills]
+            salary = (np.vectorize(base_salary.get)(experience)
+                      + n_skills * 2500 + rng.normal(0, 12000, n)).clip(20000, 400000).astype(int)
+
+            chunk = pd.DataFrame({
+                'Job ID': np.arange(start, start + n),
+                'Job Title': np.char.add(rng.choice(SENIORITY, n), rng.choice(TITLES, n)),
+                'Company': np.char.add('Company ', rng.integers(0, max(n_rows // 50, 10), n).astype(str)),
+                'Location': rng.choice(LOCATIONS, n),
+                'Experience Level': experience,
+                'Salary': salary,
+                'Industry': rng.choice(INDUSTRIES, n),
+                'Required Skills': skills
+            })
+            chunk.to_csv(f, header=(start == 0), index=False)
+
+    return path
+
+
+def _proc_descendants(pid):
+    """Pids of all live descendants of pid, from /proc"""
+    children = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                # The command name may contain spaces; fields resume after its ')'
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    found, pending = [], [pid]
+    while pending:
+        for child in children.get(pending.pop(), []):
+            found.append(child)
+            pending.append(child)
+    return found
+
+
+def _proc_rss(pid):
+    with open(f'/proc/{pid}/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+
+
+class PeakRSSMonitor:
+    """
+    Samples the resident set size of this process and its children on a background thread
+
+    Children (loky/multiprocessing workers) are included, since the
+    parallel stages do most of their work there. Without /proc or psutil
+    there is no way to read the current RSS (ru_maxrss is a lifetime peak,
+    which would charge one stage's peak to every later stage), so
+    current_rss() returns None and the peak is not reported.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @staticmethod
+    def current_rss():
+        """Current RSS of the process tree in bytes, or None if it cannot be read"""
+        pid = os.getpid()
+        try:
+            total = _proc_rss(pid)
+            for child in _proc_descendants(pid):
+                try:
+                    total += _proc_rss(child)
+                except (OSError, ValueError):
+                    pass  # exited between listing and reading
+            return total
+        except (OSError, ValueError):
+            pass
+        try:
+            import psutil
+        except ImportError:
+            return None
+        process = psutil.Process()
+        total = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                total += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return total
+
+    def _sample(self):
+        rss = self.current_rss()
+        if rss is None:
+            self.peak = None
+        elif self.peak is not None:
+            self.peak = max(self.peak, rss)
+
+    def _run(self):
+        while not self._stop.is_set() and self.peak is not None:
+            self._sample()
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak = 0
+        self._sample()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self._sample()
+
+
+def artifact_size(obj):
+    """Bytes the object takes when dumped with joblib"""
+    with tempfile.NamedTemporaryFile(suffix='.joblib') as f:
+        joblib.dump(obj, f.name)
+        return os.path.getsize(f.name)
+
+
+def model_files_size(model_path):
+    """Bytes of the model pickle and every sidecar save_model() writes next to it"""
+    paths = [model_path, trainer.job_vectors_file(model_path)]
+    paths += similarity_index_files(model_path).values()
+    paths += embedding_index_files(model_path).values()
+    return sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+
+
+def measure(stage, fn, results, rows, artifact=None):
+    """
+    Run one stage and append its measurements to results
+
+    CPU time includes worker processes: the stage's reusable loky workers
+    are shut down before reading RUSAGE_CHILDREN, which only counts
+    children that have exited and been waited for.
+    """
+    gc.collect()
+    rss_before = PeakRSSMonitor.current_rss()
+    children_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    cpu_before = time.process_time()
+
+    with PeakRSSMonitor() as monitor:
+        started = time.perf_counter()
+        output = fn()
+        wall = time.perf_counter() - started
+    get_reusable_executor().shutdown(wait=True)
+
+    children_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+    child_cpu = ((children_after.ru_utime + children_after.ru_stime)
+                 - (children_before.ru_utime + children_before.ru_stime))
+
+    result = {
+        'rows': rows,
+        'stage': stage,
+        'wall_s': round(wall, 4),
+        'cpu_s': round(time.process_time() - cpu_before + child_cpu, 4),
+        'peak_rss_mb': round(monitor.peak / (1024 * 1024), 1) if monitor.peak is not None else None,
+        'rss_delta_mb': (round((monitor.peak - rss_before) / (1024 * 1024), 1)
+                         if monitor.peak is not None and rss_before is not None else None),
+        'artifact_bytes': artifact(output) if artifact else None
+    }
+    results.append(result)
+    peak = f"{result['peak_rss_mb']:9.1f} MB peak" if result['peak_rss_mb'] is not None else "      n/a peak"
+    print(f"  {stage:<12} {result['wall_s']:9.2f}s wall {result['cpu_s']:9.2f}s cpu {peak}")
+    return output
+
+
+def run_size(n_rows, work_dir, stages, n_jobs, salary_backend='forest'):
+    """Run the trainer stages on one synthetic dataset size"""
+    print(f"\n📏 {n_rows:,} rows")
+    csv_path = os.path.join(work_dir, f"synthetic_{n_rows}.csv")
+    model_path = os.path.join(work_dir, f"model_{n_rows}.pkl")
+    if not os.path.exists(csv_path):
+        generate_synthetic_dataset(n_rows, csv_path)
+
+    results = []
+    df = measure('load', lambda: trainer.load_and_preprocess_data(csv_path), results, n_rows,
+                 artifact=lambda _: os.path.getsize(csv_path))
+    tfidf, skills_matrix = measure('tfidf', lambda: trainer.create_tfidf_features(df), results, n_rows,
+                                   artifact=artifact_size)
+    label_encoders = measure('encode', lambda: trainer.encode_categorical_features(df), results, n_rows,
+                             artifact=artifact_size)
+
+    salary_model = None
+    if 'salary' in stages:
+        salary_model = measure('salary', lambda: trainer.train_salary_model(df, backend=salary_backend), results, n_rows,
+                               artifact=artifact_size)
+
+    salary_table = None
+    if 'salary_table' in stages and salary_model is not None:
+        salary_table = measure('salary_table', lambda: trainer.create_salary_table(df, salary_model), results,
+                               n_rows, artifact=lambda table: table.nbytes if table is not None else 0)
+
+    kmeans = svd = scaler = None
+    if 'clusters' in stages:
+        kmeans, svd, scaler = measure('clusters', lambda: trainer.create_job_clusters(df, skills_matrix),
+                                      results, n_rows, artifact=artifact_size)
+
+    similarity_index = {'neighbors': np.zeros((0, 20), np.int32), 'scores': np.zeros((0, 20), np.float16)}
+    if 'similarity' in stages:
+        similarity_index = measure(
+            'similarity', lambda: trainer.create_similarity_index(skills_matrix, batch_size=500, n_jobs=n_jobs),
+            results, n_rows,
+            artifact=lambda index: index['neighbors'].nbytes + index['scores'].nbytes
+        )
+
+    if 'dump' in stages:
+        sketches = trainer.create_salary_sketches(df)
+        model_data = trainer.package_model_data(df, tfidf, label_encoders, salary_model, kmeans, svd, scaler,
+                                                skills_matrix, similarity_index, sketches, salary_table)
+        measure('dump', lambda: trainer.save_model(model_data, model_path), results, n_rows,
+                artifact=lambda _: model_files_size(model_path))
+        del model_data
+
+        if 'load_model' in stages:
+            measure('load_model', lambda: joblib.load(model_path), results, n_rows)
+
+    return results
+
+
+def _run_size_isolated(args):
+    # Fresh interpreter per size so peak RSS is not inflated by earlier sizes
+    n_rows, work_dir, stages, n_jobs, salary_backend = args
+    import io, contextlib
+    with contextlib.redirect_stdout(io.StringIO()) as captured:
+        results = run_size(n_rows, work_dir, stages, n_jobs, salary_backend)
+    lines = [l for l in captured.getvalue().splitlines() if l.startswith(('  ', '\n📏', '📏'))]
+    return results, lines
+
+
+def environment_info():
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'sklearn': sklearn.__version__
+    }
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """
+    Print current vs baseline per (rows, stage) and return the regressions
+
+    A regression is a wall time or peak RSS more than `tolerance` (fraction)
+    above the baseline.
+    """
+    base = {(r['rows'], r['stage']): r for r in baseline['results']}
+    regressions = []
+
+    print("\n📐 Comparison with baseline")
+    for r in report['results']:
+        b = base.get((r['rows'], r['stage']))
+        if b is None:
+            continue
+        for metric in ('wall_s', 'peak_rss_mb'):
+            if not b[metric] or r[metric] is None:
+                continue
+            ratio = r[metric] / b[metric]
+            flag = ''
+            if ratio > 1 + tolerance:
+                flag = '  ⚠ regression'
+                regressions.append({'rows': r['rows'], 'stage': r['stage'], 'metric': metric, 'ratio': ratio})
+            print(f"  {r['rows']:>9,} {r['stage']:<12} {metric:<12} {b[metric]:>10} -> {r[metric]:>10} "
+                  f"({ratio:5.2f}x){flag}")
+
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the memory-efficient trainer stages")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='Dataset sizes (rows)')
+    parser.add_argument('--stages', nargs='+', default=STAGES, choices=STAGES,
+                        help='Optional stages to run (load/tfidf/encode always run)')
+    parser.add_argument('--work-dir', default=None, help='Where synthetic CSVs and models are written')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='Workers for the similarity index')
+    parser.add_argument('--salary-backend', choices=trainer.SALARY_BACKENDS, default='forest',
+                        help='Salary model backend to benchmark')
+    parser.add_argument('--output', default='trainer_benchmark.json', help='Machine-readable report')
+    parser.add_argument('--baseline', help='Report to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Allowed slowdown before flagging')
+    parser.add_argument('--in-process', action='store_true', help='Do not isolate sizes in subprocesses')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("⏱️  Trainer Benchmark")
+    print("=" * 60)
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='trainer_bench_')
+    os.makedirs(work_dir, exist_ok=True)
+
+    report = {'environment': environment_info(), 'salary_backend': args.salary_backend, 'results': []}
+    for n_rows in args.sizes:
+        job = (n_rows, work_dir, set(args.stages), args.n_jobs, args.salary_backend)
+        if args.in_process:
+            results = run_size(*job)
+        else:
+            with multiprocessing.get_context('spawn').Pool(1) as pool:
+                results, lines = pool.apply(_run_size_isolated, (job,))
+            print('\n'.join(lines))
+        report['results'].extend(results)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\n✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Quantized Job Embeddings
+SVD job embeddings stored as int8 (per-row scale) or float16 with a blocked scoring kernel
+"""
+
+import os
+import time
+import numpy as np
+from sklearn.preprocessing import normalize
+
+EMBEDDING_DTYPES = ['int8', 'float16']
+
+# Rows dequantised per block; keeps the float32 working set cache-sized
+SCORE_BLOCK_ROWS = 16384
+
+
+def quantize_embeddings(embeddings, dtype='int8'):
+    """
+    Quantize L2-normalised float embeddings
+
+    int8 stores round(x / scale) with scale = max|x| / 127 per row;
+    float16 is a plain cast.
+
+    Returns:
+        (codes, scales) where scales is None for float16
+    """
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    if dtype == 'float16':
+        return embeddings.astype(np.float16), None
+
+    scales = np.abs(embeddings).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.rint(embeddings / scales[:, None]).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class QuantizedEmbeddingIndex:
+    """Brute-force cosine search over quantized job embeddings
+
+    Blocks of codes are widened to float32 just before the matrix product,
+    so the bulk of the catalog is read from memory at 1 (int8) or 2 (float16)
+    bytes per dimension. An optional float32 copy (usually a memory-mapped
+    sidecar) is only touched for the few candidates that are re-ranked.
+    """
+
+    def __init__(self, codes, scales=None, exact=None):
+        self.codes = codes
+        self.scales = scales
+        self.exact = exact
+
+    @classmethod
+    def from_embeddings(cls, embeddings, dtype='int8', keep_exact=False):
+        embeddings = normalize(np.asarray(embeddings, dtype=np.float32))
+        codes, scales = quantize_embeddings(embeddings, dtype)
+        return cls(codes, scales, embeddings if keep_exact else None)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def dtype(self):
+        return 'int8' if self.scales is not None else 'float16'
+
+    @property
+    def nbytes(self):
+        """Bytes needed to score (codes and scales; the exact copy stays on disk)"""
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def vector(self, position):
+        """float32 embedding of one catalog row (exact copy if kept, else dequantized)"""
+        if self.exact is not None:
+            return np.asarray(self.exact[position], dtype=np.float32)
+        vector = self.codes[position].astype(np.float32)
+        return vector * self.scales[position] if self.scales is not None else vector
+
+    def scores(self, queries, rows=None):
+        """
+        Approximate cosine scores of queries against the catalog
+
+        Args:
+            queries: (q, dim) or (dim,) float array (normalised here)
+            rows: optional positions to score instead of the whole catalog
+
+        Returns:
+            (q, n) float32 score matrix
+        """
+        queries = normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32))).T
+        codes = self.codes if rows is None else self.codes[rows]
+        scales = self.scales if rows is None or self.scales is None else self.scales[rows]
+
+        out = np.empty((queries.shape[1], len(codes)), dtype=np.float32)
+        for start in range(0, len(codes), SCORE_BLOCK_ROWS):
+            end = min(start + SCORE_BLOCK_ROWS, len(codes))
+            block = codes[start:end].astype(np.float32) @ queries
+            if scales is not None:
+                block *= scales[start:end, None]
+            out[:, start:end] = block.T
+        return out
+
+    def search(self, queries, top_k=10, rerank=0, exclude=None, rows=None):
+        """
+        Top-k catalog positions for each query
+
+        Args:
+            queries: (q, dim) or (dim,) float query embeddings
+            top_k: results per query
+            rerank: if > top_k and an exact copy is available, re-score this
+                many quantized candidates with float32 vectors
+            exclude: per-query position to skip (e.g. the query job itself)
+            rows: optional catalog positions to search instead of the whole catalog
+
+        Returns:
+            (indices, scores) arrays of shape (q, top_k); indices are catalog positions
+        """
+        queries = normalize(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        scores = self.scores(queries, rows)
+        if exclude is not None:
+            if rows is None:
+                scores[np.arange(len(queries)), exclude] = -np.inf
+            else:
+                scores[np.asarray(rows)[None, :] == np.reshape(exclude, (-1, 1))] = -np.inf
+
+        n_candidates = rerank if rerank > top_k and self.exact is not None else top_k
+        n_candidates = min(n_candidates, scores.shape[1])
+        top_k = min(top_k, n_candidates)
+        candidates = np.argpartition(-scores, n_candidates - 1, axis=1)[:, :n_candidates]
+        if rows is not None:
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+            candidates = np.asarray(rows)[candidates]
+
+        if n_candidates > top_k:
+            exact = np.asarray(self.exact[candidates.ravel()], dtype=np.float32).reshape(*candidates.shape, -1)
+            candidate_scores = np.einsum('qcd,qd->qc', exact, queries)
+            if exclude is not None:
+                candidate_scores[candidates == np.asarray(exclude)[:, None]] = -np.inf
+        elif rows is None:
+            candidate_scores = np.take_along_axis(scores, candidates, axis=1)
+
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')[:, :top_k]
+        return np.take_along_axis(candidates, order, axis=1), np.take_along_axis(candidate_scores, order, axis=1)
+
+
+def embedding_index_files(model_path):
+    """Sidecar .npy paths stored next to the model pickle"""
+    stem = os.path.splitext(model_path)[0]
+    return {
+        'codes': f"{stem}_embedding_codes.npy",
+        'scales': f"{stem}_embedding_scales.npy",
+        'exact': f"{stem}_embedding_exact.npy"
+    }
+
+
+def save_embedding_index(index, model_path):
+    """
+    Write the index arrays as .npy sidecars of the model (atomic replace)
+
+    Returns:
+        Small dict to store in the pickle in place of the arrays
+    """
+    files = embedding_index_files(model_path)
+    entry = {'dtype': index.dtype}
+    for key, path in files.items():
+        array = getattr(index, key)
+        if array is None:
+            continue
+        temp_path = f"{path}.tmp.npy"
+        np.save(temp_path, array)
+        os.replace(temp_path, path)
+        entry[f"{key}_file"] = os.path.basename(path)
+    return entry
+
+
+def load_embedding_index(entry, model_path, mmap_mode='r'):
+    """Resolve the 'embedding_index' entry of a loaded model (None if absent)"""
+    if not entry:
+        return None
+
+    model_dir = os.path.dirname(os.path.abspath(model_path))
+
+    def load(key, mode):
+        name = entry.get(f"{key}_file")
+        return np.load(os.path.join(model_dir, name), mmap_mode=mode) if name else None
+
+    # Codes and scales are scanned on every query, so they are read into memory
+    return QuantizedEmbeddingIndex(load('codes', None), load('scales', None), load('exact', mmap_mode))
+
+
+def compare_embedding_precisions(embeddings, n_queries=200, top_k=10, rerank=50, seed=42):
+    """
+    Memory, throughput and recall@k of quantized search against float32
+
+    Queries are catalog rows (excluding themselves); recall is measured
+    against exact float32 brute force.
+
+    Returns:
+        List of per-variant result dicts
+    """
+    embeddings = normalize(np.asarray(embeddings, dtype=np.float32))
+    rng = np.random.default_rng(seed)
+    query_rows = rng.choice(len(embeddings), size=min(n_queries, len(embeddings)), replace=False)
+    queries = embeddings[query_rows]
+
+    def timed_search(index, rerank_k):
+        started = time.perf_counter()
+        indices, _ = index.search(queries, top_k=top_k, rerank=rerank_k, exclude=query_rows)
+        return indices, time.perf_counter() - started
+
+    # float32 reference: same kernel with identity "codes"
+    reference = QuantizedEmbeddingIndex(embeddings, np.ones(len(embeddings), dtype=np.float32))
+    _, seconds = timed_search(reference, 0)
+    results = [{'variant': 'float32', 'bytes': embeddings.nbytes, 'queries_per_s': len(queries) / seconds,
+                'recall_at_k': 1.0}]
+
+    # A result counts as a hit when its exact score reaches the exact k-th best,
+    # so ties among equally similar jobs are not counted as misses
+    exact_scores = queries @ embeddings.T
+    exact_scores[np.arange(len(queries)), query_rows] = -np.inf
+    kth_best = -np.partition(-exact_scores, top_k - 1, axis=1)[:, top_k - 1]
+
+    for dtype in EMBEDDING_DTYPES:
+        index = QuantizedEmbeddingIndex.from_embeddings(embeddings, dtype, keep_exact=True)
+        for rerank_k in (0, rerank):
+            found, seconds = timed_search(index, rerank_k)
+            found_scores = np.take_along_axis(exact_scores, found, axis=1)
+            results.append({
+                'variant': dtype + (f'+rerank{rerank_k}' if rerank_k else ''),
+                'bytes': index.nbytes,
+                'queries_per_s': len(queries) / seconds,
+                'recall_at_k': float((found_scores >= kth_best[:, None] - 1e-6).mean())
+            })
+
+    print(f"  {'variant':<18} {'MB':>8} {'queries/s':>10} {'recall@' + str(top_k):>10}")
+    for r in results:
+        print(f"  {r['variant']:<18} {r['bytes'] / (1024*1024):>8.2f} {r['queries_per_s']:>10.1f} "
+              f"{r['recall_at_k']:>10.3f}")
+
+    return results
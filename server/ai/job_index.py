@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Shared Job Index
+Column arrays, text vectors and category codes with one vectorized score-and-rank path
+"""
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix, vstack
+from sklearn.preprocessing import normalize
+
+
+def top_rows(primary, secondary, top_n):
+    """
+    Positions of the top N rows by (primary, secondary) descending,
+    ties broken by position like DataFrame.nlargest(keep='first')
+    and a stable descending sort
+    """
+    candidates = np.arange(len(primary))
+    if len(primary) > top_n > 0:
+        # Only rows that can reach the top N need the full sort
+        kth = np.partition(primary, -top_n)[-top_n]
+        candidates = np.flatnonzero(primary >= kth)
+    order = np.lexsort((candidates, -secondary[candidates], -primary[candidates]))
+    return candidates[order[:top_n]]
+
+
+class JobIndex:
+    """
+    In-memory job catalog shared by the recommendation front ends
+
+    Holds one array per column, an optional CSR matrix of text vectors
+    (TF-IDF) aligned with the rows, integer codes for categorical columns
+    and an optional binary job x skill matrix. Filters, bonuses and scores
+    are computed over whole arrays, and search() ranks them in one pass.
+    The fitted vectorizer that produced the vectors can be kept with them,
+    so queries are always transformed into the same feature space.
+    """
+
+    def __init__(self, columns, vectors=None, code_columns=(), skill_sets=None, vectorizer=None):
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+        self.vectors = vectors.tocsr() if vectors is not None else None
+        self.vectorizer = vectorizer
+        self._unit_vectors_t = None
+        self.codes = {}
+        self.lookup = {}
+        for col in code_columns:
+            codes, uniques = pd.factorize(self.columns[col])
+            self.codes[col] = codes.astype(np.int32)
+            self.lookup[col] = {value: code for code, value in enumerate(uniques)}
+
+        self.skill_vocabulary = {}
+        self.skills = None
+        if skill_sets is not None:
+            self.skills = self._skill_matrix(skill_sets)
+
+    @classmethod
+    def from_frame(cls, df, columns=None, vectors=None, code_columns=(), skill_sets=None):
+        """Index DataFrame columns (all by default) as arrays, row order kept"""
+        columns = columns or list(df.columns)
+        return cls({col: df[col].to_numpy() for col in columns}, vectors, code_columns, skill_sets)
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def _skill_matrix(self, skill_sets):
+        """Binary CSR of jobs x lower-cased skills, growing the vocabulary as needed"""
+        indptr, indices = [0], []
+        for skills in skill_sets:
+            ids = {self.skill_vocabulary.setdefault(s.strip().lower(), len(self.skill_vocabulary))
+                   for s in skills if s and s.strip()}
+            indices.extend(sorted(ids))
+            indptr.append(len(indices))
+        data = np.ones(len(indices), dtype=np.int32)
+        return csr_matrix((data, indices, indptr), shape=(len(skill_sets), max(len(self.skill_vocabulary), 1)))
+
+    def append(self, columns, vectors=None, skill_sets=None):
+        """Add rows (same columns as the index) without rebuilding it"""
+        n_new = len(next(iter(columns.values())))
+        if n_new == 0:
+            return
+
+        for name in self.columns:
+            self.columns[name] = np.concatenate([self.columns[name], np.asarray(columns[name])])
+
+        for col, lookup in self.lookup.items():
+            new_codes = np.empty(n_new, dtype=np.int32)
+            for i, value in enumerate(columns[col]):
+                new_codes[i] = lookup.setdefault(value, len(lookup))
+            self.codes[col] = np.concatenate([self.codes[col], new_codes])
+
+        if self.vectors is not None and vectors is not None:
+            self.vectors = vstack([self.vectors, vectors]).tocsr()
+            self._unit_vectors_t = None
+
+        if self.skills is not None and skill_sets is not None:
+            new_skills = self._skill_matrix(skill_sets)
+            width = max(self.skills.shape[1], new_skills.shape[1])
+            self.skills.resize(self.skills.shape[0], width)
+            new_skills.resize(new_skills.shape[0], width)
+            self.skills = vstack([self.skills, new_skills]).tocsr()
+
+    def code(self, col, value):
+        """Integer code of a category value (-1 if it never occurs)"""
+        return self.lookup[col].get(value, -1)
+
+    def equals_mask(self, col, value):
+        return self.codes[col] == self.code(col, value)
+
+    def category_weights(self, col, weights):
+        """
+        Per-row weight looked up by category value
+
+        Args:
+            col: coded column
+            weights: {value: weight}; other values get 0
+        """
+        per_code = np.zeros(len(self.lookup[col]) + 1)
+        for value, weight in weights.items():
+            code = self.code(col, value)
+            if code >= 0:
+                per_code[code] = weight
+        return per_code[self.codes[col]]
+
+    def value_mask(self, col, predicate):
+        """Rows whose category value satisfies predicate (evaluated once per distinct value)"""
+        per_code = np.zeros(len(self.lookup[col]) + 1, dtype=bool)
+        for value, code in self.lookup[col].items():
+            per_code[code] = bool(predicate(value))
+        return per_code[self.codes[col]]
+
+    def skill_match_counts(self, skills):
+        """Number of the given skills each job lists (case-insensitive)"""
+        ids = sorted({self.skill_vocabulary[s] for s in (s.strip().lower() for s in skills)
+                      if s in self.skill_vocabulary})
+        if self.skills is None or not ids:
+            return np.zeros(len(self), dtype=np.int64)
+        return np.asarray(self.skills[:, ids].sum(axis=1)).ravel()
+
+    def similarities(self, query_vectors):
+        """
+        Cosine similarity of each query row against every indexed row
+
+        Same arithmetic as sklearn's cosine_similarity, but the normalised,
+        transposed job vectors are computed once and reused, and a block of
+        queries is scored with one sparse matrix product.
+
+        Returns:
+            (n_queries, n_rows) dense array
+        """
+        if self._unit_vectors_t is None:
+            self._unit_vectors_t = normalize(self.vectors).T.tocsr()
+        return (normalize(query_vectors) @ self._unit_vectors_t).toarray()
+
+    def search(self, query_vector=None, mask=None, bonus=None, cap=None, tie_break=None, top_n=10):
+        """
+        Score the (masked) catalog and return the top N
+
+        score = cosine(query_vector, row vector) + bonus, optionally capped,
+        ranked by (score, tie_break) descending with ties in row order.
+        A list of bonus arrays is added one at a time, in order.
+
+        Args:
+            query_vector: 1 x n_features sparse query (None for no text score)
+            mask: boolean row filter
+            bonus: per-row additive score (full length), or a list of them
+            cap: upper bound applied before ranking
+            tie_break: per-row secondary sort key (full length)
+            top_n: results to return
+
+        Returns:
+            (positions, scores) of the selected rows, best first
+        """
+        rows, scores = self.score(query_vector, mask, bonus, cap)
+        return self.rank(rows, scores, tie_break, top_n)
+
+    def score(self, query_vector=None, mask=None, bonus=None, cap=None, similarity=None):
+        """
+        First half of search(): scores of the (masked) rows, unranked
+
+        Args:
+            similarity: precomputed similarities() row to use instead of query_vector
+
+        Returns:
+            (rows, scores) with rows the positions that passed the mask
+        """
+        rows = np.flatnonzero(mask) if mask is not None else np.arange(len(self))
+        if len(rows) == 0:
+            return rows, np.zeros(0)
+
+        if query_vector is not None and similarity is None:
+            similarity = self.similarities(query_vector)[0]
+        if similarity is not None:
+            scores = similarity if mask is None else similarity[rows]
+        else:
+            scores = np.zeros(len(rows))
+
+        for extra in (bonus if isinstance(bonus, (list, tuple)) else [bonus]):
+            if extra is not None:
+                scores = scores + extra[rows]
+        if cap is not None:
+            scores = np.minimum(scores, cap)
+        return rows, scores
+
+    def rank(self, rows, scores, tie_break=None, top_n=10):
+        """Second half of search(): the top N of score() output, best first"""
+        if len(rows) == 0:
+            return rows, scores
+        secondary = tie_break[rows] if tie_break is not None else np.zeros(len(rows))
+        top = top_rows(scores, secondary, top_n)
+        return rows[top], scores[top]
+
+    def take(self, positions, names=None):
+        """{column: values} for the given rows"""
+        names = names or self.columns.keys()
+        return {name: self.columns[name][positions] for name in names}
+
+    def to_state(self):
+        """Plain arrays and lists; coded columns are kept only as codes plus their values"""
+        return {
+            'column_order': list(self.columns),
+            'columns': {name: values for name, values in self.columns.items() if name not in self.codes},
+            'codes': dict(self.codes),
+            # lookup is filled in code order, so its keys list the value of each code
+            'uniques': {col: list(lookup) for col, lookup in self.lookup.items()},
+            'vectors': self.vectors,
+            'skills': self.skills,
+            'skill_vocabulary': list(self.skill_vocabulary)
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        """Rebuild an index from to_state() output (arrays may be memory-mapped)"""
+        index = cls({}, state['vectors'])
+        index.codes = dict(state['codes'])
+        index.lookup = {col: {value: code for code, value in enumerate(uniques)}
+                        for col, uniques in state['uniques'].items()}
+        for name in state['column_order']:
+            if name in index.codes:
+                index.columns[name] = np.array(state['uniques'][name], dtype=object)[index.codes[name]]
+            else:
+                index.columns[name] = state['columns'][name]
+        index.skills = state['skills']
+        index.skill_vocabulary = {skill: i for i, skill in enumerate(state['skill_vocabulary'])}
+        return index
@@ -7,21 +7,228 @@ Works with the memory-optimized model
 import joblib
 import pandas as pd
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
 import warnings
 import random
+from salary_sketch import build_salary_sketches, sketches_from_state, merge_salary_sketches
+from similarity_index import load_similarity_index
+from embedding_index import load_embedding_index
+from salary_predictor import SalaryPredictor
+from job_index import JobIndex
 warnings.filterwarnings('ignore')
 
+# Categorical columns that requests can filter on
+FILTER_COLUMNS = ['Experience Level', 'Industry', 'Location']
+
+# Result fields: output key -> source column in df_sample
+RESULT_COLUMN_SOURCES = {
+    'job_title': 'Job Title',
+    'company': 'Company',
+    'location': 'Location',
+    'experience_level': 'Experience Level',
+    'salary': 'Salary',
+    'industry': 'Industry',
+    'required_skills': 'Required Skills',
+    'cluster': 'cluster'
+}
+RESULT_FIELD_DEFAULTS = {
+    'job_title': '', 'company': '', 'location': '', 'experience_level': '',
+    'salary': 0, 'industry': '', 'required_skills': '',
+    'similarity_score': 0.0, 'cluster': 0, 'trend_score': 0.0
+}
+INT_RESULT_FIELDS = {'salary', 'cluster'}
+FLOAT_RESULT_FIELDS = {'similarity_score', 'trend_score'}
+
+RECOMMENDATION_FIELDS = ['job_title', 'company', 'location', 'experience_level', 'salary',
+                         'industry', 'required_skills', 'similarity_score', 'cluster']
+SIMILAR_JOB_FIELDS = ['job_title', 'company', 'location', 'salary', 'industry', 'similarity_score']
+# Quantized candidates re-scored with float32 embeddings in get_similar_jobs
+SIMILAR_JOB_RERANK = 50
+TRENDING_FIELDS = ['job_title', 'company', 'location', 'salary', 'industry', 'trend_score',
+                   'experience_level']
+# Schema consumed by the Node.js backend (every result type gets every field)
+NODE_RESULT_FIELDS = ['job_title', 'company', 'location', 'experience_level', 'salary', 'industry',
+                      'required_skills', 'similarity_score', 'cluster', 'trend_score']
+
+def build_job_results(jobs, fields, computed=None, layout='records'):
+    """
+    Turn selected job rows into API results, one column at a time
+    
+    Args:
+        jobs: DataFrame or {column: array} with only the selected rows, in result order
+        fields: output keys this result type provides
+        computed: {key: array} of per-row values that are not df columns (scores)
+        layout: 'records' - list of dicts with `fields`
+                'node' - list of dicts in the Node.js schema, with ai_metadata
+                'columnar' - {'layout', 'count', 'fields', 'columns'} with one list
+                             per Node.js field, compact for large top_n
+    
+    Returns:
+        List of dicts, or a dict of columns for the columnar layout
+    """
+    computed = computed or {}
+    populated = set(fields)
+    if layout != 'records':
+        # Fields the result type does not provide keep their Node.js defaults
+        fields = NODE_RESULT_FIELDS
+    
+    n_rows = len(jobs) if isinstance(jobs, pd.DataFrame) else len(next(iter(jobs.values()), ()))
+    columns = []
+    for key in fields:
+        source = RESULT_COLUMN_SOURCES.get(key)
+        if key in populated and key in computed:
+            values = np.asarray(computed[key])
+        elif key in populated and source in jobs:
+            values = np.asarray(jobs[source])
+        else:
+            columns.append([RESULT_FIELD_DEFAULTS[key]] * n_rows)
+            continue
+        
+        # tolist() yields plain Python ints/floats/strs, ready for json.dumps
+        if key in INT_RESULT_FIELDS:
+            values = values.astype(np.int64)
+        elif key in FLOAT_RESULT_FIELDS:
+            values = values.astype(np.float64)
+        columns.append(values.tolist())
+    
+    if layout == 'columnar':
+        return {
+            'layout': 'columnar',
+            'count': n_rows,
+            'fields': list(fields),
+            'columns': dict(zip(fields, columns)),
+            'ai_metadata': {'source': 'ai_model', 'confidence': 'similarity_score', 'cluster_id': 'cluster'}
+        }
+    
+    rows = [dict(zip(fields, values)) for values in zip(*columns)]
+    
+    if layout == 'node':
+        for row in rows:
+            row['ai_metadata'] = {
+                'source': 'ai_model',
+                'confidence': row['similarity_score'],
+                'cluster_id': row['cluster']
+            }
+    
+    return rows
+
+class TrendingRanking:
+    """
+    Materialized trending order for the sample jobs
+    
+    trend_score = 0.7 * normalized salary + 0.3 * normalized industry popularity.
+    Within an industry the popularity term is constant, so jobs are kept
+    pre-sorted by salary per industry. The global top N is always among the
+    top N of each industry, which makes a query O(industries * top_n) and
+    lets new or removed jobs update the order without a full recompute.
+    The normalisation bounds come from each industry's first and last job
+    and its size, refreshed in O(industries) whenever jobs change.
+    
+    A zero salary or popularity range (e.g. a single industry) normalises to
+    0 instead of dividing by zero; the old pandas version returned no jobs then.
+    """
+    
+    SALARY_WEIGHT = 0.7
+    POPULARITY_WEIGHT = 0.3
+    
+    def __init__(self, salaries, industries):
+        self.salaries = np.asarray(salaries, dtype=np.float64)
+        self.industries = np.asarray(industries, dtype=object)
+        self.by_industry = {}
+        
+        positions = np.arange(len(self.salaries))
+        for industry in pd.unique(self.industries):
+            members = positions[self.industries == industry]
+            # Highest salary first; stable so ties keep sample order
+            order = np.argsort(-self.salaries[members], kind='stable')
+            self.by_industry[industry] = members[order]
+        self._refresh_normalizers()
+    
+    def add(self, salaries, industries):
+        """Append jobs (at the next positions) and slot them into the order"""
+        salaries = np.asarray(salaries, dtype=np.float64)
+        industries = np.asarray(industries, dtype=object)
+        start = len(self.salaries)
+        
+        self.salaries = np.concatenate([self.salaries, salaries])
+        self.industries = np.concatenate([self.industries, industries])
+        
+        for offset, (salary, industry) in enumerate(zip(salaries, industries)):
+            members = self.by_industry.get(industry, np.empty(0, dtype=np.int64))
+            # side='right' places the new job after existing jobs with equal salary
+            insert_at = np.searchsorted(-self.salaries[members], -salary, side='right')
+            self.by_industry[industry] = np.insert(members, insert_at, start + offset)
+        self._refresh_normalizers()
+    
+    def remove(self, positions):
+        """Drop jobs from the ranking (positions stay reserved)"""
+        positions = np.asarray(positions)
+        for industry, members in list(self.by_industry.items()):
+            members = members[~np.isin(members, positions)]
+            if len(members):
+                self.by_industry[industry] = members
+            else:
+                del self.by_industry[industry]
+        self._refresh_normalizers()
+    
+    def _refresh_normalizers(self):
+        """Salary and industry size bounds of the live jobs (lists are sorted by salary)"""
+        if not self.by_industry:
+            self._normalizers = None
+            return
+        highest = self.salaries[[members[0] for members in self.by_industry.values()]]
+        lowest = self.salaries[[members[-1] for members in self.by_industry.values()]]
+        counts = np.array([len(m) for m in self.by_industry.values()], dtype=np.float64)
+        
+        salary_min, salary_range = lowest.min(), highest.max() - lowest.min()
+        count_min, count_range = counts.min(), np.ptp(counts)
+        self._normalizers = (salary_min, salary_range or 1.0, count_min, count_range or 1.0)
+    
+    def top(self, top_n):
+        """
+        Returns:
+            (positions, trend_scores) of the top N jobs, best first
+        """
+        if not self.by_industry:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        
+        salary_min, salary_range, count_min, count_range = self._normalizers
+        
+        candidates, scores = [], []
+        for members in self.by_industry.values():
+            head = members[:top_n]
+            popularity = (len(members) - count_min) / count_range
+            salary_norm = (self.salaries[head] - salary_min) / salary_range
+            candidates.append(head)
+            scores.append(salary_norm * self.SALARY_WEIGHT + popularity * self.POPULARITY_WEIGHT)
+        
+        candidates = np.concatenate(candidates)
+        scores = np.concatenate(scores)
+        order = np.lexsort((candidates, -scores))[:top_n]
+        return candidates[order], scores[order]
+
+
 class JobRecommendationAPI:
     def __init__(self, model_path='job_recommendation_model.pkl'):
         """Initialize the recommendation API with a trained model"""
         self.model_data = None
+        self.salary_sketches = {}
+        self.salary_predictor = None
+        self._insights_cache = {}
+        self.trending = None
+        self.similarity_index = None
+        self.embedding_index = None
         self.load_model(model_path)
     
     def load_model(self, model_path):
         """Load the trained model"""
         try:
             self.model_data = joblib.load(model_path)
+            self.similarity_index = load_similarity_index(self.model_data.get('similarity_index'), model_path)
+            self.embedding_index = load_embedding_index(self.model_data.get('embedding_index'), model_path)
+            self.salary_sketches = sketches_from_state(self.model_data.get('salary_sketches', {}))
+            self.salary_predictor = SalaryPredictor.from_model_data(self.model_data)
+            self._insights_cache = {}
+            self._prepare_sample_structures()
             print("✓ Memory-efficient model loaded successfully!")
             
             meta = self.model_data['df_meta']
@@ -34,7 +241,90 @@ class JobRecommendationAPI:
             print(f"✗ Error loading model: {e}")
             print("Make sure you have trained the model first using memory_efficient_trainer.py")
     
-    def get_job_recommendations(self, user_preferences, top_n=10):
+    def _prepare_sample_structures(self):
+        """Precompute per-model structures so requests only do slicing"""
+        df_sample = self.model_data['df_sample']
+        self.trending = TrendingRanking(df_sample['Salary'].to_numpy(), df_sample['Industry'].to_numpy())
+        
+        # TF-IDF rows aligned with df_sample (older models did not store them)
+        sample_tfidf = self.model_data.get('df_sample_tfidf')
+        if sample_tfidf is None:
+            sample_tfidf = self.model_data['tfidf_vectorizer'].transform(df_sample['job_text'])
+        self.job_index = JobIndex.from_frame(df_sample, columns=list(RESULT_COLUMN_SOURCES.values()),
+                                             vectors=sample_tfidf, code_columns=FILTER_COLUMNS)
+        self.live = np.ones(len(df_sample), dtype=bool)
+        # Dataset row of each sample job, -1 for jobs added since training (older models lack them)
+        positions = self.model_data.get('df_sample_positions')
+        self.sample_positions = None if positions is None else np.asarray(positions, dtype=np.int64)
+        
+        # Jobs dropped from the similarity index by an incremental update are not served either
+        deleted = self.similarity_index.get('deleted') if self.similarity_index is not None else None
+        if deleted is not None and self.sample_positions is not None:
+            known = np.flatnonzero((self.sample_positions >= 0) & (self.sample_positions < len(deleted)))
+            dropped = known[np.asarray(deleted, dtype=bool)[self.sample_positions[known]]]
+            if len(dropped):
+                self.live[dropped] = False
+                self.trending.remove(dropped)
+    
+    def add_jobs(self, new_jobs):
+        """
+        Add newly posted jobs to the served sample and update derived structures
+        
+        Args:
+            new_jobs: DataFrame (or list of dicts) with the dataset columns
+        """
+        if self.model_data is None:
+            print("Model not loaded!")
+            return
+        
+        if not isinstance(new_jobs, pd.DataFrame):
+            new_jobs = pd.DataFrame(new_jobs)
+        if len(new_jobs) == 0:
+            return
+        
+        if 'job_text' not in new_jobs:
+            new_jobs = new_jobs.assign(
+                job_text=new_jobs['Job Title'] + ' ' + new_jobs['Required Skills'] + ' ' + new_jobs['Industry']
+            )
+        if 'cluster' not in new_jobs:
+            new_jobs = new_jobs.assign(cluster=-1)  # Not assigned until the next retrain
+        
+        df_sample = self.model_data['df_sample']
+        start = df_sample.index.max() + 1 if len(df_sample) else 0
+        new_jobs = new_jobs.set_axis(pd.RangeIndex(start, start + len(new_jobs)))
+        self.model_data['df_sample'] = pd.concat([df_sample, new_jobs])
+        
+        self.trending.add(new_jobs['Salary'].to_numpy(), new_jobs['Industry'].to_numpy())
+        new_tfidf = self.model_data['tfidf_vectorizer'].transform(new_jobs['job_text'])
+        self.job_index.append({col: new_jobs[col].to_numpy() for col in self.job_index.columns}, new_tfidf)
+        self.live = np.concatenate([self.live, np.ones(len(new_jobs), dtype=bool)])
+        if self.sample_positions is not None:
+            self.sample_positions = np.concatenate([self.sample_positions, np.full(len(new_jobs), -1)])
+        self.update_salary_sketches(new_jobs)
+    
+    def remove_jobs(self, positions):
+        """
+        Stop serving jobs of the sample (e.g. filled or expired postings)
+        
+        Rows stay in place and are masked out of recommendations and the
+        trending order. Salary insights keep them, as sketches cannot
+        forget values, until the next retrain.
+        
+        Args:
+            positions: row positions in df_sample
+        """
+        if self.model_data is None:
+            print("Model not loaded!")
+            return
+        
+        positions = np.unique(np.asarray(positions, dtype=np.int64))
+        if len(positions) and (positions.min() < 0 or positions.max() >= len(self.live)):
+            raise IndexError(f"Job positions must be in 0-{len(self.live) - 1}")
+        positions = positions[self.live[positions]]
+        self.live[positions] = False
+        self.trending.remove(positions)
+    
+    def get_job_recommendations(self, user_preferences, top_n=10, layout='records'):
         """
         Get job recommendations for a user
         
@@ -46,6 +336,7 @@ class JobRecommendationAPI:
                 - 'location': preferred location (optional)
                 - 'min_salary': minimum salary (optional)
             top_n: number of recommendations to return
+            layout: 'records', 'node' or 'columnar' (see build_job_results)
         
         Returns:
             List of job recommendations
@@ -55,79 +346,47 @@ class JobRecommendationAPI:
             return []
         
         try:
-            df_sample = self.model_data['df_sample']
+            index = self.job_index
             tfidf_vectorizer = self.model_data['tfidf_vectorizer']
+            meta = self.model_data['df_meta']
+            salaries = index.columns['Salary']
+            min_salary = user_preferences.get('min_salary')
             
             # Start with sample jobs (for demo purposes, in production you'd query your database)
-            filtered_df = df_sample.copy()
-            
-            # Apply filters
-            if 'experience' in user_preferences and user_preferences['experience']:
-                if user_preferences['experience'] in self.model_data['df_meta']['experience_levels']:
-                    filtered_df = filtered_df[filtered_df['Experience Level'] == user_preferences['experience']]
-            
-            if 'industry' in user_preferences and user_preferences['industry']:
-                if user_preferences['industry'] in self.model_data['df_meta']['industries']:
-                    filtered_df = filtered_df[filtered_df['Industry'] == user_preferences['industry']]
-            
-            if 'location' in user_preferences and user_preferences['location']:
-                if user_preferences['location'] in self.model_data['df_meta']['locations']:
-                    filtered_df = filtered_df[filtered_df['Location'] == user_preferences['location']]
-            
-            if 'min_salary' in user_preferences and user_preferences['min_salary']:
-                filtered_df = filtered_df[filtered_df['Salary'] >= user_preferences['min_salary']]
+            mask = self.live.copy()
+            
+            # Apply filters as integer code comparisons
+            filter_fields = [
+                ('experience', 'Experience Level', meta['experience_levels']),
+                ('industry', 'Industry', meta['industries']),
+                ('location', 'Location', meta['locations'])
+            ]
+            for pref_key, col, known_values in filter_fields:
+                value = user_preferences.get(pref_key)
+                if value and value in known_values:
+                    mask &= index.equals_mask(col, value)
+            
+            if min_salary:
+                mask &= salaries >= min_salary
             
             # If no jobs match filters, relax constraints
-            if len(filtered_df) == 0:
+            if not mask.any():
                 print("No exact matches found, showing similar jobs...")
-                filtered_df = df_sample.copy()
-                if 'min_salary' in user_preferences and user_preferences['min_salary']:
-                    filtered_df = filtered_df[filtered_df['Salary'] >= user_preferences['min_salary'] * 0.8]
+                mask = self.live & (salaries >= min_salary * 0.8) if min_salary else self.live.copy()
             
-            # Skills-based similarity
             if 'skills' in user_preferences and user_preferences['skills']:
-                # Transform user skills to TF-IDF vector
+                # Skills-based similarity, sorted by similarity and salary
                 user_skills_vector = tfidf_vectorizer.transform([user_preferences['skills']])
-                
-                # Calculate similarity with filtered jobs
-                if len(filtered_df) > 0:
-                    job_skills_matrix = tfidf_vectorizer.transform(filtered_df['job_text'])
-                    similarities = cosine_similarity(user_skills_vector, job_skills_matrix).flatten()
-                    
-                    # Add similarity scores
-                    filtered_df = filtered_df.copy()
-                    filtered_df['similarity_score'] = similarities
-                    
-                    # Sort by similarity and salary
-                    recommendations = filtered_df.nlargest(top_n, ['similarity_score', 'Salary'])
-                else:
-                    recommendations = pd.DataFrame()
+                positions, similarities = index.search(user_skills_vector, mask=mask, tie_break=salaries, top_n=top_n)
             else:
                 # No skills specified, recommend based on salary
-                if len(filtered_df) > 0:
-                    recommendations = filtered_df.nlargest(top_n, 'Salary')
-                    recommendations['similarity_score'] = 0.0
-                else:
-                    recommendations = pd.DataFrame()
+                positions, _ = index.search(mask=mask, bonus=salaries.astype(np.float64), top_n=top_n)
+                similarities = np.zeros(len(positions))
             
-            # Convert to list of dictionaries
-            if not recommendations.empty:
-                result = []
-                for _, job in recommendations.iterrows():
-                    result.append({
-                        'job_title': job['Job Title'],
-                        'company': job['Company'],
-                        'location': job['Location'],
-                        'experience_level': job['Experience Level'],
-                        'salary': int(job['Salary']),
-                        'industry': job['Industry'],
-                        'required_skills': job['Required Skills'],
-                        'similarity_score': float(job.get('similarity_score', 0.0)),
-                        'cluster': int(job.get('cluster', 0))
-                    })
-                return result
-            else:
-                return []
+            return build_job_results(
+                index.take(positions), RECOMMENDATION_FIELDS,
+                computed={'similarity_score': similarities}, layout=layout
+            )
             
         except Exception as e:
             print(f"Error generating recommendations: {e}")
@@ -153,50 +412,50 @@ class JobRecommendationAPI:
             return None
         
         try:
-            salary_model = self.model_data['salary_model']
-            label_encoders = self.model_data['label_encoders']
-            
-            # Check if values exist in encoders
-            if job_details['experience'] not in label_encoders['Experience Level'].classes_:
-                print(f"Unknown experience level: {job_details['experience']}")
-                return None
-            
-            if job_details['industry'] not in label_encoders['Industry'].classes_:
-                print(f"Unknown industry: {job_details['industry']}")
-                return None
-            
-            if job_details['location'] not in label_encoders['Location'].classes_:
-                print(f"Unknown location: {job_details['location']}")
-                return None
-            
-            # Encode categorical features
-            exp_encoded = label_encoders['Experience Level'].transform([job_details['experience']])[0]
-            ind_encoded = label_encoders['Industry'].transform([job_details['industry']])[0]
-            loc_encoded = label_encoders['Location'].transform([job_details['location']])[0]
-            
-            # Calculate skills count and title length
-            skills_count = job_details.get('skills', '').count(',') + 1 if job_details.get('skills') else 1
-            title_length = len(job_details.get('title', ''))
-            
-            # Create feature vector
-            features = np.array([[exp_encoded, ind_encoded, loc_encoded, skills_count, title_length]])
-            
-            # Predict salary
-            predicted_salary = salary_model.predict(features)[0]
-            
-            return int(predicted_salary)
+            # Precomputed table first; the flattened forest handles combinations outside it
+            return self.salary_predictor.predict([job_details])[0]
             
         except Exception as e:
             print(f"Error predicting salary: {e}")
             return None
     
-    def get_similar_jobs(self, job_index, top_n=5):
+    def predict_salaries(self, jobs_details):
+        """
+        Predict salaries for many job postings at once
+        
+        Table hits are answered directly; the remaining rows go through
+        the flattened forest in a single batched traversal.
+        
+        Args:
+            jobs_details: list of job_details dicts (see predict_salary)
+        
+        Returns:
+            List of predicted salaries (None for unknown categories)
+        """
+        if self.model_data is None:
+            print("Model not loaded!")
+            return [None] * len(jobs_details)
+        
+        try:
+            return self.salary_predictor.predict(jobs_details)
+            
+        except Exception as e:
+            print(f"Error predicting salaries: {e}")
+            return [None] * len(jobs_details)
+    
+    def get_similar_jobs(self, job_index, top_n=5, layout='records'):
         """
-        Get jobs similar to a specific job using the similarity index
+        Get jobs similar to a specific job
+        
+        With exported embeddings, the served sample jobs are searched in the
+        quantized SVD space (float32 re-rank of the best candidates), so
+        removed jobs are skipped and top_n is not capped by the stored
+        neighbour lists. Otherwise the precomputed similarity index is used.
         
         Args:
             job_index: Index of the reference job
             top_n: number of similar jobs to return
+            layout: 'records', 'node' or 'columnar' (see build_job_results)
         
         Returns:
             List of similar jobs
@@ -206,37 +465,56 @@ class JobRecommendationAPI:
             return []
         
         try:
-            similarity_index = self.model_data['similarity_index']
+            if self.embedding_index is not None and self.sample_positions is not None:
+                return self._similar_from_embeddings(job_index, top_n, layout)
+            
+            neighbors = self.similarity_index['neighbors']
+            scores = self.similarity_index['scores']
             df_sample = self.model_data['df_sample']
             
-            if job_index not in similarity_index:
+            if not 0 <= job_index < len(neighbors):
                 print(f"No similarity data for job index {job_index}")
                 return []
             
-            similar_data = similarity_index[job_index]
-            similar_jobs = similar_data['similar_jobs'][:top_n]
-            similarity_scores = similar_data['similarity_scores'][:top_n]
+            similar_jobs = np.asarray(neighbors[job_index, :top_n])
+            similarity_scores = np.asarray(scores[job_index, :top_n], dtype=np.float32)
             
-            # Get job details from sample (in production, query your database)
-            result = []
-            for i, (job_idx, score) in enumerate(zip(similar_jobs, similarity_scores)):
-                if job_idx < len(df_sample):
-                    job = df_sample.iloc[job_idx]
-                    result.append({
-                        'job_title': job['Job Title'],
-                        'company': job['Company'],
-                        'location': job['Location'],
-                        'salary': int(job['Salary']),
-                        'industry': job['Industry'],
-                        'similarity_score': float(score)
-                    })
+            # Skip empty slots and jobs outside the sample (in production, query your database)
+            keep = (similar_jobs >= 0) & (similar_jobs < len(df_sample))
+            similar_jobs, similarity_scores = similar_jobs[keep], similarity_scores[keep]
             
-            return result
+            return build_job_results(
+                df_sample.iloc[similar_jobs], SIMILAR_JOB_FIELDS,
+                computed={'similarity_score': similarity_scores}, layout=layout
+            )
             
         except Exception as e:
             print(f"Error finding similar jobs: {e}")
             return []
     
+    def _similar_from_embeddings(self, job_index, top_n, layout):
+        """Nearest live sample jobs to dataset row job_index by embedding cosine"""
+        index = self.embedding_index
+        if not 0 <= job_index < len(index):
+            print(f"No embedding for job index {job_index}")
+            return []
+        
+        served = np.flatnonzero(self.live & (self.sample_positions >= 0) & (self.sample_positions < len(index)))
+        rows = self.sample_positions[served]
+        found, scores = index.search(index.vector(job_index), top_k=top_n, rerank=SIMILAR_JOB_RERANK,
+                                     exclude=[job_index], rows=rows)
+        found, scores = found[0], scores[0]
+        keep = np.isfinite(scores)
+        found, scores = found[keep], scores[keep]
+        
+        # Back from dataset rows to sample rows
+        order = np.argsort(rows)
+        sample_rows = served[order[np.searchsorted(rows, found, sorter=order)]]
+        return build_job_results(
+            self.model_data['df_sample'].iloc[sample_rows], SIMILAR_JOB_FIELDS,
+            computed={'similarity_score': scores.astype(np.float32)}, layout=layout
+        )
+    
     def get_market_insights(self, filters=None):
         """
         Get insights about the job market
@@ -252,49 +530,152 @@ class JobRecommendationAPI:
             return {}
         
         try:
-            df_sample = self.model_data['df_sample']
             meta = self.model_data['df_meta']
+            filters = filters or {}
             
-            # Apply filters to sample data
-            filtered_df = df_sample.copy()
-            if filters:
-                if 'industry' in filters and filters['industry'] in meta['industries']:
-                    filtered_df = filtered_df[filtered_df['Industry'] == filters['industry']]
-                if 'experience' in filters and filters['experience'] in meta['experience_levels']:
-                    filtered_df = filtered_df[filtered_df['Experience Level'] == filters['experience']]
-                if 'location' in filters and filters['location'] in meta['locations']:
-                    filtered_df = filtered_df[filtered_df['Location'] == filters['location']]
+            # Only known filter values narrow the result, same as before
+            experience = filters.get('experience') if filters.get('experience') in meta['experience_levels'] else None
+            industry = filters.get('industry') if filters.get('industry') in meta['industries'] else None
+            location = filters.get('location') if filters.get('location') in meta['locations'] else None
             
-            if len(filtered_df) == 0:
-                return {'error': 'No jobs found matching filters'}
+            cache_key = (experience, industry, location)
+            if cache_key in self._insights_cache:
+                return self._insights_cache[cache_key]
             
-            # Calculate insights
-            insights = {
-                'total_jobs_in_sample': len(filtered_df),
-                'estimated_total_jobs': meta['total_jobs'],
-                'avg_salary': int(filtered_df['Salary'].mean()),
-                'salary_range': {
-                    'min': int(filtered_df['Salary'].min()),
-                    'max': int(filtered_df['Salary'].max()),
-                    'median': int(filtered_df['Salary'].median())
-                },
-                'top_industries': filtered_df['Industry'].value_counts().head().to_dict(),
-                'top_locations': filtered_df['Location'].value_counts().head().to_dict(),
-                'experience_distribution': filtered_df['Experience Level'].value_counts().to_dict(),
-                'available_filters': {
-                    'industries': meta['industries'],
-                    'locations': meta['locations'],
-                    'experience_levels': meta['experience_levels']
-                }
-            }
+            if self.salary_sketches:
+                insights = self._insights_from_sketches(meta, experience, industry, location)
+            else:
+                insights = self._insights_from_sample(meta, experience, industry, location)
             
+            if 'error' not in insights:
+                self._insights_cache[cache_key] = insights
             return insights
             
         except Exception as e:
             print(f"Error generating insights: {e}")
             return {'error': str(e)}
     
-    def get_trending_jobs(self, top_n=10):
+    def _sample_match_count(self, experience, industry, location):
+        """Jobs of the served sample matching the filters (from the index's code columns)"""
+        mask = np.ones(len(self.job_index), dtype=bool)
+        for col, value in (('Experience Level', experience), ('Industry', industry), ('Location', location)):
+            if value is not None:
+                mask &= self.job_index.equals_mask(col, value)
+        return int(mask.sum())
+    
+    def _insights_from_sketches(self, meta, experience, industry, location):
+        """
+        Market insights from merged per-cell salary sketches (no raw rows needed)
+        
+        Salary figures and distributions cover every training job matching the
+        filters (total_matching_jobs); total_jobs_in_sample keeps its meaning,
+        the matching jobs in the served sample.
+        """
+        merged, cell_counts = merge_salary_sketches(
+            self.salary_sketches, experience=experience, industry=industry, location=location
+        )
+        
+        if merged.count == 0:
+            return {'error': 'No jobs found matching filters'}
+        
+        # Category distributions come straight from the cell counts
+        industry_counts, location_counts, experience_counts = {}, {}, {}
+        for (exp, ind, loc), count in cell_counts.items():
+            experience_counts[exp] = experience_counts.get(exp, 0) + count
+            industry_counts[ind] = industry_counts.get(ind, 0) + count
+            location_counts[loc] = location_counts.get(loc, 0) + count
+        
+        def top(counts, n=None):
+            ranked = sorted(counts.items(), key=lambda item: item[1], reverse=True)
+            return dict(ranked[:n] if n else ranked)
+        
+        p10, p50, p90 = merged.quantiles([0.1, 0.5, 0.9])
+        
+        return {
+            'total_jobs_in_sample': self._sample_match_count(experience, industry, location),
+            'total_matching_jobs': merged.count,
+            'estimated_total_jobs': meta['total_jobs'],
+            'avg_salary': int(merged.mean),
+            'salary_range': {
+                'min': int(merged.min),
+                'max': int(merged.max),
+                'median': int(p50)
+            },
+            'salary_bands': {
+                'p10': int(p10),
+                'p50': int(p50),
+                'p90': int(p90)
+            },
+            'top_industries': top(industry_counts, 5),
+            'top_locations': top(location_counts, 5),
+            'experience_distribution': top(experience_counts),
+            'available_filters': {
+                'industries': meta['industries'],
+                'locations': meta['locations'],
+                'experience_levels': meta['experience_levels']
+            }
+        }
+    
+    def _insights_from_sample(self, meta, experience, industry, location):
+        """Market insights computed from the raw sample (models without sketches)"""
+        df_sample = self.model_data['df_sample']
+        
+        filtered_df = df_sample
+        if industry is not None:
+            filtered_df = filtered_df[filtered_df['Industry'] == industry]
+        if experience is not None:
+            filtered_df = filtered_df[filtered_df['Experience Level'] == experience]
+        if location is not None:
+            filtered_df = filtered_df[filtered_df['Location'] == location]
+        
+        if len(filtered_df) == 0:
+            return {'error': 'No jobs found matching filters'}
+        
+        p10, p50, p90 = filtered_df['Salary'].quantile([0.1, 0.5, 0.9]).tolist()
+        
+        return {
+            'total_jobs_in_sample': len(filtered_df),
+            'estimated_total_jobs': meta['total_jobs'],
+            'avg_salary': int(filtered_df['Salary'].mean()),
+            'salary_range': {
+                'min': int(filtered_df['Salary'].min()),
+                'max': int(filtered_df['Salary'].max()),
+                'median': int(filtered_df['Salary'].median())
+            },
+            'salary_bands': {
+                'p10': int(p10),
+                'p50': int(p50),
+                'p90': int(p90)
+            },
+            'top_industries': filtered_df['Industry'].value_counts().head().to_dict(),
+            'top_locations': filtered_df['Location'].value_counts().head().to_dict(),
+            'experience_distribution': filtered_df['Experience Level'].value_counts().to_dict(),
+            'available_filters': {
+                'industries': meta['industries'],
+                'locations': meta['locations'],
+                'experience_levels': meta['experience_levels']
+            }
+        }
+    
+    def update_salary_sketches(self, new_jobs):
+        """
+        Fold newly posted jobs into the salary sketches
+        
+        Args:
+            new_jobs: DataFrame (or list of dicts) with 'Salary', 'Experience Level',
+                      'Industry' and 'Location'
+        """
+        if self.model_data is None:
+            print("Model not loaded!")
+            return
+        
+        if not isinstance(new_jobs, pd.DataFrame):
+            new_jobs = pd.DataFrame(new_jobs)
+        
+        build_salary_sketches(new_jobs, self.salary_sketches)
+        self._insights_cache = {}
+    
+    def get_trending_jobs(self, top_n=10, layout='records'):
         """Get trending jobs based on salary and popularity"""
         if self.model_data is None:
             print("Model not loaded!")
@@ -303,32 +684,12 @@ class JobRecommendationAPI:
         try:
             df_sample = self.model_data['df_sample']
             
-            # Calculate trend score based on salary and industry popularity
-            industry_counts = df_sample['Industry'].value_counts().to_dict()
-            df_copy = df_sample.copy()
-            df_copy['industry_popularity'] = df_copy['Industry'].map(industry_counts)
-            
-            # Normalize scores
-            salary_norm = (df_copy['Salary'] - df_copy['Salary'].min()) / (df_copy['Salary'].max() - df_copy['Salary'].min())
-            popularity_norm = (df_copy['industry_popularity'] - df_copy['industry_popularity'].min()) / (df_copy['industry_popularity'].max() - df_copy['industry_popularity'].min())
-            
-            df_copy['trend_score'] = salary_norm * 0.7 + popularity_norm * 0.3
-            
-            trending_jobs = df_copy.nlargest(top_n, 'trend_score')
-            
-            result = []
-            for _, job in trending_jobs.iterrows():
-                result.append({
-                    'job_title': job['Job Title'],
-                    'company': job['Company'],
-                    'location': job['Location'],
-                    'salary': int(job['Salary']),
-                    'industry': job['Industry'],
-                    'trend_score': float(job['trend_score']),
-                    'experience_level': job['Experience Level']
-                })
+            positions, trend_scores = self.trending.top(top_n)
             
-            return result
+            return build_job_results(
+                df_sample.iloc[positions], TRENDING_FIELDS,
+                computed={'trend_score': trend_scores}, layout=layout
+            )
             
         except Exception as e:
             print(f"Error getting trending jobs: {e}")
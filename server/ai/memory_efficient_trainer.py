@@ -7,49 +7,144 @@ Optimized for large datasets (50K+ jobs)
 import pandas as pd
 import numpy as np
 from sklearn.model_selection import train_test_split
-from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.feature_extraction.text import TfidfVectorizer, HashingVectorizer, TfidfTransformer
+from sklearn.pipeline import make_pipeline
 from sklearn.preprocessing import LabelEncoder, StandardScaler
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.cluster import MiniBatchKMeans
 from sklearn.decomposition import TruncatedSVD
 import joblib
 import warnings
 import os
-import gc
-from scipy.sparse import csr_matrix
+import json
+import pickle
+import argparse
+import itertools
+import time
+from scipy.sparse import csr_matrix, vstack, save_npz, load_npz
+import salary_sketch
+import salary_predictor
+import embedding_index as embedding_module
+import similarity_index as similarity_module
+from salary_sketch import build_salary_sketches, sketches_to_state
+from salary_predictor import SalaryLookupTable, FlatForest
+from stage_cache import StageCache, file_fingerprint
+from stage_scheduler import StageScheduler, Stage, SharedArrays
+from embedding_index import (EMBEDDING_DTYPES, QuantizedEmbeddingIndex, save_embedding_index,
+                             load_embedding_index, compare_embedding_precisions)
+from similarity_index import (build_similarity_index, save_similarity_index, load_similarity_index,
+                              update_similarity_index)
 warnings.filterwarnings('ignore')
 
-def load_and_preprocess_data(csv_file='job_recommendation_dataset.csv'):
-    """Load and preprocess the job dataset with memory optimization"""
+# Columns read from the dataset and their on-disk dtypes
+DATASET_DTYPES = {
+    'Job Title': str,
+    'Company': str,
+    'Location': str,
+    'Experience Level': str,
+    'Salary': 'float64',  # float so rows with missing salary parse; int32 after cleaning
+    'Industry': str,
+    'Required Skills': str
+}
+CATEGORICAL_COLUMNS = ['Experience Level', 'Industry', 'Location']
+# Repetitive text columns also held as categories, so each value is stored once;
+# job_text is derived from the columns on demand instead of kept per row
+COMPACT_COLUMNS = ['Job Title', 'Company']
+
+# Salary model inputs and the available regressors
+SALARY_FEATURE_COLS = ['Experience Level_encoded', 'Industry_encoded', 'Location_encoded', 
+                       'skills_count', 'title_length']
+SALARY_BACKENDS = ['forest', 'hist']
+
+def prepare_chunk(chunk):
+    """Clean one chunk and add the derived feature columns"""
+    # Basic cleaning
+    chunk = chunk.dropna()
+    
+    # Memory optimization: convert to appropriate dtypes
+    chunk['skills_count'] = (chunk['Required Skills'].str.count(',') + 1).astype('int16')
+    chunk['title_length'] = chunk['Job Title'].str.len().astype('int16')
+    chunk['Salary'] = chunk['Salary'].astype('int32')
+    for col in CATEGORICAL_COLUMNS + COMPACT_COLUMNS:
+        chunk[col] = chunk[col].astype('category')
+    
+    return chunk
+
+def job_texts(df):
+    """Text the TF-IDF features are built from: title, skills and industry"""
+    return (df['Job Title'].astype(str) + ' ' + df['Required Skills'].astype(str) + ' '
+            + df['Industry'].astype(str))
+
+def iter_job_texts(df, chunksize=100000):
+    """job_texts(df) in chunks, so the full text column is never materialised"""
+    for start in range(0, len(df), chunksize):
+        yield job_texts(df.iloc[start:start + chunksize])
+
+def iter_job_chunks(csv_file='job_recommendation_dataset.csv', chunksize=100000):
+    """
+    Stream the dataset as cleaned chunks of at most `chunksize` rows
+    
+    Yields:
+        (raw_row_count, prepared_chunk) tuples
+    """
+    reader = pd.read_csv(
+        csv_file,
+        usecols=list(DATASET_DTYPES),
+        dtype=DATASET_DTYPES,
+        chunksize=chunksize
+    )
+    for chunk in reader:
+        yield len(chunk), prepare_chunk(chunk)
+
+def concat_chunks(chunks):
+    """Concatenate prepared chunks, unifying their categorical columns"""
+    if not chunks:
+        return pd.DataFrame(columns=list(DATASET_DTYPES))
+    
+    for col in CATEGORICAL_COLUMNS + COMPACT_COLUMNS:
+        categories = pd.api.types.union_categoricals([c[col] for c in chunks]).categories
+        for chunk in chunks:
+            chunk[col] = chunk[col].cat.set_categories(categories)
+    
+    return pd.concat(chunks)
+
+def load_and_preprocess_data(csv_file='job_recommendation_dataset.csv', chunksize=100000):
+    """
+    Load and preprocess the job dataset with memory optimization
+    
+    Chunking bounds the parsing overhead (read_csv buffers and string
+    copies) to one chunk. Title and company become categories within their
+    chunk and job_text is not stored (see job_texts); only Required Skills,
+    mostly distinct per job, stays a string column. On the synthetic data
+    the frame takes ~50 bytes/row instead of ~150.
+    """
     print("📊 Loading dataset...")
     
     if not os.path.exists(csv_file):
         print(f"❌ Error: {csv_file} not found!")
         return None
     
-    # Load data in chunks to save memory
-    df = pd.read_csv(csv_file)
-    print(f"✓ Loaded {len(df)} jobs")
-    
-    # Basic cleaning
-    df = df.dropna()
+    # Load data in chunks: only the chunk being parsed carries read_csv's
+    # overhead; the kept rows already have their compact dtypes
+    chunks = []
+    total_rows = 0
+    for raw_rows, chunk in iter_job_chunks(csv_file, chunksize):
+        total_rows += raw_rows
+        chunks.append(chunk)
+    print(f"✓ Loaded {total_rows} jobs")
+    
+    df = concat_chunks(chunks)
+    del chunks
     print(f"✓ After cleaning: {len(df)} jobs")
     
-    # Create text features
-    df['job_text'] = df['Job Title'] + ' ' + df['Required Skills'] + ' ' + df['Industry']
-    df['skills_count'] = df['Required Skills'].str.count(',') + 1
-    df['title_length'] = df['Job Title'].str.len()
-    
-    # Memory optimization: convert to appropriate dtypes
-    df['skills_count'] = df['skills_count'].astype('int16')
-    df['title_length'] = df['title_length'].astype('int16')
-    df['Salary'] = df['Salary'].astype('int32')
-    
     return df
 
-def create_tfidf_features(df, max_features=2000):
+def create_tfidf_features(df, max_features=2000, method='vocabulary', chunksize=100000):
     """Create TF-IDF features with memory efficiency"""
+    if method == 'hashing':
+        return create_hashed_tfidf_features(lambda: iter_job_texts(df, chunksize))
+    
     print("⚙️ Creating TF-IDF features...")
     
     # Use smaller feature set for memory efficiency
@@ -62,11 +157,70 @@ def create_tfidf_features(df, max_features=2000):
         dtype=np.float32  # Use float32 instead of float64
     )
     
-    skills_matrix = tfidf.fit_transform(df['job_text'])
+    # Texts are generated chunk by chunk while the vocabulary is counted
+    skills_matrix = tfidf.fit_transform(itertools.chain.from_iterable(iter_job_texts(df, chunksize)))
     print(f"✓ TF-IDF matrix: {skills_matrix.shape} ({skills_matrix.nnz} non-zero elements)")
     
     return tfidf, skills_matrix
 
+def create_hashed_tfidf_features(text_chunks, n_features=2**16, min_df=3, max_df=0.8):
+    """
+    Out-of-core TF-IDF: hash terms into a fixed space, stream document
+    frequencies over the chunks, then weight the chunks in a second pass
+    
+    Args:
+        text_chunks: callable returning a fresh iterable of job_text chunks
+                     (called twice, e.g. re-reading the CSV via iter_job_chunks)
+        n_features: size of the hashed feature space (downstream SVD components
+                    scale with it, so keep it modest)
+        min_df, max_df: same document-frequency cut-offs as the vocabulary
+                        version (absolute count / fraction of documents)
+    
+    Returns:
+        (featurizer, skills_matrix) - the featurizer has no vocabulary to pickle
+    """
+    print("⚙️ Creating hashed TF-IDF features...")
+    
+    hasher = HashingVectorizer(
+        n_features=n_features,
+        stop_words='english',
+        ngram_range=(1, 2),
+        alternate_sign=False,
+        norm=None,
+        dtype=np.float32
+    )
+    
+    # Pass 1: document frequencies per hashed feature
+    doc_freq = np.zeros(n_features, dtype=np.int64)
+    n_docs = 0
+    for texts in text_chunks():
+        counts = hasher.transform(texts)
+        doc_freq += np.bincount(counts.indices, minlength=n_features)
+        n_docs += counts.shape[0]
+    
+    # Smoothed IDF, same formula as TfidfVectorizer; features outside the
+    # document-frequency limits get weight 0 and are pruned below
+    idf = (np.log((1 + n_docs) / (1 + doc_freq)) + 1).astype(np.float32)
+    idf[(doc_freq < min_df) | (doc_freq > max_df * n_docs)] = 0
+    
+    transformer = TfidfTransformer()
+    transformer.idf_ = idf
+    transformer.n_features_in_ = n_features
+    featurizer = make_pipeline(hasher, transformer)
+    
+    # Pass 2: weight and normalise chunk by chunk
+    blocks = []
+    for texts in text_chunks():
+        block = featurizer.transform(texts)
+        block.eliminate_zeros()
+        blocks.append(block)
+    skills_matrix = vstack(blocks).tocsr() if blocks else csr_matrix((0, n_features), dtype=np.float32)
+    
+    active = int(np.count_nonzero(idf))
+    print(f"✓ Hashed TF-IDF matrix: {skills_matrix.shape} ({skills_matrix.nnz} non-zero elements, {active:,} active features)")
+    
+    return featurizer, skills_matrix
+
 def encode_categorical_features(df):
     """Encode categorical features"""
     print("🔧 Encoding categorical features...")
@@ -81,43 +235,132 @@ def encode_categorical_features(df):
     
     return label_encoders
 
-def train_salary_model(df):
-    """Train salary prediction model with simplified features"""
-    print("🤖 Training salary prediction model...")
-    
-    feature_cols = ['Experience Level_encoded', 'Industry_encoded', 'Location_encoded', 
-                   'skills_count', 'title_length']
-    
-    X = df[feature_cols]
-    y = df['Salary']
-    
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+def make_salary_model(backend, X, n_jobs=-1):
+    """Untrained salary regressor for the given backend"""
+    if backend == 'hist':
+        # Native categorical splits need fewer than max_bins categories per column
+        categorical = [col.endswith('_encoded') and X[col].max() < 255 for col in X.columns]
+        return HistGradientBoostingRegressor(
+            max_iter=200,
+            learning_rate=0.1,
+            max_leaf_nodes=31,
+            categorical_features=categorical,
+            early_stopping=True,
+            random_state=42
+        )
     
     # Use a simpler model for faster training
-    salary_model = RandomForestRegressor(
+    return RandomForestRegressor(
         n_estimators=50,  # Reduced from 100
         max_depth=10,     # Limit depth
         random_state=42,
-        n_jobs=-1
+        n_jobs=n_jobs
     )
+
+def train_salary_model(df, backend='forest', n_jobs=-1):
+    """Train salary prediction model with simplified features"""
+    print(f"🤖 Training salary prediction model ({backend})...")
+    
+    X = df[SALARY_FEATURE_COLS]
+    y = df['Salary']
+    
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
+    salary_model = make_salary_model(backend, X, n_jobs=n_jobs)
     salary_model.fit(X_train, y_train)
     score = salary_model.score(X_test, y_test)
     
     print(f"✓ Salary model R² score: {score:.3f}")
     
-    # Feature importance
-    feature_importance = pd.DataFrame({
-        'feature': feature_cols,
-        'importance': salary_model.feature_importances_
-    }).sort_values('importance', ascending=False)
-    
-    print("Top feature importances:")
-    print(feature_importance.head())
+    # Feature importance (histogram boosting has no impurity-based importances)
+    if hasattr(salary_model, 'feature_importances_'):
+        feature_importance = pd.DataFrame({
+            'feature': SALARY_FEATURE_COLS,
+            'importance': salary_model.feature_importances_
+        }).sort_values('importance', ascending=False)
+        
+        print("Top feature importances:")
+        print(feature_importance.head())
     
     return salary_model
 
-def create_job_clusters(df, skills_matrix):
+def create_salary_table(df, salary_model):
+    """Precompute salary predictions over the enumerable feature space"""
+    print("🧮 Precomputing salary lookup table...")
+    
+    table = SalaryLookupTable.build(
+        salary_model,
+        df[SALARY_FEATURE_COLS[:3]].to_numpy(),
+        df['skills_count'].to_numpy(),
+        df['title_length'].to_numpy()
+    )
+    if table is None:
+        print("⚠ Feature space too large for a lookup table, predictions will use the model")
+        return None
+    
+    print(f"✓ Salary table: {table.table.shape[0]:,} combinations x skills {table.skills_range} "
+          f"x title length {table.title_range} ({table.nbytes / (1024*1024):.1f} MB)")
+    return table
+
+def compare_salary_backends(df, backends=SALARY_BACKENDS, report_path=None, latency_rows=1000):
+    """
+    Train every salary backend on the same split and compare them
+    
+    Reports training time, single-row and batch inference latency,
+    pickled model size and held-out R².
+    
+    Returns:
+        List of per-backend result dicts
+    """
+    print("⚖️  Comparing salary model backends...")
+    
+    X = df[SALARY_FEATURE_COLS]
+    y = df['Salary']
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    batch = X_test.iloc[:latency_rows]
+    single = X_test.iloc[:1].to_numpy()
+    
+    results = []
+    for backend in backends:
+        model = make_salary_model(backend, X)
+        started = time.perf_counter()
+        model.fit(X_train, y_train)
+        train_seconds = time.perf_counter() - started
+        
+        # Single rows go through predict the way the API calls it
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')
+            started = time.perf_counter()
+            for _ in range(20):
+                model.predict(single)
+            single_ms = (time.perf_counter() - started) / 20 * 1000
+        
+        started = time.perf_counter()
+        model.predict(batch)
+        batch_us = (time.perf_counter() - started) / max(len(batch), 1) * 1e6
+        
+        results.append({
+            'backend': backend,
+            'train_seconds': round(train_seconds, 3),
+            'predict_single_ms': round(single_ms, 3),
+            'predict_batch_us_per_row': round(batch_us, 3),
+            'model_bytes': len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+            'r2': round(float(model.score(X_test, y_test)), 4)
+        })
+    
+    print(f"  {'backend':<8} {'train s':>9} {'1-row ms':>9} {'batch us':>9} {'size MB':>9} {'R²':>7}")
+    for r in results:
+        print(f"  {r['backend']:<8} {r['train_seconds']:>9.2f} {r['predict_single_ms']:>9.2f} "
+              f"{r['predict_batch_us_per_row']:>9.2f} {r['model_bytes'] / (1024*1024):>9.2f} {r['r2']:>7.3f}")
+    
+    if report_path:
+        with open(report_path, 'w') as f:
+            json.dump({'rows': len(df), 'results': results}, f, indent=2)
+        print(f"✓ Salary backend report written to {report_path}")
+    
+    return results
+
+def create_job_clusters(df, skills_matrix, n_clusters=15):
     """Create job clusters using memory-efficient methods"""
     print("🎯 Creating job clusters...")
     
@@ -126,8 +369,7 @@ def create_job_clusters(df, skills_matrix):
     skills_reduced = svd.fit_transform(skills_matrix)
     
     # Get numerical features
-    numerical_cols = ['Experience Level_encoded', 'Industry_encoded', 'Location_encoded', 
-                     'skills_count', 'title_length']
+    numerical_cols = SALARY_FEATURE_COLS
     scaler = StandardScaler()
     job_features = scaler.fit_transform(df[numerical_cols])
     
@@ -136,7 +378,7 @@ def create_job_clusters(df, skills_matrix):
     
     # Use MiniBatchKMeans for memory efficiency
     kmeans = MiniBatchKMeans(
-        n_clusters=15,
+        n_clusters=n_clusters,
         random_state=42,
         batch_size=1000,
         n_init=3
@@ -159,52 +401,111 @@ def create_job_clusters(df, skills_matrix):
     
     return kmeans, svd, scaler
 
-def create_similarity_index(skills_matrix, batch_size=1000):
-    """Create a memory-efficient similarity index instead of full matrix"""
-    print("🔗 Creating similarity index...")
-    
-    n_jobs = skills_matrix.shape[0]
+def svd_embeddings(svd, skills_matrix, batch_size=100000):
+    """Project job vectors into the SVD space in row batches"""
+    return np.vstack([
+        svd.transform(skills_matrix[start:start + batch_size]).astype(np.float32)
+        for start in range(0, skills_matrix.shape[0], batch_size)
+    ])
+
+def create_embedding_index(svd, skills_matrix, dtype='int8', report_path=None):
+    """Export quantized per-job SVD embeddings for compact brute-force scoring"""
+    print(f"🧬 Exporting {dtype} job embeddings...")
+    
+    embeddings = svd_embeddings(svd, skills_matrix)
+    if report_path:
+        results = compare_embedding_precisions(embeddings)
+        with open(report_path, 'w') as f:
+            json.dump({'rows': len(embeddings), 'dims': embeddings.shape[1], 'results': results}, f, indent=2)
+        print(f"✓ Embedding report written to {report_path}")
+    
+    # The float32 copy is kept as a memory-mapped sidecar for exact re-ranking
+    index = QuantizedEmbeddingIndex.from_embeddings(embeddings, dtype, keep_exact=True)
+    print(f"✓ Embeddings: {len(index):,} x {embeddings.shape[1]} {dtype} "
+          f"({index.nbytes / (1024*1024):.1f} MB vs {embeddings.nbytes / (1024*1024):.1f} MB float32)")
+    return index
+
+def create_salary_sketches(df, k=200):
+    """Build mergeable salary quantile sketches per category cell in one pass"""
+    print("📈 Building salary quantile sketches...")
     
-    # Instead of full similarity matrix, create index for top similar jobs
-    similarity_index = {}
+    sketches = build_salary_sketches(df, k=k)
+    kept = sum(s.size for s in sketches.values())
     
-    print(f"Processing {n_jobs} jobs in batches of {batch_size}...")
+    print(f"✓ Built {len(sketches)} cell sketches ({kept:,} retained values for {len(df):,} salaries)")
+    return sketches
+
+def create_similarity_index(skills_matrix, batch_size=1000, top_k=20, score_dtype=np.float16, n_jobs=-1):
+    """Create a memory-efficient similarity index instead of full matrix"""
+    print("🔗 Creating similarity index...")
     
-    for i in range(0, n_jobs, batch_size):
-        end_idx = min(i + batch_size, n_jobs)
-        batch = skills_matrix[i:end_idx]
-        
-        # Calculate similarity for this batch against all jobs
-        similarities = cosine_similarity(batch, skills_matrix)
-        
-        # Store only top 20 similar jobs for each job in batch
-        for j, sim_row in enumerate(similarities):
-            job_idx = i + j
-            # Get top 21 (including self) and exclude self
-            top_indices = np.argsort(sim_row)[-21:-1][::-1]
-            top_scores = sim_row[top_indices]
-            
-            similarity_index[job_idx] = {
-                'similar_jobs': top_indices.tolist(),
-                'similarity_scores': top_scores.tolist()
-            }
-        
-        if (i // batch_size + 1) % 10 == 0:
-            print(f"  Processed {end_idx}/{n_jobs} jobs...")
-        
-        # Clean up memory
-        del similarities
-        gc.collect()
+    # Instead of full similarity matrix, keep top-k neighbours in compact arrays,
+    # built in parallel blocks with argpartition top-k selection
+    similarity_index = build_similarity_index(
+        skills_matrix, top_k=top_k, batch_size=batch_size, n_jobs=n_jobs, score_dtype=score_dtype
+    )
     
-    print(f"✓ Created similarity index for {len(similarity_index)} jobs")
+    neighbors, scores = similarity_index['neighbors'], similarity_index['scores']
+    size_mb = (neighbors.nbytes + scores.nbytes) / (1024*1024)
+    print(f"✓ Created similarity index for {len(neighbors)} jobs ({size_mb:.1f} MB)")
     return similarity_index
 
+def share_training_inputs(df, skills_matrix):
+    """Write the columns and matrix the parallel stages read to memory-mappable files"""
+    shared = SharedArrays()
+    for col in SALARY_FEATURE_COLS + ['Salary']:
+        shared.put(col, df[col].to_numpy())
+    for col in CATEGORICAL_COLUMNS:
+        shared.put(col, df[col].cat.codes.to_numpy(), categories=df[col].cat.categories.tolist())
+    shared.put_sparse('skills_matrix', skills_matrix)
+    return shared
+
+def shared_training_frame(shared):
+    """Training DataFrame rebuilt from the shared columns inside a stage worker"""
+    frame = {col: shared[col] for col in SALARY_FEATURE_COLS + ['Salary']}
+    for col in CATEGORICAL_COLUMNS:
+        frame[col] = pd.Categorical.from_codes(shared[col], shared[f"{col}__meta"]['categories'])
+    return pd.DataFrame(frame)
+
+# Stage entry points for the scheduler: fn(shared, *dependency_outputs, **kwargs)
+
+def salary_stage(shared, backend='forest', n_jobs=1):
+    return train_salary_model(shared_training_frame(shared), backend=backend, n_jobs=n_jobs)
+
+def salary_table_stage(shared, salary_model):
+    return create_salary_table(shared_training_frame(shared), salary_model)
+
+def clusters_stage(shared, n_clusters=15):
+    df = shared_training_frame(shared)
+    kmeans, svd, scaler = create_job_clusters(df, shared['skills_matrix'], n_clusters=n_clusters)
+    return kmeans, svd, scaler, df['cluster'].to_numpy()
+
+def similarity_stage(shared, n_jobs=1):
+    return create_similarity_index(shared['skills_matrix'], batch_size=500, n_jobs=n_jobs)
+
+def sketches_stage(shared):
+    return create_salary_sketches(shared_training_frame(shared))
+
+def embeddings_stage(shared, clusters, dtype='int8'):
+    return create_embedding_index(clusters[1], shared['skills_matrix'], dtype)
+
 def package_model_data(df, tfidf, label_encoders, salary_model, kmeans, svd, scaler, 
-                      skills_matrix, similarity_index):
+                      skills_matrix, similarity_index, salary_sketches=None, salary_table=None,
+                      embedding_index=None):
     """Package all model components"""
     
+    flat_forest = FlatForest.from_sklearn(salary_model)
+    
+    df_sample = df.sample(n=min(10000, len(df)), random_state=42)  # Store sample for insights
+    # Served results read plain strings; the sample is small enough to keep them
+    df_sample = df_sample.astype({col: str for col in COMPACT_COLUMNS})
+    df_sample['job_text'] = job_texts(df_sample)
+    sample_positions = df.index.get_indexer(df_sample.index)
+    
     model_data = {
-        'df_sample': df.sample(n=min(10000, len(df)), random_state=42),  # Store sample for insights
+        'df_sample': df_sample,
+        'df_sample_tfidf': skills_matrix[sample_positions],  # TF-IDF rows aligned with df_sample
+        'df_sample_positions': sample_positions,  # Dataset rows of df_sample (embedding positions)
         'df_meta': {
             'total_jobs': len(df),
             'industries': df['Industry'].unique().tolist(),
@@ -219,16 +520,102 @@ def package_model_data(df, tfidf, label_encoders, salary_model, kmeans, svd, sca
         'tfidf_vectorizer': tfidf,
         'label_encoders': label_encoders,
         'salary_model': salary_model,
+        'salary_table': salary_table.to_state() if salary_table is not None else None,
+        'salary_forest': flat_forest.to_state() if flat_forest is not None else None,
         'kmeans': kmeans,
         'svd': svd,
         'scaler': scaler,
         'similarity_index': similarity_index,
-        'feature_cols': ['Experience Level_encoded', 'Industry_encoded', 'Location_encoded', 
-                        'skills_count', 'title_length']
+        'job_vectors': skills_matrix,  # Corpus vectors for incremental index updates
+        'embedding_index': embedding_index,
+        'salary_sketches': sketches_to_state(salary_sketches or {}),
+        'feature_cols': SALARY_FEATURE_COLS
     }
     
     return model_data
 
+def job_vectors_file(model_path):
+    return f"{os.path.splitext(model_path)[0]}_job_vectors.npz"
+
+def save_model(model_data, filename):
+    """Save the model pickle with the similarity index, embeddings and job vectors as sidecars"""
+    to_pickle = dict(model_data)
+    to_pickle['similarity_index'] = save_similarity_index(model_data['similarity_index'], filename)
+    if isinstance(model_data.get('embedding_index'), QuantizedEmbeddingIndex):
+        to_pickle['embedding_index'] = save_embedding_index(model_data['embedding_index'], filename)
+    
+    job_vectors = to_pickle.pop('job_vectors', None)
+    if job_vectors is not None:
+        vectors_path = job_vectors_file(filename)
+        save_npz(f"{vectors_path}.tmp.npz", job_vectors.tocsr())
+        os.replace(f"{vectors_path}.tmp.npz", vectors_path)
+        to_pickle['job_vectors_file'] = os.path.basename(vectors_path)
+    
+    # Write then rename so a crash mid-dump never leaves a truncated model
+    joblib.dump(to_pickle, f"{filename}.tmp")
+    os.replace(f"{filename}.tmp", filename)
+
+def update_model_similarity(model_path, new_jobs_csv=None, deleted_rows=(), chunksize=100000):
+    """
+    Add and/or delete jobs in a saved model's similarity index without retraining
+    
+    New jobs are appended after the existing job positions; deleted_rows are
+    positions of jobs to drop from the index.
+    """
+    print("🔁 Updating similarity index...")
+    
+    model_data = joblib.load(model_path)
+    if 'job_vectors_file' not in model_data:
+        print("❌ Model has no stored job vectors, run a full training first")
+        return False
+    
+    model_dir = os.path.dirname(os.path.abspath(model_path))
+    job_vectors = load_npz(os.path.join(model_dir, model_data['job_vectors_file'])).tocsr()
+    similarity_index = load_similarity_index(model_data['similarity_index'], model_path)
+    
+    # Positions refer to the saved jobs; ones deleted by an earlier update are skipped
+    deleted_rows = np.unique(np.asarray(deleted_rows, dtype=np.int64))
+    out_of_range = deleted_rows[(deleted_rows < 0) | (deleted_rows >= job_vectors.shape[0])]
+    if len(out_of_range):
+        print(f"❌ Job positions out of range 0-{job_vectors.shape[0] - 1}: {out_of_range.tolist()}")
+        return False
+    if similarity_index.get('deleted') is not None:
+        deleted_rows = deleted_rows[~similarity_index['deleted'][deleted_rows]]
+    
+    new_rows = np.empty(0, dtype=np.int64)
+    if new_jobs_csv:
+        new_df = load_and_preprocess_data(new_jobs_csv, chunksize=chunksize)
+        if new_df is None:
+            return False
+        new_vectors = model_data['tfidf_vectorizer'].transform(job_texts(new_df)).astype(np.float32)
+        new_rows = np.arange(job_vectors.shape[0], job_vectors.shape[0] + len(new_df))
+        job_vectors = vstack([job_vectors, new_vectors]).tocsr()
+        
+        # Embeddings are appended in the same positions as the job vectors
+        embedding_index = load_embedding_index(model_data.get('embedding_index'), model_path)
+        if embedding_index is not None:
+            new_index = QuantizedEmbeddingIndex.from_embeddings(
+                svd_embeddings(model_data['svd'], new_vectors), embedding_index.dtype, keep_exact=True)
+            model_data['embedding_index'] = QuantizedEmbeddingIndex(
+                np.concatenate([embedding_index.codes, new_index.codes]),
+                None if new_index.scales is None else np.concatenate([embedding_index.scales, new_index.scales]),
+                np.concatenate([embedding_index.exact, new_index.exact])
+            )
+        model_data['df_meta']['total_jobs'] += len(new_df)
+    
+    started = time.perf_counter()
+    similarity_index = update_similarity_index(similarity_index, job_vectors, new_rows, deleted_rows)
+    elapsed = time.perf_counter() - started
+    model_data['df_meta']['total_jobs'] -= len(deleted_rows)
+    
+    model_data['similarity_index'] = similarity_index
+    model_data['job_vectors'] = job_vectors
+    save_model(model_data, model_path)
+    
+    print(f"✓ Index updated in {elapsed:.1f}s: {len(new_rows)} added, {len(deleted_rows)} deleted, "
+          f"{len(similarity_index['neighbors'])} positions")
+    return True
+
 def test_model(model_data):
     """Test the trained model"""
     print("\n🧪 Testing model...")
@@ -245,7 +632,7 @@ def test_model(model_data):
         user_vector = tfidf.transform([user_skills])
         
         # Get similarity with sample jobs
-        sample_skills_matrix = tfidf.transform(df_sample['job_text'])
+        sample_skills_matrix = model_data['df_sample_tfidf']
         similarities = cosine_similarity(user_vector, sample_skills_matrix).flatten()
         top_job_idx = np.argmax(similarities)
         
@@ -265,8 +652,8 @@ def test_model(model_data):
             print(f"⚠ Salary prediction test: {e}")
         
         # Test 3: Similar jobs
-        if 0 in similarity_index:
-            similar_jobs = similarity_index[0]['similar_jobs'][:3]
+        if len(similarity_index['neighbors']) > 0:
+            similar_jobs = similarity_index['neighbors'][0][:3]
             print(f"✓ Found {len(similar_jobs)} similar jobs to job 0")
         else:
             print("⚠ Similarity index test: No data for job 0")
@@ -278,49 +665,184 @@ def test_model(model_data):
         print(f"❌ Testing failed: {e}")
         return False
 
-def main():
+def parse_args(argv=None):
+    """Command line options for the trainer"""
+    parser = argparse.ArgumentParser(description="Memory-Efficient Job Recommendation Trainer")
+    parser.add_argument('--csv', default='job_recommendation_dataset.csv', help='Training dataset')
+    parser.add_argument('--output', default='job_recommendation_model.pkl', help='Model file to write')
+    parser.add_argument('--chunksize', type=int, default=100000, help='Rows per CSV chunk')
+    parser.add_argument('--featurizer', choices=['tfidf', 'hashing'], default='tfidf',
+                        help="'tfidf' fits a vocabulary in memory, 'hashing' streams the CSV out-of-core")
+    parser.add_argument('--hash-features', type=int, default=2**16, help='Hashed feature space size')
+    parser.add_argument('--embeddings', choices=EMBEDDING_DTYPES + ['none'], default='int8',
+                        help='Precision of the exported SVD job embeddings')
+    parser.add_argument('--embedding-report', metavar='REPORT', nargs='?', const='embedding_precision.json',
+                        help='Compare float32/float16/int8 embedding search and write a report')
+    parser.add_argument('--cpus', type=int, default=None, help='CPU budget shared by concurrent stages (default: all cores)')
+    parser.add_argument('--n-jobs', type=int, default=-1, help='Worker processes for the similarity index (-1 = whole CPU budget)')
+    parser.add_argument('--salary-backend', choices=SALARY_BACKENDS, default='forest',
+                        help='Salary model: random forest or histogram gradient boosting')
+    parser.add_argument('--compare-salary-backends', metavar='REPORT', nargs='?', const='salary_backends.json',
+                        help='Train every salary backend and write a comparison report')
+    parser.add_argument('--n-clusters', type=int, default=15, help='Number of job clusters')
+    parser.add_argument('--cache-dir', default='.trainer_cache', help='Stage cache directory')
+    parser.add_argument('--no-cache', action='store_true', help='Recompute every stage')
+    parser.add_argument('--cache-keep', type=int, default=2, help='Cache entries kept per stage after a run')
+    parser.add_argument('--add-jobs', metavar='CSV', help='Incrementally add the jobs in CSV to an existing model')
+    parser.add_argument('--delete-jobs', metavar='POSITIONS', default='',
+                        help='Comma-separated job positions to drop from an existing model')
+    return parser.parse_args(argv)
+
+def main(argv=None):
     """Main training function"""
+    args = parse_args(argv)
     print("⚡ Memory-Efficient Job Recommendation Trainer")
     print("Optimized for large datasets (50K+ jobs)")
     print("="*60)
     
+    # Incremental mode: update the saved similarity index and stop
+    if args.add_jobs or args.delete_jobs:
+        deleted_rows = [int(p) for p in args.delete_jobs.split(',') if p.strip()]
+        update_model_similarity(args.output, args.add_jobs, deleted_rows, chunksize=args.chunksize)
+        return
+    
+    # Each stage's output is cached on disk keyed by its inputs, parameters and code
+    cache = StageCache(args.cache_dir, enabled=not args.no_cache)
+    
+    if not os.path.exists(args.csv):
+        print(f"❌ Error: {args.csv} not found!")
+        return
+    
     # Step 1: Load and preprocess
-    df = load_and_preprocess_data('job_recommendation_dataset.csv')
+    df, load_key = cache.run(
+        'load', lambda: load_and_preprocess_data(args.csv, chunksize=args.chunksize),
+        params={'csv': file_fingerprint(args.csv), 'dtypes': DATASET_DTYPES, 'categorical': CATEGORICAL_COLUMNS,
+                'compact': COMPACT_COLUMNS},
+        code=[load_and_preprocess_data, iter_job_chunks, prepare_chunk, concat_chunks]
+    )
     if df is None:
         return
     
     # Step 2: Create TF-IDF features
-    tfidf, skills_matrix = create_tfidf_features(df, max_features=2000)
+    def build_features():
+        if args.featurizer == 'hashing':
+            # Re-stream the CSV for both passes instead of holding extra copies of the text
+            return create_hashed_tfidf_features(
+                lambda: (job_texts(chunk) for _, chunk in iter_job_chunks(args.csv, args.chunksize)),
+                n_features=args.hash_features
+            )
+        return create_tfidf_features(df, max_features=2000)
+    
+    # Only the chosen featurizer's settings key the stage, so unused flags cannot invalidate it
+    if args.featurizer == 'hashing':
+        features_params = {'featurizer': 'hashing', 'hash_features': args.hash_features}
+    else:
+        features_params = {'featurizer': 'tfidf', 'max_features': 2000}
+    
+    (tfidf, skills_matrix), features_key = cache.run(
+        'features', build_features,
+        params=features_params,
+        inputs=[load_key],
+        code=[create_tfidf_features, create_hashed_tfidf_features, iter_job_chunks, prepare_chunk, job_texts,
+              iter_job_texts]
+    )
     
     # Step 3: Encode categorical features
-    label_encoders = encode_categorical_features(df)
+    encoded_cols = [f'{col}_encoded' for col in CATEGORICAL_COLUMNS]
     
-    # Step 4: Train salary model
-    salary_model = train_salary_model(df)
+    def encode():
+        label_encoders = encode_categorical_features(df)
+        return label_encoders, df[encoded_cols]
     
-    # Step 5: Create clusters
-    kmeans, svd, scaler = create_job_clusters(df, skills_matrix)
-    
-    # Step 6: Create similarity index (memory-efficient)
-    similarity_index = create_similarity_index(skills_matrix, batch_size=500)
+    (label_encoders, encoded), encode_key = cache.run(
+        'encode', encode, params={'categorical': CATEGORICAL_COLUMNS}, inputs=[load_key],
+        code=[encode_categorical_features]
+    )
+    df[encoded_cols] = encoded
+    
+    if args.compare_salary_backends:
+        compare_salary_backends(df, report_path=args.compare_salary_backends)
+    
+    # Steps 4-7: salary model, clusters, similarity index, sketches and embeddings
+    # only depend on the loaded data, so independent ones run concurrently
+    cpu_budget = args.cpus or os.cpu_count() or 1
+    shared = share_training_inputs(df, skills_matrix)
+    scheduler = StageScheduler(cache, shared, cpu_budget=cpu_budget)
+    
+    # Stages reading the shared training frame also depend on how it is rebuilt;
+    # helper modules are hashed whole, so edits to their internals invalidate too
+    frame_code = [share_training_inputs, shared_training_frame]
+    frame_params = {'columns': SALARY_FEATURE_COLS, 'categorical': CATEGORICAL_COLUMNS}
+    
+    # The similarity index is the longest stage: start it first, leaving a CPU
+    # each for the salary model and clustering when the budget allows
+    scheduler.add(Stage(
+        'similarity', similarity_stage, cpus=max(1, cpu_budget - 2) if args.n_jobs < 1 else args.n_jobs,
+        params={'top_k': 20}, inputs=[features_key],
+        code=[similarity_stage, create_similarity_index, similarity_module]
+    ))
+    scheduler.add(Stage(
+        'salary', salary_stage, kwargs={'backend': args.salary_backend}, cpus=2,
+        params={'backend': args.salary_backend, **frame_params}, inputs=[load_key, encode_key],
+        code=[salary_stage, train_salary_model, make_salary_model] + frame_code
+    ))
+    scheduler.add(Stage(
+        'salary_table', salary_table_stage, deps=['salary'], params=frame_params, inputs=[load_key, encode_key],
+        code=[salary_table_stage, create_salary_table, salary_predictor] + frame_code
+    ))
+    scheduler.add(Stage(
+        'clusters', clusters_stage, kwargs={'n_clusters': args.n_clusters},
+        params={'n_clusters': args.n_clusters, **frame_params}, inputs=[load_key, features_key, encode_key],
+        code=[clusters_stage, create_job_clusters] + frame_code
+    ))
+    scheduler.add(Stage(
+        'sketches', sketches_stage, params=frame_params, inputs=[load_key],
+        code=[sketches_stage, create_salary_sketches, salary_sketch] + frame_code
+    ))
+    if args.embeddings != 'none' and not args.embedding_report:
+        scheduler.add(Stage(
+            'embeddings', embeddings_stage, deps=['clusters'], kwargs={'dtype': args.embeddings},
+            params={'dtype': args.embeddings}, inputs=[features_key],
+            code=[embeddings_stage, create_embedding_index, svd_embeddings, embedding_module]
+        ))
     
-    # Step 7: Package model
+    try:
+        outputs, _ = scheduler.run()
+    finally:
+        shared.cleanup()
+    
+    salary_model = outputs['salary']
+    salary_table = outputs['salary_table']
+    kmeans, svd, scaler, cluster_labels = outputs['clusters']
+    df['cluster'] = cluster_labels
+    similarity_index = outputs['similarity']
+    salary_sketches = outputs['sketches']
+    embedding_index = outputs.get('embeddings')
+    
+    if args.embeddings != 'none' and args.embedding_report:
+        # The report is a side effect, so it bypasses the cache
+        embedding_index = create_embedding_index(svd, skills_matrix, args.embeddings, args.embedding_report)
+    cache.report()
+    cache.prune(args.cache_keep)
+    
+    # Step 8: Package model
     print("\n📦 Packaging model...")
     model_data = package_model_data(df, tfidf, label_encoders, salary_model, 
-                                   kmeans, svd, scaler, skills_matrix, similarity_index)
+                                   kmeans, svd, scaler, skills_matrix, similarity_index,
+                                   salary_sketches, salary_table, embedding_index)
     
-    # Step 8: Save model
+    # Step 9: Save model
     print("💾 Saving model...")
-    filename = 'job_recommendation_model.pkl'
+    filename = args.output
     try:
-        joblib.dump(model_data, filename)
+        save_model(model_data, filename)
         size_mb = os.path.getsize(filename) / (1024*1024)
         print(f"✓ Model saved: {filename} ({size_mb:.1f} MB)")
     except Exception as e:
         print(f"❌ Save failed: {e}")
         return
     
-    # Step 9: Test model
+    # Step 10: Test model
     if test_model(model_data):
         print("\n🎉 SUCCESS! Memory-efficient model is ready!")
         print(f"\n📊 Model stats:")
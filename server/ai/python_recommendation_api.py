@@ -19,8 +19,8 @@ class RecommendationAPIWrapper:
             self.api = None
             self.is_ready = False
     
-    def get_recommendations(self, user_preferences, top_n=20):
-        """Get job recommendations for a user"""
+    def get_recommendations(self, user_preferences, top_n=20, layout='node'):
+        """Get job recommendations for a user (layout 'node' or 'columnar')"""
         try:
             if not self.is_ready:
                 return {"error": "Model not ready", "recommendations": []}
@@ -28,16 +28,13 @@ class RecommendationAPIWrapper:
             # Convert Node.js preferences to Python format
             processed_prefs = self.process_user_preferences(user_preferences)
             
-            # Get recommendations from AI model
-            recommendations = self.api.get_job_recommendations(processed_prefs, top_n)
-            
-            # Format for Node.js consumption
-            formatted_recs = self.format_recommendations(recommendations)
+            # Get recommendations from AI model, already in the Node.js schema
+            recommendations = self.api.get_job_recommendations(processed_prefs, top_n, layout=layout)
             
             return {
                 "success": True,
-                "count": len(formatted_recs),
-                "recommendations": formatted_recs,
+                "count": self.result_count(recommendations),
+                "recommendations": recommendations,
                 "user_preferences": processed_prefs
             }
             
@@ -66,6 +63,25 @@ class RecommendationAPIWrapper:
             print(error_msg, file=sys.stderr)
             return {"error": error_msg, "predicted_salary": None}
     
+    def predict_salaries(self, jobs_details):
+        """Predict salaries for a batch of jobs"""
+        try:
+            if not self.is_ready:
+                return {"error": "Model not ready", "predicted_salaries": []}
+            
+            predicted = self.api.predict_salaries(jobs_details)
+            
+            return {
+                "success": True,
+                "predicted_salaries": predicted,
+                "count": len(predicted)
+            }
+            
+        except Exception as e:
+            error_msg = f"Error predicting salaries: {str(e)}"
+            print(error_msg, file=sys.stderr)
+            return {"error": error_msg, "predicted_salaries": []}
+    
     def get_market_insights(self, filters=None):
         """Get market insights"""
         try:
@@ -85,19 +101,18 @@ class RecommendationAPIWrapper:
             print(error_msg, file=sys.stderr)
             return {"error": error_msg, "insights": {}}
     
-    def get_trending_jobs(self, top_n=10):
+    def get_trending_jobs(self, top_n=10, layout='node'):
         """Get trending jobs"""
         try:
             if not self.is_ready:
                 return {"error": "Model not ready", "trending_jobs": []}
             
-            trending = self.api.get_trending_jobs(top_n)
-            formatted_trending = self.format_recommendations(trending)
+            trending = self.api.get_trending_jobs(top_n, layout=layout)
             
             return {
                 "success": True,
-                "count": len(formatted_trending),
-                "trending_jobs": formatted_trending
+                "count": self.result_count(trending),
+                "trending_jobs": trending
             }
             
         except Exception as e:
@@ -105,19 +120,18 @@ class RecommendationAPIWrapper:
             print(error_msg, file=sys.stderr)
             return {"error": error_msg, "trending_jobs": []}
     
-    def get_similar_jobs(self, job_index, top_n=5):
+    def get_similar_jobs(self, job_index, top_n=5, layout='node'):
         """Get similar jobs"""
         try:
             if not self.is_ready:
                 return {"error": "Model not ready", "similar_jobs": []}
             
-            similar = self.api.get_similar_jobs(int(job_index), top_n)
-            formatted_similar = self.format_recommendations(similar)
+            similar = self.api.get_similar_jobs(int(job_index), top_n, layout=layout)
             
             return {
                 "success": True,
-                "count": len(formatted_similar),
-                "similar_jobs": formatted_similar
+                "count": self.result_count(similar),
+                "similar_jobs": similar
             }
             
         except Exception as e:
@@ -162,32 +176,12 @@ class RecommendationAPIWrapper:
         
         return processed
     
-    def format_recommendations(self, recommendations):
-        """Format recommendations for Node.js consumption"""
-        formatted = []
-        
-        for rec in recommendations:
-            if isinstance(rec, dict):
-                formatted_rec = {
-                    'job_title': rec.get('job_title', ''),
-                    'company': rec.get('company', ''),
-                    'location': rec.get('location', ''),
-                    'experience_level': rec.get('experience_level', ''),
-                    'salary': rec.get('salary', 0),
-                    'industry': rec.get('industry', ''),
-                    'required_skills': rec.get('required_skills', ''),
-                    'similarity_score': rec.get('similarity_score', 0.0),
-                    'cluster': rec.get('cluster', 0),
-                    'trend_score': rec.get('trend_score', 0.0),
-                    'ai_metadata': {
-                        'source': 'ai_model',
-                        'confidence': rec.get('similarity_score', 0.0),
-                        'cluster_id': rec.get('cluster', 0)
-                    }
-                }
-                formatted.append(formatted_rec)
-        
-        return formatted
+    @staticmethod
+    def result_count(results):
+        """Number of results in either the row or the columnar layout"""
+        if isinstance(results, dict):
+            return results.get('count', 0)
+        return len(results)
 
 def main():
     """Main function to handle command line arguments"""
@@ -206,8 +200,9 @@ def main():
             
             user_prefs = json.loads(sys.argv[2])
             top_n = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+            layout = sys.argv[4] if len(sys.argv) > 4 else 'node'
             
-            result = wrapper.get_recommendations(user_prefs, top_n)
+            result = wrapper.get_recommendations(user_prefs, top_n, layout)
             print(json.dumps(result))
         
         elif command == "predict_salary":
@@ -219,6 +214,15 @@ def main():
             result = wrapper.predict_salary(job_details)
             print(json.dumps(result))
         
+        elif command == "predict_salaries":
+            if len(sys.argv) < 3:
+                print(json.dumps({"error": "Missing job list for salary prediction"}))
+                return
+            
+            jobs_details = json.loads(sys.argv[2])
+            result = wrapper.predict_salaries(jobs_details)
+            print(json.dumps(result))
+        
         elif command == "get_insights":
             filters = json.loads(sys.argv[2]) if len(sys.argv) > 2 else {}
             result = wrapper.get_market_insights(filters)
@@ -226,7 +230,8 @@ def main():
         
         elif command == "get_trending":
             top_n = int(sys.argv[2]) if len(sys.argv) > 2 else 10
-            result = wrapper.get_trending_jobs(top_n)
+            layout = sys.argv[3] if len(sys.argv) > 3 else 'node'
+            result = wrapper.get_trending_jobs(top_n, layout)
             print(json.dumps(result))
         
         elif command == "get_similar":
@@ -236,7 +241,8 @@ def main():
             
             job_index = sys.argv[2]
             top_n = int(sys.argv[3]) if len(sys.argv) > 3 else 5
-            result = wrapper.get_similar_jobs(job_index, top_n)
+            layout = sys.argv[4] if len(sys.argv) > 4 else 'node'
+            result = wrapper.get_similar_jobs(job_index, top_n, layout)
             print(json.dumps(result))
         
         elif command == "health_check":
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Fast Salary Predictors
+Precomputed lookup table and flattened forest for salary prediction
+"""
+
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Cap on table entries (combinations x skills values x title lengths)
+MAX_TABLE_CELLS = 8 * 1024 * 1024
+
+
+class SalaryLookupTable:
+    """Dense table of salary predictions for every observed category combination
+
+    The salary model's inputs are three label-encoded categoricals plus
+    skills_count and title_length, both small integers. The table holds the
+    model's prediction (already truncated to int, as predict_salary returns
+    it) for each observed (experience, industry, location) code triple and
+    each skills_count / title_length inside the clamped training ranges.
+    Anything outside returns None so the caller can fall back to the model.
+    """
+
+    def __init__(self, combo_codes, skills_range, title_range, table):
+        self.combo_codes = np.asarray(combo_codes, dtype=np.int32)
+        self.skills_range = tuple(int(v) for v in skills_range)
+        self.title_range = tuple(int(v) for v in title_range)
+        self.table = np.asarray(table, dtype=np.int32)
+        self._combo_row = {tuple(codes): row for row, codes in enumerate(self.combo_codes.tolist())}
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes + self.combo_codes.nbytes
+
+    @classmethod
+    def build(cls, model, encoded, skills_count, title_length, clip_quantile=0.999, batch_size=500000):
+        """
+        Enumerate the feature space and predict every cell with the model
+
+        Args:
+            model: fitted regressor over [exp, ind, loc, skills_count, title_length]
+            encoded: (n, 3) array of the encoded category columns
+            skills_count, title_length: training values used to pick the ranges
+            clip_quantile: upper quantile the integer ranges are clamped to
+
+        Returns:
+            SalaryLookupTable, or None if the table would exceed MAX_TABLE_CELLS
+        """
+        combo_codes = np.unique(np.asarray(encoded, dtype=np.int32), axis=0)
+        skills_range = (int(np.min(skills_count)), int(np.quantile(skills_count, clip_quantile)))
+        title_range = (int(np.min(title_length)), int(np.quantile(title_length, clip_quantile)))
+
+        n_skills = skills_range[1] - skills_range[0] + 1
+        n_titles = title_range[1] - title_range[0] + 1
+        n_cells = len(combo_codes) * n_skills * n_titles
+        if n_cells > MAX_TABLE_CELLS:
+            return None
+
+        # Grid rows in table order: combo, then skills_count, then title_length
+        skills_values = np.arange(skills_range[0], skills_range[1] + 1)
+        title_values = np.arange(title_range[0], title_range[1] + 1)
+        per_combo = np.column_stack([
+            np.repeat(skills_values, n_titles),
+            np.tile(title_values, n_skills)
+        ])
+
+        table = np.empty(n_cells, dtype=np.int32)
+        combos_per_batch = max(1, batch_size // len(per_combo))
+        for start in range(0, len(combo_codes), combos_per_batch):
+            combos = combo_codes[start:start + combos_per_batch]
+            grid = np.hstack([
+                np.repeat(combos, len(per_combo), axis=0),
+                np.tile(per_combo, (len(combos), 1))
+            ]).astype(np.float64)
+            offset = start * len(per_combo)
+            table[offset:offset + len(grid)] = model.predict(grid).astype(np.int64)
+
+        return cls(combo_codes, skills_range, title_range, table.reshape(len(combo_codes), n_skills, n_titles))
+
+    def lookup(self, exp_code, ind_code, loc_code, skills_count, title_length):
+        """Predicted salary, or None when the input is outside the table"""
+        row = self._combo_row.get((exp_code, ind_code, loc_code))
+        if row is None:
+            return None
+        s = skills_count - self.skills_range[0]
+        t = title_length - self.title_range[0]
+        if not (0 <= s < self.table.shape[1] and 0 <= t < self.table.shape[2]):
+            return None
+        return int(self.table[row, s, t])
+
+    def to_state(self):
+        """Plain-data representation so pickles do not depend on this module"""
+        return {
+            'combo_codes': self.combo_codes,
+            'skills_range': self.skills_range,
+            'title_range': self.title_range,
+            'table': self.table
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        if not state:
+            return None
+        return cls(state['combo_codes'], state['skills_range'], state['title_range'], state['table'])
+
+
+class FlatForest:
+    """Random forest exported to flat NumPy node arrays
+
+    All trees are concatenated into one set of (feature, threshold, left,
+    right, value) arrays. Prediction walks every (row, tree) pair one level
+    per step with vectorised gathers, avoiding sklearn's per-call input
+    validation and thread dispatch, which dominate for small batches.
+    Leaves point at themselves, so extra steps are no-ops.
+    """
+
+    def __init__(self, feature, threshold, left, right, value, roots, max_depth, n_features):
+        # Native index width so take() does not convert on every call
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.roots = np.asarray(roots, dtype=np.intp)
+        self.max_depth = int(max_depth)
+        self.n_features = int(n_features)
+
+    @classmethod
+    def from_sklearn(cls, model):
+        """
+        Flatten a fitted RandomForestRegressor (or any averaged tree ensemble)
+
+        Returns:
+            FlatForest, or None for models without sklearn decision trees
+        """
+        estimators = getattr(model, 'estimators_', None)
+        if not estimators or not hasattr(estimators[0], 'tree_'):
+            return None
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        for estimator in estimators:
+            tree = estimator.tree_
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            features.append(np.where(is_leaf, 0, tree.feature))
+            thresholds.append(tree.threshold)
+            lefts.append(np.where(is_leaf, nodes, tree.children_left) + offset)
+            rights.append(np.where(is_leaf, nodes, tree.children_right) + offset)
+            values.append(tree.value[:, 0, 0])
+            roots.append(offset)
+            offset += tree.node_count
+
+        return cls(
+            np.concatenate(features), np.concatenate(thresholds),
+            np.concatenate(lefts), np.concatenate(rights), np.concatenate(values),
+            roots, max(e.tree_.max_depth for e in estimators), model.n_features_in_
+        )
+
+    def predict(self, X):
+        """Predictions for a 2-D batch, matching model.predict"""
+        # sklearn trees compare float32 inputs against float64 thresholds
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        n_rows = len(X)
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_rows, dtype=np.intp) * X.shape[1])[:, None]
+
+        nodes = np.broadcast_to(self.roots, (n_rows, len(self.roots)))
+        for _ in range(self.max_depth):
+            x = flat_X.take(row_offsets + self.feature.take(nodes))
+            nodes = np.where(x <= self.threshold.take(nodes), self.left.take(nodes), self.right.take(nodes))
+
+        # Sum tree by tree in order, as sklearn accumulates, then average
+        leaf_values = self.value.take(nodes)
+        total = np.zeros(n_rows, dtype=np.float64)
+        for t in range(leaf_values.shape[1]):
+            total += leaf_values[:, t]
+        return total / leaf_values.shape[1]
+
+    @property
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left, self.right, self.value, self.roots))
+
+    def to_state(self):
+        """Plain-data representation so pickles do not depend on this module"""
+        return {
+            'feature': self.feature.astype(np.int32),
+            'threshold': self.threshold,
+            'left': self.left.astype(np.int32),
+            'right': self.right.astype(np.int32),
+            'value': self.value,
+            'roots': self.roots.astype(np.int32),
+            'max_depth': self.max_depth,
+            'n_features': self.n_features
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        if not state:
+            return None
+        return cls(**state)
+
+
+class SalaryPredictor:
+    """Salary predictions from a trained model's data
+
+    Encodes job details with the model's label encoders, answers from the
+    lookup table where it covers the input, and sends the remaining rows
+    through the flattened forest in one batch (the sklearn model only for
+    backends that cannot be flattened).
+    """
+
+    FEATURE_COLUMNS = ('Experience Level', 'Industry', 'Location')
+    DETAIL_KEYS = ('experience', 'industry', 'location')
+
+    def __init__(self, label_encoders, model, table=None, forest=None):
+        # Label encoder class -> code dicts, so predictions skip transform()
+        self.codes = {
+            col: {value: code for code, value in enumerate(encoder.classes_)}
+            for col, encoder in label_encoders.items()
+        }
+        self.model = model
+        self.table = table
+        self.forest = forest
+
+    @classmethod
+    def from_model_data(cls, model_data):
+        """Predictor for a loaded model pickle; older models are flattened here"""
+        return cls(
+            model_data['label_encoders'], model_data['salary_model'],
+            SalaryLookupTable.from_state(model_data.get('salary_table')),
+            FlatForest.from_state(model_data.get('salary_forest')) or FlatForest.from_sklearn(model_data['salary_model'])
+        )
+
+    def features(self, job_details):
+        """Encoded [exp, ind, loc, skills_count, title_length] row, or None for unknown categories"""
+        row = []
+        for col, key in zip(self.FEATURE_COLUMNS, self.DETAIL_KEYS):
+            code = self.codes[col].get(job_details[key])
+            if code is None:
+                # Per row and expected for new categories, so only logged at debug level
+                logger.debug("Unknown %s: %s", col.lower(), job_details[key])
+                return None
+            row.append(code)
+
+        skills = job_details.get('skills')
+        row.append(skills.count(',') + 1 if skills else 1)
+        row.append(len(job_details.get('title', '')))
+        return row
+
+    def predict_rows(self, rows):
+        """Model predictions for a batch of feature rows"""
+        if self.forest is not None:
+            return self.forest.predict(rows)
+        return self.model.predict(np.asarray(rows))
+
+    def predict(self, jobs_details):
+        """
+        Predicted salaries for a list of job_details dicts
+
+        Returns:
+            List of ints, None where a category is unknown
+        """
+        predictions = [None] * len(jobs_details)
+        pending, pending_rows = [], []
+
+        for i, job_details in enumerate(jobs_details):
+            row = self.features(job_details)
+            if row is None:
+                continue
+            if self.table is not None:
+                predictions[i] = self.table.lookup(*row)
+            if predictions[i] is None:
+                pending.append(i)
+                pending_rows.append(row)
+
+        if pending:
+            for i, value in zip(pending, self.predict_rows(pending_rows)):
+                predictions[i] = int(value)
+
+        return predictions
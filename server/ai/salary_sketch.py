@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Salary Quantile Sketches
+Mergeable KLL sketches for salary percentiles per category cell
+"""
+
+import math
+import random
+import numpy as np
+
+# Category columns that define a sketch cell
+SKETCH_CELL_COLS = ['Experience Level', 'Industry', 'Location']
+
+
+class SalaryQuantileSketch:
+    """KLL quantile sketch over salary values
+
+    Keeps O(k log(n/k)) values instead of the raw salaries. Sketches can be
+    updated one value or one batch at a time and merged with each other, so
+    per-cell sketches can be combined at query time for any filter.
+    """
+
+    def __init__(self, k=200, seed=42):
+        self.k = k
+        self.compactors = [np.empty(0, dtype=np.float64)]
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._rng = random.Random(seed)
+        self._update_max_size()
+
+    def _capacity(self, level):
+        """Number of items a level may hold before it is compacted"""
+        depth = len(self.compactors) - level - 1
+        return int(math.ceil(self.k * (2.0 / 3.0) ** depth)) + 1
+
+    def _update_max_size(self):
+        self.max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    @property
+    def size(self):
+        return sum(len(c) for c in self.compactors)
+
+    def update(self, value):
+        """Add a single salary to the sketch"""
+        self.update_many([value])
+
+    def update_many(self, values):
+        """Add a batch of salaries to the sketch"""
+        values = np.asarray(values, dtype=np.float64).ravel()
+        if len(values) == 0:
+            return
+
+        self.count += len(values)
+        self.total += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        self.compactors[0] = np.concatenate([self.compactors[0], values])
+        self._compress()
+
+    def merge(self, other):
+        """Merge another sketch into this one (in place)"""
+        if other.count == 0:
+            return self
+
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append(np.empty(0, dtype=np.float64))
+        for h, items in enumerate(other.compactors):
+            self.compactors[h] = np.concatenate([self.compactors[h], items])
+
+        self.count += other.count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+        self._update_max_size()
+        self._compress()
+        return self
+
+    def _compress(self):
+        """Compact full levels until the sketch fits its size budget"""
+        while self.size >= self.max_size:
+            for h in range(len(self.compactors)):
+                items = self.compactors[h]
+                if len(items) < self._capacity(h):
+                    continue
+
+                if h + 1 >= len(self.compactors):
+                    self.compactors.append(np.empty(0, dtype=np.float64))
+                    self._update_max_size()
+
+                items = np.sort(items)
+                # Keep the odd one out at this level so pairs stay balanced
+                leftover = items[-1:] if len(items) % 2 else items[:0]
+                paired = items[:len(items) - len(leftover)]
+                offset = self._rng.randint(0, 1)
+
+                self.compactors[h + 1] = np.concatenate([self.compactors[h + 1], paired[offset::2]])
+                self.compactors[h] = leftover.copy()
+
+                # Lazy compaction: stop as soon as we are under budget
+                if self.size < self.max_size:
+                    break
+
+    def quantiles(self, qs):
+        """Approximate quantiles for the given fractions (0..1)"""
+        if self.count == 0:
+            return [None for _ in qs]
+
+        values = np.concatenate(self.compactors)
+        weights = np.concatenate([
+            np.full(len(c), 2 ** h, dtype=np.float64) for h, c in enumerate(self.compactors)
+        ])
+        order = np.argsort(values, kind='stable')
+        values = values[order]
+        cumulative = np.cumsum(weights[order])
+        cumulative /= cumulative[-1]
+
+        result = []
+        for q in qs:
+            if q <= 0:
+                result.append(self.min)
+            elif q >= 1:
+                result.append(self.max)
+            else:
+                pos = min(int(np.searchsorted(cumulative, q)), len(values) - 1)
+                result.append(float(values[pos]))
+        return result
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def to_state(self):
+        """Plain-data representation so pickles do not depend on this module"""
+        return {
+            'k': self.k,
+            'compactors': [c.astype(np.float32) for c in self.compactors],
+            'count': self.count,
+            'total': self.total,
+            'min': self.min,
+            'max': self.max
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(k=state['k'])
+        sketch.compactors = [np.asarray(c, dtype=np.float64) for c in state['compactors']]
+        sketch.count = state['count']
+        sketch.total = state['total']
+        sketch.min = state['min']
+        sketch.max = state['max']
+        sketch._update_max_size()
+        return sketch
+
+
+def build_salary_sketches(df, sketches=None, k=200):
+    """
+    Build (or update) salary sketches keyed by (experience, industry, location)
+
+    Args:
+        df: DataFrame with 'Salary' and the SKETCH_CELL_COLS columns
+        sketches: existing {cell: SalaryQuantileSketch} to update (optional)
+        k: sketch accuracy parameter for newly created cells
+
+    Returns:
+        Dict of {cell: SalaryQuantileSketch}
+    """
+    if sketches is None:
+        sketches = {}
+
+    grouped = df.groupby(SKETCH_CELL_COLS, observed=True, sort=False)['Salary']
+    for cell, salaries in grouped:
+        cell = tuple(str(v) for v in cell)
+        if cell not in sketches:
+            sketches[cell] = SalaryQuantileSketch(k=k)
+        sketches[cell].update_many(salaries.to_numpy())
+
+    return sketches
+
+
+def sketches_to_state(sketches):
+    return {cell: sketch.to_state() for cell, sketch in sketches.items()}
+
+
+def sketches_from_state(state):
+    return {cell: SalaryQuantileSketch.from_state(s) for cell, s in state.items()}
+
+
+def merge_salary_sketches(sketches, experience=None, industry=None, location=None):
+    """
+    Merge the cell sketches that match the given filters
+
+    Returns:
+        (merged SalaryQuantileSketch, {cell: count} of the matching cells)
+    """
+    merged = SalaryQuantileSketch()
+    cell_counts = {}
+
+    for cell, sketch in sketches.items():
+        exp, ind, loc = cell
+        if experience is not None and exp != experience:
+            continue
+        if industry is not None and ind != industry:
+            continue
+        if location is not None and loc != location:
+            continue
+
+        merged.merge(sketch)
+        cell_counts[cell] = sketch.count
+
+    return merged, cell_counts
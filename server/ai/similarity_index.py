@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""
+Compact Similarity Index
+Top-k neighbour arrays stored as int32/float16 and loadable by memory map
+"""
+
+import os
+import time
+import shutil
+import tempfile
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from sklearn.preprocessing import normalize
+from sklearn.utils.extmath import safe_sparse_dot
+
+DEFAULT_TOP_K = 20
+
+# Cap on the dense (rows x n_jobs) similarity block a worker holds at once
+MAX_BLOCK_ELEMENTS = 32 * 1024 * 1024
+
+# Below this many jobs per worker, process start-up costs more than it saves
+MIN_JOBS_PER_WORKER = 10000
+
+
+def allocate_similarity_index(n_jobs, top_k=DEFAULT_TOP_K, score_dtype=np.float16):
+    """Preallocate an empty index (-1 marks a missing neighbour)"""
+    return {
+        'neighbors': np.full((n_jobs, top_k), -1, dtype=np.int32),
+        'scores': np.zeros((n_jobs, top_k), dtype=score_dtype)
+    }
+
+
+def top_k_neighbors(similarities, top_k, exclude=None):
+    """
+    Best-first top-k columns of each row using argpartition (no full sort)
+
+    Args:
+        similarities: dense (rows, n_jobs) score block (modified if exclude is set)
+        top_k: neighbours to keep per row
+        exclude: per-row column to skip, e.g. the job itself
+
+    Returns:
+        (indices, scores) arrays of shape (rows, k) with k <= top_k
+    """
+    if exclude is not None:
+        similarities[np.arange(len(exclude)), exclude] = -np.inf
+
+    n_candidates = similarities.shape[1] - (1 if exclude is not None else 0)
+    k = max(min(top_k, n_candidates), 0)
+    if k == 0:
+        empty = np.empty((similarities.shape[0], 0))
+        return empty.astype(np.int32), empty
+
+    if k < similarities.shape[1]:
+        part = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+    else:
+        part = np.tile(np.arange(k), (similarities.shape[0], 1))
+    part_scores = np.take_along_axis(similarities, part, axis=1)
+
+    order = np.argsort(-part_scores, axis=1, kind='stable')
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def _score_block(normalized_matrix, start, end, neighbors, scores):
+    """Score rows [start, end) against the corpus and write their top-k in place"""
+    similarities = safe_sparse_dot(normalized_matrix[start:end], normalized_matrix.T, dense_output=True)
+    similarities = np.asarray(similarities.todense() if hasattr(similarities, 'todense') else similarities)
+
+    indices, top_scores = top_k_neighbors(similarities, neighbors.shape[1], exclude=np.arange(start, end))
+    k = indices.shape[1]
+    neighbors[start:end, :k] = indices
+    scores[start:end, :k] = top_scores
+    return end - start
+
+
+def build_similarity_index(skills_matrix, top_k=DEFAULT_TOP_K, batch_size=1000, n_jobs=-1,
+                           score_dtype=np.float16, report_every=0.1):
+    """
+    Build the top-k cosine neighbour index with blocks spread over processes
+
+    Blocks are scored by a joblib process pool; the corpus matrix is shared
+    with the workers through joblib's automatic memory mapping and every
+    worker writes its rows straight into memory-mapped output arrays.
+
+    Returns:
+        Index dict with in-memory 'neighbors' and 'scores' arrays
+    """
+    n_rows = skills_matrix.shape[0]
+    n_workers = max(1, min(effective_n_jobs(n_jobs), n_rows // MIN_JOBS_PER_WORKER))
+
+    # Rows are L2-normalised once so each block is a plain sparse product
+    normalized = normalize(skills_matrix.tocsr(), norm='l2', copy=True).astype(np.float32)
+    block_rows = max(1, min(batch_size, MAX_BLOCK_ELEMENTS // max(n_rows, 1)))
+    starts = list(range(0, n_rows, block_rows))
+
+    print(f"Processing {n_rows} jobs in {len(starts)} blocks of {block_rows} on {n_workers} worker(s)...")
+
+    temp_dir = tempfile.mkdtemp(prefix='similarity_index_')
+    try:
+        neighbors = np.lib.format.open_memmap(
+            os.path.join(temp_dir, 'neighbors.npy'), mode='w+', dtype=np.int32, shape=(n_rows, top_k))
+        scores = np.lib.format.open_memmap(
+            os.path.join(temp_dir, 'scores.npy'), mode='w+', dtype=score_dtype, shape=(n_rows, top_k))
+        neighbors[:] = -1
+        scores[:] = 0
+
+        started = time.perf_counter()
+        done, next_report = 0, report_every
+
+        tasks = (delayed(_score_block)(normalized, start, min(start + block_rows, n_rows), neighbors, scores)
+                 for start in starts)
+        if n_workers == 1:
+            completed = (task[0](*task[1], **task[2]) for task in tasks)
+        else:
+            completed = Parallel(n_jobs=n_workers, return_as='generator_unordered')(tasks)
+
+        for rows in completed:
+            done += rows
+            if n_rows and done / n_rows >= next_report:
+                elapsed = time.perf_counter() - started
+                rate = done / elapsed if elapsed else float('inf')
+                eta = (n_rows - done) / rate if rate else 0
+                print(f"  Processed {done}/{n_rows} jobs ({rate:,.0f} jobs/s, ETA {eta:.0f}s)")
+                next_report += report_every
+
+        elapsed = time.perf_counter() - started
+        print(f"  Throughput: {n_rows / elapsed if elapsed else 0:,.0f} jobs/s over {elapsed:.1f}s")
+
+        # Copy out of the temporary files before they are removed
+        return {'neighbors': np.array(neighbors), 'scores': np.array(scores)}
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def update_similarity_index(similarity_index, corpus_matrix, new_rows=(), deleted_rows=(), batch_size=1000):
+    """
+    Update the index for added and deleted jobs without a full O(n^2) rebuild
+
+    - new jobs are scored against the live corpus and get their own top-k
+    - existing jobs take a new job into their list when it beats their k-th score
+    - deleted jobs lose their list and are never returned as neighbours;
+      only the jobs that listed a deleted job are re-scored
+
+    Args:
+        similarity_index: dict with 'neighbors' and 'scores' (optionally 'deleted')
+        corpus_matrix: vectors for every job position, including appended rows
+        new_rows: positions of the newly added jobs
+        deleted_rows: positions of jobs removed from the catalog
+
+    Returns:
+        New index dict with 'neighbors', 'scores' and a 'deleted' mask
+    """
+    n_rows = corpus_matrix.shape[0]
+    old_neighbors = similarity_index['neighbors']
+    n_old, top_k = old_neighbors.shape
+    score_dtype = similarity_index['scores'].dtype
+
+    # Writable copies grown to the new corpus size (the index may be a read-only memmap)
+    neighbors = np.full((n_rows, top_k), -1, dtype=np.int32)
+    scores = np.zeros((n_rows, top_k), dtype=score_dtype)
+    neighbors[:n_old] = old_neighbors
+    scores[:n_old] = similarity_index['scores']
+
+    deleted = np.zeros(n_rows, dtype=bool)
+    if similarity_index.get('deleted') is not None:
+        deleted[:n_old] = similarity_index['deleted']
+    deleted_rows = np.asarray(deleted_rows, dtype=np.int64)
+    deleted[deleted_rows] = True
+    neighbors[deleted] = -1
+    scores[deleted] = 0
+
+    new_rows = np.setdiff1d(np.asarray(new_rows, dtype=np.int64), np.flatnonzero(deleted))
+    normalized = normalize(corpus_matrix.tocsr(), norm='l2', copy=True).astype(np.float32)
+
+    # Rows that need a full re-score: new jobs and jobs that listed a deleted job
+    lost_neighbor = np.isin(neighbors, deleted_rows).any(axis=1) if len(deleted_rows) else np.zeros(n_rows, bool)
+    rescore = np.union1d(new_rows, np.flatnonzero(lost_neighbor & ~deleted))
+
+    # Existing rows keep their list and only merge in new jobs that beat their k-th score
+    untouched = np.ones(n_rows, dtype=bool)
+    untouched[rescore] = False
+    untouched &= ~deleted
+    kth = np.where(neighbors[:, -1] >= 0, scores[:, -1].astype(np.float32), -np.inf)
+    is_new = np.zeros(n_rows, dtype=bool)
+    is_new[new_rows] = True
+
+    block_rows = max(1, min(batch_size, MAX_BLOCK_ELEMENTS // max(n_rows, 1)))
+    for i in range(0, len(rescore), block_rows):
+        rows = rescore[i:i + block_rows]
+        similarities = safe_sparse_dot(normalized[rows], normalized.T, dense_output=True)
+        similarities = np.asarray(similarities.todense() if hasattr(similarities, 'todense') else similarities)
+        similarities[:, deleted] = -np.inf
+
+        # Cosine is symmetric: a new job's row holds its score against every existing job
+        cols = rows[is_new[rows]]
+        if len(cols):
+            block = similarities[is_new[rows]]
+            candidates = np.flatnonzero(untouched & (block > kth).any(axis=0))
+            if len(candidates):
+                current = np.where(neighbors[candidates] >= 0, scores[candidates].astype(np.float32), -np.inf)
+                merged_scores = np.hstack([current, block[:, candidates].T])
+                merged_ids = np.hstack([neighbors[candidates], np.tile(cols, (len(candidates), 1))])
+                order, top_scores = top_k_neighbors(merged_scores, top_k)
+                valid = np.isfinite(top_scores)
+                neighbors[candidates] = np.where(valid, np.take_along_axis(merged_ids, order, axis=1), -1)
+                scores[candidates] = np.where(valid, top_scores, 0)
+                kth[candidates] = np.where(valid[:, -1], scores[candidates, -1].astype(np.float32), -np.inf)
+
+        indices, top_scores = top_k_neighbors(similarities, top_k, exclude=rows)
+        valid = np.isfinite(top_scores)
+        neighbors[rows] = -1
+        scores[rows] = 0
+        neighbors[rows, :indices.shape[1]] = np.where(valid, indices, -1)
+        scores[rows, :indices.shape[1]] = np.where(valid, top_scores, 0)
+
+    return {'neighbors': neighbors, 'scores': scores, 'deleted': deleted}
+
+
+def similarity_index_files(model_path):
+    """Sidecar .npy paths stored next to the model pickle"""
+    stem = os.path.splitext(model_path)[0]
+    return {
+        'neighbors': f"{stem}_similarity_neighbors.npy",
+        'scores': f"{stem}_similarity_scores.npy",
+        'deleted': f"{stem}_similarity_deleted.npy"
+    }
+
+
+def save_similarity_index(similarity_index, model_path):
+    """
+    Write the index arrays as .npy sidecars of the model
+
+    Files are replaced atomically, so processes that have the previous
+    version memory-mapped keep reading a consistent copy.
+
+    Returns:
+        Small dict to store in the pickle in place of the arrays
+    """
+    files = similarity_index_files(model_path)
+    entry = {}
+    for key, path in files.items():
+        if similarity_index.get(key) is None:
+            continue
+        temp_path = f"{path}.tmp.npy"
+        np.save(temp_path, similarity_index[key])
+        os.replace(temp_path, path)
+        entry[f"{key}_file"] = os.path.basename(path)
+
+    return entry
+
+
+def load_similarity_index(entry, model_path, mmap_mode='r'):
+    """
+    Resolve the 'similarity_index' entry of a loaded model into arrays
+
+    Handles in-memory arrays, .npy sidecars (memory-mapped by default) and the
+    legacy {job_idx: {'similar_jobs': [...], 'similarity_scores': [...]}} dict.
+    """
+    if entry is None:
+        return None
+
+    if 'neighbors' in entry and 'scores' in entry:
+        return entry
+
+    if 'neighbors_file' in entry:
+        model_dir = os.path.dirname(os.path.abspath(model_path))
+        index = {
+            'neighbors': np.load(os.path.join(model_dir, entry['neighbors_file']), mmap_mode=mmap_mode),
+            'scores': np.load(os.path.join(model_dir, entry['scores_file']), mmap_mode=mmap_mode)
+        }
+        if 'deleted_file' in entry:
+            index['deleted'] = np.load(os.path.join(model_dir, entry['deleted_file']))
+        return index
+
+    return convert_legacy_index(entry)
+
+
+def convert_legacy_index(legacy_index):
+    """Convert the old dict-of-lists index into neighbour/score arrays"""
+    if not legacy_index:
+        return allocate_similarity_index(0)
+
+    n_jobs = max(legacy_index) + 1
+    top_k = max(len(v['similar_jobs']) for v in legacy_index.values())
+    index = allocate_similarity_index(n_jobs, top_k, score_dtype=np.float32)
+
+    for job_idx, data in legacy_index.items():
+        k = len(data['similar_jobs'])
+        index['neighbors'][job_idx, :k] = data['similar_jobs']
+        index['scores'][job_idx, :k] = data['similarity_scores']
+
+    return index
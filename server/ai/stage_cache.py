@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Trainer Stage Cache
+Content-addressed on-disk cache so reruns resume from the first changed stage
+"""
+
+import os
+import json
+import time
+import hashlib
+import inspect
+import joblib
+
+
+def file_fingerprint(path, block_size=1024 * 1024):
+    """SHA-256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def code_fingerprint(code):
+    """
+    Hash of the source a stage runs, so code edits invalidate it
+
+    Args:
+        code: functions, classes or whole modules; pass a module for helpers
+            the stage reaches indirectly (e.g. similarity_index for
+            top_k_neighbors and _score_block)
+    """
+    digest = hashlib.sha256()
+    for obj in code:
+        try:
+            digest.update(inspect.getsource(obj).encode('utf-8'))
+        except (OSError, TypeError):
+            digest.update(getattr(obj, '__qualname__', getattr(obj, '__name__', repr(obj))).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Cache of trainer stage outputs keyed by a hash of their inputs
+
+    A stage key covers the stage name, its parameters, the source of the
+    code it runs and the keys of the stages it consumes, so a key changes
+    exactly when the stage or anything upstream of it changes.
+    """
+
+    ENTRY_SUFFIX = '.joblib'
+
+    def __init__(self, cache_dir='.trainer_cache', enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.results = []
+        if enabled:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def key(self, stage, params=None, inputs=(), code=()):
+        payload = {
+            'stage': stage,
+            'params': params or {},
+            'inputs': list(inputs),
+            'code': code_fingerprint(code)
+        }
+        encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def path(self, stage, key):
+        return os.path.join(self.cache_dir, f"{stage}-{key[:20]}{self.ENTRY_SUFFIX}")
+
+    def run(self, stage, fn, params=None, inputs=(), code=()):
+        """
+        Return the cached output of a stage, or run fn() and cache it
+
+        Args:
+            stage: stage name
+            fn: zero-argument callable producing the stage output
+            params: JSON-serialisable parameters that affect the output
+            inputs: keys of the upstream stages this stage reads
+            code: functions and modules whose source defines the stage
+
+        Returns:
+            (output, key)
+        """
+        key = self.key(stage, params, inputs, code)
+        started = time.perf_counter()
+
+        hit, output = self.load(stage, key)
+        if hit:
+            self.record(stage, key, True, started)
+            return output, key
+
+        output = fn()
+        self.save(stage, key, output)
+        self.record(stage, key, False, started)
+        return output, key
+
+    def load(self, stage, key):
+        """(True, output) for a readable cache entry, else (False, None)"""
+        path = self.path(stage, key)
+        if self.enabled and os.path.exists(path):
+            try:
+                output = joblib.load(path)
+                os.utime(path)  # Recently used entries survive prune()
+                print(f"♻️  {stage}: cache hit ({key[:12]})")
+                return True, output
+            except Exception as e:
+                print(f"⚠ {stage}: unreadable cache entry, recomputing ({e})")
+        return False, None
+
+    def save(self, stage, key, output):
+        if not self.enabled:
+            return
+        # Write then rename so an interrupted dump never looks like a hit
+        path = self.path(stage, key)
+        temp_path = f"{path}.tmp"
+        joblib.dump(output, temp_path)
+        os.replace(temp_path, path)
+
+    def prune(self, keep=2):
+        """
+        Delete all but the `keep` most recently used entries of each stage
+
+        Also removes .tmp files left by interrupted saves. Entries are
+        ordered by modification time, which load() refreshes on every hit.
+
+        Returns:
+            Bytes freed
+        """
+        if not self.enabled or not os.path.isdir(self.cache_dir):
+            return 0
+
+        by_stage = {}
+        stale = []
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            if name.endswith('.tmp'):
+                stale.append(path)
+            elif name.endswith(self.ENTRY_SUFFIX) and '-' in name:
+                by_stage.setdefault(name.rsplit('-', 1)[0], []).append(path)
+
+        for paths in by_stage.values():
+            paths.sort(key=os.path.getmtime, reverse=True)
+            stale.extend(paths[max(0, keep):])
+
+        freed = 0
+        for path in stale:
+            try:
+                size = os.path.getsize(path)
+                os.remove(path)
+                freed += size
+            except OSError:
+                pass
+        if stale:
+            print(f"🧹 Stage cache: removed {len(stale)} old entries ({freed / (1024*1024):.1f} MB)")
+        return freed
+
+    def record(self, stage, key, hit, started):
+        self.results.append({
+            'stage': stage,
+            'key': key,
+            'hit': hit,
+            'seconds': time.perf_counter() - started
+        })
+
+    def report(self):
+        """Print per-stage cache hits and timings"""
+        if not self.results:
+            return
+        hits = sum(r['hit'] for r in self.results)
+        print(f"\n🗄️  Stage cache: {hits}/{len(self.results)} hits")
+        for r in self.results:
+            status = 'hit ' if r['hit'] else 'miss'
+            print(f"  • {r['stage']:<12} {status}  {r['seconds']:7.2f}s  {r['key'][:12]}")
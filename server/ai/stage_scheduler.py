@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Trainer Stage Scheduler
+Runs independent trainer stages concurrently in worker processes within a CPU budget
+"""
+
+import os
+import time
+import shutil
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+import numpy as np
+from scipy.sparse import csr_matrix
+from threadpoolctl import threadpool_limits
+from joblib.externals.loky import get_reusable_executor
+
+
+class SharedArrays:
+    """
+    Read-only stage inputs written once as .npy files and memory-mapped by workers
+
+    Workers receive only the small spec() dict; the arrays themselves are
+    paged in from the files instead of being pickled to every process.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or tempfile.mkdtemp(prefix='trainer_shared_')
+        self.entries = {}
+
+    def _save(self, name, array):
+        path = os.path.join(self.directory, f"{name}.npy")
+        np.save(path, np.ascontiguousarray(array))
+        return path
+
+    def put(self, name, array, **meta):
+        """Share a dense array (meta is small picklable data kept with it)"""
+        self.entries[name] = {'kind': 'dense', 'path': self._save(name, array), 'meta': meta}
+
+    def put_sparse(self, name, matrix):
+        """Share a CSR matrix as its data / indices / indptr arrays"""
+        matrix = matrix.tocsr()
+        self.entries[name] = {
+            'kind': 'csr',
+            'shape': matrix.shape,
+            'paths': [self._save(f"{name}_{part}", getattr(matrix, part)) for part in ('data', 'indices', 'indptr')]
+        }
+
+    def spec(self):
+        return {'entries': self.entries}
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def load_shared(spec):
+    """Memory-map every shared input described by SharedArrays.spec()"""
+    shared = {}
+    for name, entry in spec['entries'].items():
+        if entry['kind'] == 'csr':
+            data, indices, indptr = (np.load(path, mmap_mode='r') for path in entry['paths'])
+            shared[name] = csr_matrix((data, indices, indptr), shape=entry['shape'], copy=False)
+        else:
+            shared[name] = np.load(entry['path'], mmap_mode='r')
+            shared[f"{name}__meta"] = entry['meta']
+    return shared
+
+
+class Stage:
+    """
+    One node of the trainer graph
+
+    fn is called as fn(shared, *dependency_outputs, **kwargs); stages that
+    request more than one CPU also receive the CPUs granted as n_jobs.
+    fn must be a module-level function so worker processes can import it.
+    """
+
+    def __init__(self, name, fn, deps=(), kwargs=None, cpus=1, params=None, inputs=(), code=()):
+        self.name = name
+        self.fn = fn
+        self.deps = list(deps)
+        self.kwargs = kwargs or {}
+        self.cpus = cpus
+        self.params = params
+        self.inputs = list(inputs)
+        self.code = list(code) or [fn]
+
+
+def _run_stage(fn, shared_spec, dep_outputs, kwargs, cpus):
+    # Worker entry point: inputs come from the memory-mapped files, and BLAS /
+    # OpenMP pools are capped so concurrent stages stay within the budget
+    try:
+        with threadpool_limits(limits=cpus):
+            return fn(load_shared(shared_spec), *dep_outputs, **kwargs)
+    finally:
+        # joblib keeps the loky workers a stage started alive for minutes after
+        # its last task; shutting the scheduler's pool down would wait them out
+        get_reusable_executor().shutdown(wait=True)
+
+
+class StageScheduler:
+    """
+    Run a DAG of stages, overlapping independent ones within a CPU budget
+
+    Every stage is looked up in the StageCache first (its key covers the
+    keys of its dependencies). Misses are started as soon as their
+    dependencies are done and enough of the CPU budget is free; with a
+    budget of one CPU they run in-process, one after another.
+    """
+
+    def __init__(self, cache, shared, cpu_budget=None):
+        self.cache = cache
+        self.shared = shared
+        self.cpu_budget = max(1, cpu_budget or os.cpu_count() or 1)
+        self.stages = []
+
+    def add(self, stage):
+        self.stages.append(stage)
+        return stage
+
+    def run(self):
+        """
+        Execute the graph
+
+        Returns:
+            (outputs, keys) dicts keyed by stage name
+        """
+        names = {stage.name for stage in self.stages}
+        for stage in self.stages:
+            missing = [d for d in stage.deps if d not in names]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stage(s) {missing}")
+
+        outputs, keys = {}, {}
+        pending = list(self.stages)
+        running = {}
+        free_cpus = self.cpu_budget
+        started_at = time.perf_counter()
+
+        pool = None
+        if self.cpu_budget > 1:
+            pool = ProcessPoolExecutor(max_workers=self.cpu_budget, mp_context=multiprocessing.get_context('spawn'))
+
+        try:
+            while pending or running:
+                for stage in list(pending):
+                    if any(d not in outputs for d in stage.deps):
+                        continue
+
+                    key = self.cache.key(stage.name, stage.params,
+                                         stage.inputs + [keys[d] for d in stage.deps], stage.code)
+                    started = time.perf_counter()
+                    hit, output = self.cache.load(stage.name, key)
+                    if hit:
+                        pending.remove(stage)
+                        outputs[stage.name], keys[stage.name] = output, key
+                        self.cache.record(stage.name, key, True, started)
+                        continue
+
+                    if free_cpus < 1:
+                        break
+
+                    cpus = min(stage.cpus, free_cpus)
+                    kwargs = dict(stage.kwargs, n_jobs=cpus) if stage.cpus > 1 else stage.kwargs
+                    dep_outputs = [outputs[d] for d in stage.deps]
+                    pending.remove(stage)
+
+                    if pool is None:
+                        output = stage.fn(load_shared(self.shared.spec()), *dep_outputs, **kwargs)
+                        self._finish(stage, key, output, started, outputs, keys)
+                        continue
+
+                    print(f"🚀 {stage.name}: started on {cpus} CPU(s)")
+                    future = pool.submit(_run_stage, stage.fn, self.shared.spec(), dep_outputs, kwargs, cpus)
+                    running[future] = (stage, key, cpus, started)
+                    free_cpus -= cpus
+
+                if not running:
+                    if pending and all(any(d not in outputs for d in s.deps) for s in pending):
+                        raise RuntimeError("Stage graph has a cycle")
+                    continue
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, key, cpus, started = running.pop(future)
+                    free_cpus += cpus
+                    self._finish(stage, key, future.result(), started, outputs, keys)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+
+        print(f"✓ Stage graph finished in {time.perf_counter() - started_at:.1f}s "
+              f"(CPU budget {self.cpu_budget})")
+        return outputs, keys
+
+    def _finish(self, stage, key, output, started, outputs, keys):
+        self.cache.save(stage.name, key, output)
+        self.cache.record(stage.name, key, False, started)
+        outputs[stage.name], keys[stage.name] = output, key
+        print(f"✓ {stage.name}: done in {time.perf_counter() - started:.1f}s")
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Admission Control for the ML Service
+Bounded concurrency, a queue-depth limit and load-aware tier degradation
+"""
+
+import os
+import math
+import time
+import asyncio
+
+from ml_tracing import record_span
+
+MAX_CONCURRENCY = int(os.environ.get('ML_MAX_CONCURRENCY', min(4, os.cpu_count() or 1)))
+# Separate permits for degraded (keyword tier) requests, which never wait for ML slots
+DEGRADED_CONCURRENCY = int(os.environ.get('ML_DEGRADED_CONCURRENCY', min(4, os.cpu_count() or 1)))
+MAX_QUEUE = int(os.environ.get('ML_MAX_QUEUE', '64'))
+DEGRADE_QUEUE = int(os.environ.get('ML_DEGRADE_QUEUE', '8'))
+DEGRADE_LATENCY_MS = float(os.environ.get('ML_DEGRADE_LATENCY_MS', '250'))
+
+
+class Overloaded(Exception):
+    """Queue is full; the request should be rejected with 503"""
+
+    def __init__(self, retry_after):
+        self.retry_after = retry_after
+        super().__init__(f"Service overloaded, retry in {retry_after}s")
+
+
+class AdmissionController:
+    """
+    Gate for expensive requests
+
+    Full-cost requests run at most max_concurrency at once. A request is
+    admitted as degraded (to be served by a cheaper tier) when it arrives
+    behind degrade_queue or more requests waiting for those slots, or when
+    full-cost work is running and its smoothed end-to-end latency (queueing
+    included) is above degrade_latency_ms. Degraded requests take permits
+    from their own pool of degraded_concurrency, so they neither wait
+    behind nor add to the full-cost queue. At most max_queue requests wait
+    in each pool; anything beyond that is rejected immediately.
+    """
+
+    def __init__(self, max_concurrency=MAX_CONCURRENCY, max_queue=MAX_QUEUE,
+                 degrade_queue=DEGRADE_QUEUE, degrade_latency_ms=DEGRADE_LATENCY_MS,
+                 degraded_concurrency=DEGRADED_CONCURRENCY, min_retry_after=1, smoothing=0.2):
+        self.max_concurrency = max(1, max_concurrency)
+        self.degraded_concurrency = max(1, degraded_concurrency)
+        self.max_queue = max_queue
+        self.degrade_queue = degrade_queue
+        self.degrade_latency_ms = degrade_latency_ms
+        self.min_retry_after = min_retry_after
+        self.smoothing = smoothing
+        self._slots = None
+        self._slots_loop = None
+        self.waiting = 0
+        self.running = 0
+        self.degraded_waiting = 0
+        self.degraded_running = 0
+        # Full-cost requests only: cheap ones would hide the overload they are shedding
+        self.latency_ms = 0.0
+        self.counters = {'admitted': 0, 'degraded': 0, 'rejected': 0}
+
+    def retry_after(self):
+        """Seconds until the current backlog should have drained"""
+        backlog_s = (self.waiting + self.running) * self.latency_ms / 1000 / self.max_concurrency
+        return max(self.min_retry_after, math.ceil(backlog_s))
+
+    def admit(self):
+        """
+        Admit a request or reject it
+
+        Returns:
+            Ticket to enter with `async with` before doing the work
+
+        Raises:
+            Overloaded when the queue is full
+        """
+        # Latency only says something while full-cost work is in flight; once it
+        # has drained, the next request runs at full cost and measures it again
+        degraded = (self.waiting >= self.degrade_queue
+                    or (self.running + self.waiting > 0 and self.latency_ms > self.degrade_latency_ms))
+        if (self.degraded_waiting if degraded else self.waiting) >= self.max_queue:
+            self.counters['rejected'] += 1
+            raise Overloaded(self.retry_after())
+
+        self.counters['admitted'] += 1
+        if degraded:
+            self.counters['degraded'] += 1
+        return Ticket(self, degraded)
+
+    def _loop_slots(self, degraded):
+        # asyncio primitives belong to one event loop; tests and benchmarks may run several
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = {False: asyncio.Semaphore(self.max_concurrency),
+                           True: asyncio.Semaphore(self.degraded_concurrency)}
+            self._slots_loop = loop
+        return self._slots[degraded]
+
+    def _observe(self, latency_ms):
+        self.latency_ms += self.smoothing * (latency_ms - self.latency_ms)
+
+    def stats(self):
+        return {
+            'max_concurrency': self.max_concurrency,
+            'max_queue': self.max_queue,
+            'running': self.running,
+            'waiting': self.waiting,
+            'degraded_concurrency': self.degraded_concurrency,
+            'degraded_running': self.degraded_running,
+            'degraded_waiting': self.degraded_waiting,
+            'latency_ms': round(self.latency_ms, 2),
+            **self.counters
+        }
+
+
+class Ticket:
+    """An admitted request; entering waits for a slot in its pool (full-cost or degraded)"""
+
+    def __init__(self, controller, degraded):
+        self.controller = controller
+        self.degraded = degraded
+        self.admitted_at = time.perf_counter()
+        self._prefix = 'degraded_' if degraded else ''
+
+    def _count(self, name, delta):
+        attribute = self._prefix + name
+        setattr(self.controller, attribute, getattr(self.controller, attribute) + delta)
+        return getattr(self.controller, attribute)
+
+    async def __aenter__(self):
+        self._count('waiting', 1)
+        queued_ns = time.time_ns()
+        try:
+            await self.controller._loop_slots(self.degraded).acquire()
+        finally:
+            waiting = self._count('waiting', -1)
+        record_span('queue', queued_ns, waiting=waiting, degraded=self.degraded)
+        self._count('running', 1)
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        controller = self.controller
+        self._count('running', -1)
+        controller._slots[self.degraded].release()
+        if not self.degraded:
+            controller._observe((time.perf_counter() - self.admitted_at) * 1000)
+        return False
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Micro-Batching for the ML Service
+Concurrent calls collected over a short window and processed together in the thread pool
+"""
+
+import os
+import asyncio
+import contextvars
+
+BATCH_WINDOW_MS = float(os.environ.get('ML_BATCH_WINDOW_MS', '2'))
+BATCH_MAX_SIZE = int(os.environ.get('ML_BATCH_MAX_SIZE', '32'))
+BATCH_WORKERS = int(os.environ.get('ML_BATCH_WORKERS', min(4, os.cpu_count() or 1)))
+
+
+class MicroBatcher:
+    """
+    Groups concurrent submissions into batches for one batch function
+
+    The first item submitted to an empty batch opens a window of window_ms;
+    the batch is handed to process() when the window closes or as soon as it
+    holds max_batch items. At most `workers` batches run at once; while they
+    are busy, new arrivals keep filling the next batch, so batches grow with
+    load instead of queueing one item at a time.
+    """
+
+    def __init__(self, process, window_ms=BATCH_WINDOW_MS, max_batch=BATCH_MAX_SIZE, workers=BATCH_WORKERS):
+        """
+        Args:
+            process: blocking function taking a list of items and returning
+                a list of results in the same order (run in the thread pool)
+        """
+        self.process = process
+        self.window_ms = window_ms
+        self.max_batch = max(1, max_batch)
+        self.workers = max(1, workers)
+        self._pending = []
+        self._timer = None
+        self._slots = None
+        self._slots_loop = None
+        self.counters = {'batches': 0, 'items': 0, 'full_batches': 0, 'max_batch_seen': 0, 'errors': 0}
+
+    @property
+    def capacity(self):
+        """Items that can be in running batches at once"""
+        return self.max_batch * self.workers
+
+    async def submit(self, item):
+        """Result of process() for this item, computed as part of a batch"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            # Empty context: the timer must not run inside the first caller's trace
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush, context=contextvars.Context())
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            # A batch serves several requests, so it runs outside all of their traces
+            contextvars.Context().run(asyncio.ensure_future, self._run(batch))
+
+    def _loop_slots(self):
+        # asyncio primitives belong to one event loop; tests and benchmarks may run several
+        loop = asyncio.get_running_loop()
+        if self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.workers)
+            self._slots_loop = loop
+        return self._slots
+
+    async def _run(self, batch):
+        async with self._loop_slots():
+            self.counters['batches'] += 1
+            self.counters['items'] += len(batch)
+            self.counters['full_batches'] += len(batch) >= self.max_batch
+            self.counters['max_batch_seen'] = max(self.counters['max_batch_seen'], len(batch))
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(
+                    None, self.process, [item for item, _ in batch])
+            except Exception as e:
+                self.counters['errors'] += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+        # Callers that went away (cancelled futures) are skipped
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        batches = self.counters['batches']
+        return {
+            'window_ms': self.window_ms,
+            'max_batch': self.max_batch,
+            'workers': self.workers,
+            'pending': len(self._pending),
+            'mean_batch': round(self.counters['items'] / batches, 2) if batches else 0.0,
+            **self.counters
+        }
@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Load Tests for the ML Service
+Drives the FastAPI app in-process (ASGI) or through a local uvicorn server
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import socket
+import asyncio
+import argparse
+import platform
+import threading
+import numpy as np
+import httpx
+import uvicorn
+
+# Benchmarks must neither restore the live job cache snapshot nor overwrite
+# it with synthetic jobs, so snapshots are off before ml_service is imported
+os.environ['ML_SNAPSHOT_DIR'] = ''
+import ml_service
+
+SKILLS = ['Python', 'Java', 'JavaScript', 'TypeScript', 'React', 'Node.js', 'SQL', 'AWS', 'Docker',
+          'Kubernetes', 'Machine Learning', 'TensorFlow', 'Django', 'Go', 'MongoDB', 'PostgreSQL']
+TITLES = ['Software Engineer', 'Data Scientist', 'Frontend Developer', 'Backend Developer',
+          'DevOps Engineer', 'Full Stack Developer', 'ML Engineer', 'Data Analyst']
+INDUSTRIES = ['Software', 'AI/ML', 'Fintech', 'Healthcare', 'Education']
+LOCATIONS = ['Remote', 'San Francisco', 'New York', 'Austin', 'Seattle', 'Boston']
+EXPERIENCE_LEVELS = ['Entry-level', 'Mid-level', 'Senior', 'Executive']
+
+DEFAULT_JOB_COUNTS = [1000, 10000]
+# Checked-in reference report; refresh it with --output when a change is expected to move the numbers
+DEFAULT_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ml_load_baseline.json')
+ENDPOINTS = ['update_job_cache', 'recommend', 'predict_salary']
+
+
+def synthetic_jobs(n_jobs, seed=42):
+    """Deterministic job payloads in the /api/update_job_cache schema"""
+    rng = random.Random(seed)
+    jobs = []
+    for i in range(n_jobs):
+        skills = rng.sample(SKILLS, rng.randint(1, 5))
+        salary_min = rng.choice([None, 60000, 80000, 100000, 120000])
+        jobs.append({
+            'job_id': str(i),
+            'title': f"{rng.choice(['', 'Senior ', 'Junior '])}{rng.choice(TITLES)}",
+            'company': f"Company {i % 500}",
+            'location': rng.choice(LOCATIONS),
+            'skills': skills,
+            'industry': rng.choice(INDUSTRIES),
+            'experience_level': rng.choice(EXPERIENCE_LEVELS),
+            'salary_min': salary_min,
+            'salary_max': salary_min + 30000 if salary_min else None,
+            'description': f"Work with {' and '.join(skills)}"
+        })
+    return jobs
+
+
+def request_payloads(endpoint, jobs, count, seed=7):
+    """Payloads for `count` requests to one endpoint"""
+    rng = random.Random(seed)
+    if endpoint == 'update_job_cache':
+        return [jobs] * count
+    if endpoint == 'recommend':
+        return [{
+            'user_preferences': {
+                'skills': ', '.join(rng.sample(SKILLS, 2)),
+                'experience': rng.choice(EXPERIENCE_LEVELS),
+                'industry': rng.choice(INDUSTRIES),
+                'location': rng.choice(LOCATIONS),
+                'min_salary': rng.choice([50000, 80000, 100000])
+            },
+            'top_n': 10
+        } for _ in range(count)]
+    return [rng.choice(jobs) for _ in range(count)]
+
+
+async def drive(client, path, payloads, concurrency):
+    """
+    Send payloads with at most `concurrency` requests in flight
+
+    Returns:
+        (latencies in seconds, error count, wall seconds, {tier: responses})
+    """
+    queue = list(enumerate(payloads))
+    latencies = [None] * len(payloads)
+    errors = 0
+    tiers = {}
+
+    async def worker():
+        nonlocal errors
+        while queue:
+            i, payload = queue.pop()
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=payload)
+                if response.status_code >= 400:
+                    errors += 1
+                tier = response.headers.get('x-recommendation-tier')
+                if tier:
+                    tiers[tier] = tiers.get(tier, 0) + 1
+            except httpx.HTTPError:
+                errors += 1
+            latencies[i] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(payloads)))))
+    return [l for l in latencies if l is not None], errors, time.perf_counter() - started, tiers
+
+
+def summarize(transport, n_jobs, endpoint, concurrency, latencies, errors, wall, tiers=None):
+    latencies_ms = np.asarray(latencies) * 1000
+    p50, p95, p99 = np.percentile(latencies_ms, [50, 95, 99]) if len(latencies_ms) else (0, 0, 0)
+    return {
+        'transport': transport,
+        'jobs': n_jobs,
+        'endpoint': endpoint,
+        'requests': len(latencies),
+        'concurrency': concurrency,
+        'throughput_rps': round(len(latencies) / wall, 2) if wall else 0.0,
+        'p50_ms': round(float(p50), 3),
+        'p95_ms': round(float(p95), 3),
+        'p99_ms': round(float(p99), 3),
+        'error_rate': round(errors / len(latencies), 4) if latencies else 0.0,
+        'tiers': tiers or {}
+    }
+
+
+class LocalServer:
+    """uvicorn serving the app on a free localhost port in a background thread"""
+
+    def __init__(self, app):
+        with socket.socket() as sock:
+            sock.bind(('127.0.0.1', 0))
+            self.port = sock.getsockname()[1]
+        config = uvicorn.Config(app, host='127.0.0.1', port=self.port, log_level='warning')
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self):
+        self.thread.start()
+        deadline = time.time() + 10
+        while not self.server.started:
+            if time.time() > deadline:
+                raise RuntimeError("uvicorn did not start within 10s")
+            time.sleep(0.05)
+        return self
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+async def run_transport(transport, base_url, job_counts, endpoints, args):
+    """Run every (job count, endpoint) combination against one transport"""
+    if transport == 'asgi':
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=ml_service.app), base_url=base_url,
+                                   timeout=args.timeout)
+    else:
+        limits = httpx.Limits(max_connections=args.concurrency)
+        client = httpx.AsyncClient(base_url=base_url, timeout=args.timeout, limits=limits)
+
+    results = []
+    async with client:
+        for n_jobs in job_counts:
+            jobs = synthetic_jobs(n_jobs)
+            print(f"\n📦 {transport}: {n_jobs:,} jobs")
+
+            # The cache must hold this job set before the read endpoints are measured
+            response = await client.post('/api/update_job_cache', json=jobs)
+            response.raise_for_status()
+
+            for endpoint in endpoints:
+                count = args.cache_requests if endpoint == 'update_job_cache' else args.requests
+                concurrency = 1 if endpoint == 'update_job_cache' else args.concurrency
+                payloads = request_payloads(endpoint, jobs, count)
+
+                # Warm-up request so one-off setup is not in the percentiles
+                await client.post(f"/api/{endpoint}", json=payloads[0])
+                latencies, errors, wall, tiers = await drive(client, f"/api/{endpoint}", payloads, concurrency)
+
+                result = summarize(transport, n_jobs, endpoint, concurrency, latencies, errors, wall, tiers)
+                results.append(result)
+                print(f"  {endpoint:<17} {result['throughput_rps']:>9.1f} req/s  p50 {result['p50_ms']:>8.2f}ms  "
+                      f"p95 {result['p95_ms']:>8.2f}ms  p99 {result['p99_ms']:>8.2f}ms  "
+                      f"errors {result['error_rate']:.1%}"
+                      + (f"  tiers {tiers}" if tiers else ''))
+    return results
+
+
+def compare_with_baseline(report, baseline, tolerance):
+    """
+    Regressions against a stored report
+
+    A result regresses when its p95 latency grows, or its throughput drops,
+    by more than `tolerance` (fraction), or its error rate rises above the
+    baseline's by more than one percentage point.
+    """
+    base = {(r['transport'], r['jobs'], r['endpoint']): r for r in baseline['results']}
+    regressions = []
+    for r in report['results']:
+        b = base.get((r['transport'], r['jobs'], r['endpoint']))
+        if b is None:
+            continue
+        checks = [
+            ('p95_ms', b['p95_ms'] and r['p95_ms'] > b['p95_ms'] * (1 + tolerance)),
+            ('throughput_rps', b['throughput_rps'] and r['throughput_rps'] < b['throughput_rps'] / (1 + tolerance)),
+            ('error_rate', r['error_rate'] > b['error_rate'] + 0.01)
+        ]
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append({'transport': r['transport'], 'jobs': r['jobs'], 'endpoint': r['endpoint'],
+                                    'metric': metric, 'baseline': b[metric], 'current': r[metric]})
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the ML service endpoints")
+    parser.add_argument('--transport', nargs='+', choices=['asgi', 'uvicorn'], default=['asgi'],
+                        help='In-process ASGI transport and/or a local uvicorn server')
+    parser.add_argument('--jobs', type=int, nargs='+', default=DEFAULT_JOB_COUNTS,
+                        help='Synthetic job cache sizes (e.g. 1000 10000 100000 1000000)')
+    parser.add_argument('--endpoints', nargs='+', choices=ENDPOINTS, default=ENDPOINTS)
+    parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight per endpoint')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per read endpoint')
+    parser.add_argument('--cache-requests', type=int, default=3, help='Requests to /api/update_job_cache')
+    parser.add_argument('--timeout', type=float, default=300.0, help='Per-request timeout in seconds')
+    parser.add_argument('--output', default='ml_load_benchmark.json', help='Machine-readable report')
+    parser.add_argument('--baseline', nargs='?', const=DEFAULT_BASELINE_PATH,
+                        help='Report to compare against (default when given alone: ml_load_baseline.json)')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed regression before failing')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    print("🔥 ML Service Load Test")
+    print("=" * 60)
+
+    report = {
+        'environment': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'model_loaded': ml_service.recommendation_engine.model_loaded
+        },
+        'config': {'concurrency': args.concurrency, 'requests': args.requests,
+                   'cache_requests': args.cache_requests},
+        'results': []
+    }
+
+    for transport in args.transport:
+        if transport == 'asgi':
+            results = asyncio.run(run_transport('asgi', 'http://ml-service', args.jobs, args.endpoints, args))
+        else:
+            with LocalServer(ml_service.app) as server:
+                results = asyncio.run(run_transport('uvicorn', server.url, args.jobs, args.endpoints, args))
+        report['results'].extend(results)
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✓ Report written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        for r in regressions:
+            print(f"⚠ {r['transport']} {r['jobs']:,} jobs {r['endpoint']}: {r['metric']} "
+                  f"{r['baseline']} -> {r['current']}")
+        if regressions:
+            print(f"❌ {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print("✓ No regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Recommendation Tier Micro-Benchmarks
+Latency and allocations of the ML, TF-IDF fallback and keyword tiers across catalog sizes
+"""
+
+import os
+import json
+import time
+import argparse
+import platform
+import tracemalloc
+from contextlib import contextmanager
+import numpy as np
+
+# Benchmarks must neither restore the live job cache snapshot nor overwrite
+# it with synthetic jobs, so snapshots are off before ml_service is imported
+os.environ['ML_SNAPSHOT_DIR'] = ''
+import ml_service
+from ml_service import JobData, UserPreferences, recommendation_engine
+from ml_benchmark_load import synthetic_jobs, SKILLS, INDUSTRIES, LOCATIONS, EXPERIENCE_LEVELS
+
+RESULTS_SCHEMA_VERSION = 1
+DEFAULT_RESULTS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ml_benchmark_tiers.json')
+DEFAULT_JOB_COUNTS = [1000, 10000, 100000]
+DEFAULT_TOP_N = [10, 50]
+
+# name -> (engine mode, method, rebuild the job index on every call)
+# '+index' variants include the per-catalog index build that the plain
+# variants amortise; new tier implementations are registered here
+TIERS = {
+    'ml': ('ml', '_get_ml_recommendations', False),
+    'ml+index': ('ml', '_get_ml_recommendations', True),
+    'fallback': ('fallback', '_get_fallback_recommendations', False),
+    'fallback+index': ('fallback', '_get_fallback_recommendations', True),
+    'keyword': ('fallback', '_get_keyword_recommendations', False),
+    'simple': ('fallback', '_get_simple_recommendations', False),
+}
+
+
+@contextmanager
+def engine_mode(engine, mode):
+    """Put the engine in ML or fallback mode, restoring its state afterwards"""
+    saved = (engine.model_loaded, ml_service.tfidf_vectorizer)
+    if mode == 'fallback':
+        engine.model_loaded = False
+        engine._initialize_fallback_components()
+    engine._indexed_key = None
+    try:
+        yield
+    finally:
+        engine.model_loaded, ml_service.tfidf_vectorizer = saved
+        engine._indexed_key = None
+
+
+def sample_preferences(count, seed=7):
+    rng = np.random.default_rng(seed)
+    return [UserPreferences(
+        skills=', '.join(rng.choice(SKILLS, size=2, replace=False)),
+        experience=str(rng.choice(EXPERIENCE_LEVELS)),
+        industry=str(rng.choice(INDUSTRIES)),
+        location=str(rng.choice(LOCATIONS)),
+        min_salary=int(rng.choice([50000, 80000, 100000]))
+    ) for _ in range(count)]
+
+
+def benchmark_tier(engine, tier, jobs, top_n, preferences, alloc_calls):
+    """
+    Time one tier over the preference queries, then trace allocations
+
+    Returns:
+        Result dict (latencies in ms, allocations in KiB per call)
+    """
+    _, method, rebuild_index = TIERS[tier]
+    recommend = getattr(engine, method)
+
+    def call(prefs):
+        if rebuild_index:
+            engine._indexed_key = None
+        return recommend(prefs, jobs, top_n)
+
+    call(preferences[0])  # warm-up, also builds the index for the plain variants
+
+    latencies = []
+    for prefs in preferences:
+        started = time.perf_counter()
+        call(prefs)
+        latencies.append(time.perf_counter() - started)
+
+    # Tracing slows every allocation, so it runs separately from the timed calls
+    peaks, retained = [], []
+    tracemalloc.start()
+    try:
+        for prefs in preferences[:alloc_calls]:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            result = call(prefs)
+            after, peak = tracemalloc.get_traced_memory()
+            del result
+            peaks.append(peak - before)
+            retained.append(after - before)
+    finally:
+        tracemalloc.stop()
+
+    latencies_ms = np.asarray(latencies) * 1000
+    return {
+        'tier': tier,
+        'jobs': len(jobs),
+        'top_n': top_n,
+        'calls': len(latencies),
+        'mean_ms': round(float(latencies_ms.mean()), 4),
+        'p50_ms': round(float(np.percentile(latencies_ms, 50)), 4),
+        'p95_ms': round(float(np.percentile(latencies_ms, 95)), 4),
+        'peak_alloc_kib': round(float(np.mean(peaks)) / 1024, 1),
+        'retained_alloc_kib': round(float(np.mean(retained)) / 1024, 1)
+    }
+
+
+def save_results(path, run):
+    """
+    Add a run to the checked-in results file, replacing one with the same release
+
+    File format:
+        {"schema_version": 1,
+         "runs": [{"release", "environment", "config", "results": [...]}]}
+    """
+    data = {'schema_version': RESULTS_SCHEMA_VERSION, 'runs': []}
+    if os.path.exists(path):
+        with open(path) as f:
+            data = json.load(f)
+    data['runs'] = [r for r in data['runs'] if r['release'] != run['release']] + [run]
+    with open(path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.write('\n')
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark the recommendation tiers")
+    parser.add_argument('--tiers', nargs='+', choices=list(TIERS), default=list(TIERS))
+    parser.add_argument('--jobs', type=int, nargs='+', default=DEFAULT_JOB_COUNTS, help='Catalog sizes')
+    parser.add_argument('--top-n', type=int, nargs='+', default=DEFAULT_TOP_N, help='top_n values')
+    parser.add_argument('--calls', type=int, default=20, help='Timed calls per combination')
+    parser.add_argument('--alloc-calls', type=int, default=3, help='Calls traced with tracemalloc')
+    parser.add_argument('--release', default='dev', help='Label the run is stored under')
+    parser.add_argument('--results', default=DEFAULT_RESULTS_PATH, help='Results file to update')
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    engine = recommendation_engine
+    print("⏱️  Recommendation Tier Benchmarks")
+    print("=" * 60)
+
+    tiers = list(args.tiers)
+    if not engine.model_loaded:
+        skipped = [t for t in tiers if TIERS[t][0] == 'ml']
+        if skipped:
+            print(f"⚠️ No trained model loaded; skipping {', '.join(skipped)}")
+        tiers = [t for t in tiers if t not in skipped]
+
+    preferences = sample_preferences(args.calls)
+    results = []
+    print(f"\n  {'tier':<16} {'jobs':>9} {'top_n':>6} {'mean ms':>10} {'p95 ms':>10} "
+          f"{'peak KiB':>10} {'kept KiB':>9}")
+    for n_jobs in args.jobs:
+        jobs = [JobData(**job) for job in synthetic_jobs(n_jobs)]
+        for tier in tiers:
+            with engine_mode(engine, TIERS[tier][0]):
+                for top_n in args.top_n:
+                    r = benchmark_tier(engine, tier, jobs, top_n, preferences, args.alloc_calls)
+                    results.append(r)
+                    print(f"  {tier:<16} {n_jobs:>9,} {top_n:>6} {r['mean_ms']:>10.3f} {r['p95_ms']:>10.3f} "
+                          f"{r['peak_alloc_kib']:>10.1f} {r['retained_alloc_kib']:>9.1f}")
+
+    run = {
+        'release': args.release,
+        'environment': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'model_loaded': engine.model_loaded
+        },
+        'config': {'calls': args.calls, 'alloc_calls': args.alloc_calls},
+        'results': results
+    }
+    save_results(args.results, run)
+    print(f"\n✓ Results for release '{args.release}' saved to {args.results}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Columnar Job Store for the ML Service
+Job catalog held as one list per field, filled from batched NDJSON or Arrow uploads
+"""
+
+import json
+import zlib
+import asyncio
+from collections import namedtuple
+import numpy as np
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    _loads = json.loads
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import pyarrow as pa
+except ImportError:
+    pa = None
+
+# Same fields as the service's JobData model
+JOB_FIELDS = ['job_id', 'title', 'company', 'location', 'skills', 'industry',
+              'experience_level', 'salary_min', 'salary_max', 'description']
+OPTIONAL_FIELDS = {'salary_min', 'salary_max'}
+LIST_FIELDS = {'skills'}
+
+NDJSON_CONTENT_TYPES = {'application/x-ndjson', 'application/jsonl', 'application/json-seq'}
+ARROW_CONTENT_TYPES = {'application/vnd.apache.arrow.stream'}
+
+# Records parsed and validated together
+BATCH_ROWS = 10000
+
+# Body chunks buffered between the upload and the Arrow reader thread
+ARROW_QUEUE_CHUNKS = 16
+
+# Row view with JobData's attribute names, built on access
+JobRow = namedtuple('JobRow', JOB_FIELDS)
+
+# Placeholder for an NDJSON line that did not parse (already reported)
+_UNPARSED = object()
+
+
+class UnsupportedUpload(ValueError):
+    """Content type or encoding the service cannot read"""
+
+
+class MalformedUpload(UnsupportedUpload):
+    """Body that cannot be decoded: corrupt or truncated compression, or a broken Arrow stream"""
+
+
+class JobValidationError(ValueError):
+    """Upload rejected; errors lists the first problems as {row, field, error}"""
+
+    def __init__(self, errors, total):
+        self.errors = errors
+        self.total = total
+        super().__init__(f"{total} invalid job field(s)")
+
+
+def _field_error(field, value):
+    if value is None:
+        return None if field in OPTIONAL_FIELDS else 'field required'
+    if field in OPTIONAL_FIELDS:
+        return None if isinstance(value, int) and not isinstance(value, bool) else 'must be an integer'
+    if field == 'skills':
+        if not isinstance(value, list) or not all(isinstance(s, str) for s in value):
+            return 'must be a list of strings'
+        return None
+    return None if isinstance(value, str) else 'must be a string'
+
+
+class Utf8Column:
+    """Strings stored as one UTF-8 byte array plus offsets, decoded on access"""
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def encode(cls, values):
+        encoded = [value.encode('utf-8') for value in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(value) for value in encoded], out=offsets[1:])
+        return cls(np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        start, end = self.offsets[position], self.offsets[position + 1]
+        return self.data[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        blob = self.data.tobytes()
+        bounds = self.offsets.tolist()
+        return (blob[start:end].decode('utf-8') for start, end in zip(bounds[:-1], bounds[1:]))
+
+    def to_state(self):
+        return {'data': self.data, 'offsets': self.offsets}
+
+
+class ListColumn:
+    """Lists of strings stored as one flat Utf8Column plus per-row offsets"""
+
+    def __init__(self, values, offsets):
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def encode(cls, lists):
+        offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum([len(items) for items in lists], out=offsets[1:])
+        return cls(Utf8Column.encode([item for items in lists for item in items]), offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, position):
+        return [self.values[i] for i in range(self.offsets[position], self.offsets[position + 1])]
+
+    def __iter__(self):
+        flat = list(self.values)
+        bounds = self.offsets.tolist()
+        return (flat[start:end] for start, end in zip(bounds[:-1], bounds[1:]))
+
+    def to_state(self):
+        return {'values': self.values.to_state(), 'offsets': self.offsets}
+
+
+class NullableIntColumn:
+    """Optional integers stored as int64 values plus a presence mask"""
+
+    def __init__(self, values, present):
+        self.values = values
+        self.present = present
+
+    @classmethod
+    def encode(cls, values):
+        present = np.array([value is not None for value in values], dtype=bool)
+        return cls(np.array([value or 0 for value in values], dtype=np.int64), present)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, position):
+        return int(self.values[position]) if self.present[position] else None
+
+    def __iter__(self):
+        return (value if present else None for value, present in zip(self.values.tolist(), self.present.tolist()))
+
+    def to_state(self):
+        return {'values': self.values, 'present': self.present}
+
+
+class JobStore:
+    """
+    Job catalog as parallel per-field lists
+
+    Indexing and iteration yield JobRow tuples, so code written against
+    lists of JobData objects (attribute access) works unchanged. A store
+    restored from a snapshot holds array-backed columns instead of lists,
+    decoded one value at a time as rows are read.
+    """
+
+    def __init__(self, columns=None):
+        self.columns = columns or {field: [] for field in JOB_FIELDS}
+
+    @classmethod
+    def from_jobs(cls, jobs):
+        """Store for JobData-like objects"""
+        store = cls()
+        store.extend(jobs)
+        return store
+
+    def extend(self, jobs):
+        for field in JOB_FIELDS:
+            if not isinstance(self.columns[field], list):
+                self.columns[field] = list(self.columns[field])
+            self.columns[field].extend(getattr(job, field) for job in jobs)
+
+    def to_state(self):
+        """Every column as flat NumPy arrays (see Utf8Column, ListColumn, NullableIntColumn)"""
+        state = {}
+        for field in JOB_FIELDS:
+            values = self.columns[field]
+            if field in LIST_FIELDS:
+                column = values if isinstance(values, ListColumn) else ListColumn.encode(values)
+            elif field in OPTIONAL_FIELDS:
+                column = values if isinstance(values, NullableIntColumn) else NullableIntColumn.encode(values)
+            else:
+                column = values if isinstance(values, Utf8Column) else Utf8Column.encode(values)
+            state[field] = column.to_state()
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        """Store over to_state() arrays (typically memory-mapped), without decoding them"""
+        columns = {}
+        for field in JOB_FIELDS:
+            column = state[field]
+            if field in LIST_FIELDS:
+                values = column['values']
+                columns[field] = ListColumn(Utf8Column(values['data'], values['offsets']), column['offsets'])
+            elif field in OPTIONAL_FIELDS:
+                columns[field] = NullableIntColumn(column['values'], column['present'])
+            else:
+                columns[field] = Utf8Column(column['data'], column['offsets'])
+        return cls(columns)
+
+    def __len__(self):
+        return len(self.columns['job_id'])
+
+    def __getitem__(self, position):
+        return JobRow(*(self.columns[field][position] for field in JOB_FIELDS))
+
+    def __iter__(self):
+        return map(JobRow._make, zip(*(self.columns[field] for field in JOB_FIELDS)))
+
+
+def job_columns(jobs):
+    """{field: values} for a JobStore or any sequence of JobData-like objects"""
+    if isinstance(jobs, JobStore):
+        return {field: values if isinstance(values, list) else list(values)
+                for field, values in jobs.columns.items()}
+    return {field: [getattr(job, field) for job in jobs] for field in JOB_FIELDS}
+
+
+class JobStoreBuilder:
+    """
+    Validate batches of uploaded records and append them column by column
+
+    Validation happens per batch, so only one batch of parsed records is
+    alive at a time. Invalid fields are counted (the first max_errors are
+    kept) and build() rejects the whole upload if there were any.
+    """
+
+    def __init__(self, max_errors=20):
+        self.columns = {field: [] for field in JOB_FIELDS}
+        self.rows = 0
+        self.errors = []
+        self.error_count = 0
+        self.max_errors = max_errors
+
+    def _error(self, row, field, error):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'row': row, 'field': field, 'error': error})
+
+    def _add(self, columns, row_numbers):
+        for field in JOB_FIELDS:
+            values = columns.get(field)
+            if values is None:
+                values = [None] * len(row_numbers)
+                columns[field] = values
+            for row, value in zip(row_numbers, values):
+                error = _field_error(field, value)
+                if error:
+                    self._error(row, field, error)
+        # Once the upload is known to be rejected there is no point keeping rows
+        if not self.error_count:
+            for field in JOB_FIELDS:
+                self.columns[field].extend(columns[field])
+
+    def add_columns(self, columns, n_rows):
+        """Validate and append one batch given as {field: list of values}"""
+        self._add(columns, range(self.rows, self.rows + n_rows))
+        self.rows += n_rows
+
+    def add_records(self, records):
+        """Validate and append one batch of record dicts"""
+        valid, row_numbers = [], []
+        for i, record in enumerate(records):
+            if isinstance(record, dict):
+                valid.append(record)
+                row_numbers.append(self.rows + i)
+            elif record is _UNPARSED:
+                self._error(self.rows + i, None, 'invalid JSON')
+            else:
+                self._error(self.rows + i, None, 'must be a JSON object')
+        self._add({field: [record.get(field) for record in valid] for field in JOB_FIELDS}, row_numbers)
+        self.rows += len(records)
+
+    def build(self):
+        if self.error_count:
+            raise JobValidationError(self.errors, self.error_count)
+        return JobStore(self.columns)
+
+
+def _decompressor(encoding):
+    """Incremental decoder for a Content-Encoding (None for identity)"""
+    encoding = (encoding or 'identity').strip().lower()
+    if encoding == 'identity':
+        return None
+    if encoding in ('gzip', 'x-gzip'):
+        return zlib.decompressobj(wbits=16 + zlib.MAX_WBITS)
+    if encoding == 'deflate':
+        return zlib.decompressobj()
+    if encoding == 'zstd':
+        if zstandard is None:
+            raise UnsupportedUpload("zstd uploads need the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompressobj()
+    raise UnsupportedUpload(f"Unsupported Content-Encoding: {encoding}")
+
+
+def _decompression_errors():
+    return (zlib.error, zstandard.ZstdError) if zstandard is not None else (zlib.error,)
+
+
+async def decoded_chunks(chunks, encoding):
+    """
+    Decompress an async stream of body chunks as it arrives
+
+    Raises:
+        MalformedUpload for a corrupt or truncated compressed body
+    """
+    decompressor = _decompressor(encoding)
+    async for chunk in chunks:
+        if not chunk:
+            continue
+        if decompressor is None:
+            yield chunk
+            continue
+        try:
+            data = decompressor.decompress(chunk)
+        except _decompression_errors() as e:
+            raise MalformedUpload(f"Could not decompress {encoding} body: {e}")
+        if data:
+            yield data
+    if decompressor is not None:
+        try:
+            data = decompressor.flush() if hasattr(decompressor, 'flush') else b''
+        except _decompression_errors() as e:
+            raise MalformedUpload(f"Could not decompress {encoding} body: {e}")
+        if data:
+            yield data
+        if not getattr(decompressor, 'eof', True):
+            raise MalformedUpload(f"Truncated {encoding} body")
+
+
+async def read_ndjson(chunks, builder, batch_rows=BATCH_ROWS):
+    """Parse newline-delimited JSON records into the builder, batch by batch"""
+    pending = b''
+    batch = []
+
+    def parse(line):
+        line = line.strip()
+        if not line:
+            return
+        try:
+            batch.append(_loads(line))
+        except ValueError:
+            batch.append(_UNPARSED)
+
+    async for data in chunks:
+        lines = (pending + data).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            parse(line)
+            if len(batch) >= batch_rows:
+                builder.add_records(batch)
+                batch = []
+    parse(pending)
+    if batch:
+        builder.add_records(batch)
+
+
+class _ChunkPipe:
+    """Blocking file-like reader over body chunks handed over from the event loop"""
+
+    def __init__(self, loop, queue):
+        self.loop = loop
+        self.queue = queue
+        self.buffer = bytearray()
+        self.eof = False
+        self.closed = False
+
+    def read(self, size=-1):
+        while not self.eof and (size is None or size < 0 or len(self.buffer) < size):
+            chunk = asyncio.run_coroutine_threadsafe(self.queue.get(), self.loop).result()
+            if chunk is None:
+                self.eof = True
+            else:
+                self.buffer += chunk
+        size = len(self.buffer) if size is None or size < 0 else min(size, len(self.buffer))
+        data = bytes(self.buffer[:size])
+        del self.buffer[:size]
+        return data
+
+
+def _read_arrow_stream(source, builder):
+    try:
+        for record_batch in pa.ipc.open_stream(source):
+            columns = {name: record_batch.column(name).to_pylist()
+                       for name in record_batch.schema.names if name in JOB_FIELDS}
+            builder.add_columns(columns, record_batch.num_rows)
+    except (pa.ArrowException, OSError) as e:
+        # Short reads surface as OSError, malformed messages as ArrowInvalid
+        raise MalformedUpload(f"Invalid Arrow stream: {e}")
+
+
+async def read_arrow(chunks, builder):
+    """
+    Read an Arrow IPC stream, one record batch at a time
+
+    pyarrow's stream reader is blocking, so it runs in a worker thread and
+    pulls body chunks through a bounded queue as they arrive; at most
+    ARROW_QUEUE_CHUNKS chunks plus one record batch are held at once.
+    """
+    if pa is None:
+        raise UnsupportedUpload("Arrow uploads need the 'pyarrow' package")
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=ARROW_QUEUE_CHUNKS)
+    reading = loop.run_in_executor(None, _read_arrow_stream, _ChunkPipe(loop, queue), builder)
+
+    async def feed(item):
+        # Stop waiting for queue space once the reader has finished (or failed)
+        put = asyncio.ensure_future(queue.put(item))
+        await asyncio.wait([put, reading], return_when=asyncio.FIRST_COMPLETED)
+        if not put.done():
+            put.cancel()
+            return False
+        return True
+
+    try:
+        async for data in chunks:
+            if not await feed(data):
+                break
+        else:
+            await feed(None)
+    except BaseException:
+        # Unblock the reader thread: drop what it has not read yet and signal the end
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+        # The reader then fails on the truncated stream; that error is not the one to report
+        reading.add_done_callback(lambda done: done.cancelled() or done.exception())
+        raise
+    await reading
+
+
+async def ingest_jobs(chunks, content_type, encoding=None, batch_rows=BATCH_ROWS):
+    """
+    Build a JobStore from a streamed upload
+
+    Args:
+        chunks: async iterator of raw body bytes (e.g. Request.stream())
+        content_type: NDJSON or Arrow stream media type
+        encoding: Content-Encoding (identity, gzip, deflate or zstd)
+
+    Returns:
+        JobStore
+
+    Raises:
+        UnsupportedUpload, MalformedUpload, JobValidationError
+    """
+    media_type = (content_type or '').split(';')[0].strip().lower()
+    builder = JobStoreBuilder()
+    if media_type in NDJSON_CONTENT_TYPES:
+        await read_ndjson(decoded_chunks(chunks, encoding), builder, batch_rows)
+    elif media_type in ARROW_CONTENT_TYPES:
+        await read_arrow(decoded_chunks(chunks, encoding), builder)
+    else:
+        raise UnsupportedUpload(f"Unsupported Content-Type: {content_type or 'none'}")
+    return builder.build()
@@ -4,8 +4,11 @@ FastAPI ML Service for Job Recommendations
 Integrates with the Node.js job portal
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 import uvicorn
@@ -13,11 +16,25 @@ import pandas as pd
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.base import clone
 import joblib
 import logging
 import json
 from datetime import datetime
 import os
+import sys
+import threading
+
+# Shared job index lives with the AI model code
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'ai'))
+from job_index import JobIndex
+from salary_predictor import SalaryPredictor
+from ml_tracing import TracingMiddleware, span, record_span, record_spans, collect_spans, request_start_ns
+from ml_job_store import JobStore, job_columns, ingest_jobs, UnsupportedUpload, MalformedUpload, JobValidationError
+from ml_snapshot import SNAPSHOT_DIR, save_snapshot, load_snapshot
+from ml_admission import AdmissionController, Overloaded, MAX_CONCURRENCY
+from ml_batching import MicroBatcher, BATCH_MAX_SIZE, BATCH_WINDOW_MS
+from ml_singleflight import SingleFlight
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -34,6 +51,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request spans: Server-Timing header on every response, sampled traces to a JSONL file
+app.add_middleware(TracingMiddleware)
+
 # Pydantic models
 class UserPreferences(BaseModel):
     skills: str
@@ -69,9 +89,68 @@ ml_model = None
 tfidf_vectorizer = None
 job_data_cache = []
 
+# Tier label -> "algorithm" reported in recommendation responses
+TIER_ALGORITHMS = {
+    'ml': 'ml_based',
+    'tfidf': 'tfidf_similarity',
+    'keyword': 'keyword_match'
+}
+
+# Upper bound on the dense (queries x jobs) similarity block of a batch, ~32 MB of float64
+BATCH_SCORE_CELLS = 4 * 1024 * 1024
+
+def job_salary_details(job: JobData):
+    """Salary model inputs for a posting, keyed as JobRecommendationAPI.predict_salary expects"""
+    return {
+        'experience': job.experience_level,
+        'industry': job.industry,
+        'location': job.location,
+        'skills': ', '.join(job.skills),
+        'title': job.title
+    }
+
+def rule_based_salary(job: JobData):
+    """Fallback salary prediction based on simple rules"""
+    base_salary = 70000
+    
+    # Experience level multiplier
+    exp_multipliers = {
+        'Entry-level': 1.0,
+        'Mid-level': 1.3,
+        'Senior': 1.6,
+        'Executive': 2.0
+    }
+    
+    # Industry multiplier
+    industry_multipliers = {
+        'Software': 1.2,
+        'AI/ML': 1.4,
+        'Fintech': 1.3,
+        'Healthcare': 1.1,
+        'Education': 0.9
+    }
+    
+    predicted_salary = base_salary * exp_multipliers.get(job.experience_level, 1.0) * industry_multipliers.get(job.industry, 1.0)
+    
+    return {
+        "predicted_salary": int(predicted_salary),
+        "method": "rule_based",
+        "confidence": 0.7
+    }
+
 class JobRecommendationEngine:
     def __init__(self):
         self.model_loaded = False
+        self.job_index = None
+        self.indexed_jobs = None
+        self._indexed_key = None
+        # The index replaced last, for requests still holding the previous job list
+        self._previous_index = (None, None)
+        self.model_fingerprint = None
+        self.salary_predictor = None
+        # Recommendations run in worker threads; index swaps and lookups share this lock
+        self._index_lock = threading.RLock()
+        self._served = threading.local()
         self.load_model()
     
     def load_model(self):
@@ -85,9 +164,12 @@ class JobRecommendationEngine:
                 global ml_model, tfidf_vectorizer
                 ml_model = model_data
                 tfidf_vectorizer = model_data['tfidf_vectorizer']
+                stat = os.stat(model_path)
+                self.model_fingerprint = f"{stat.st_size}-{stat.st_mtime_ns}"
                 
                 logger.info("✅ ML model loaded successfully!")
                 self.model_loaded = True
+                self._load_salary_predictor(model_data)
             else:
                 logger.warning("⚠️ No pre-trained model found. Using fallback recommendations.")
                 self.model_loaded = False
@@ -98,6 +180,33 @@ class JobRecommendationEngine:
             self.model_loaded = False
             self._initialize_fallback_components()
     
+    def _load_salary_predictor(self, model_data):
+        """Lookup table + flattened forest for /api/predict_salary; rules are used without it"""
+        try:
+            self.salary_predictor = SalaryPredictor.from_model_data(model_data)
+        except Exception as e:
+            logger.warning(f"⚠️ Salary model unavailable, using rule-based salaries: {e}")
+            self.salary_predictor = None
+    
+    def predict_salaries(self, jobs: List[JobData]):
+        """Predicted salary responses for a batch of postings, in order"""
+        details = [job_salary_details(job) for job in jobs]
+        predictions = self.salary_predictor.predict(details) if self.salary_predictor else [None] * len(jobs)
+        
+        results = []
+        for job, job_details, predicted in zip(jobs, details, predictions):
+            if predicted is None:
+                # No model, or a category the encoders have not seen
+                results.append(rule_based_salary(job))
+            else:
+                results.append({
+                    "predicted_salary": predicted,
+                    "method": "ml_model",
+                    "confidence": 0.85,
+                    "job_details": job_details
+                })
+        return results
+    
     def _initialize_fallback_components(self):
         """Initialize components for fallback recommendations"""
         global tfidf_vectorizer
@@ -119,66 +228,289 @@ class JobRecommendationEngine:
             logger.error(f"Error generating recommendations: {e}")
             return self._get_simple_recommendations(user_prefs, available_jobs, top_n)
     
+    def recommend(self, user_prefs: UserPreferences, available_jobs: List[JobData], top_n: int = 10,
+                  degraded: bool = False):
+        """
+        Recommendations plus the tier that produced them
+        
+        Args:
+            degraded: serve from the cheap keyword tier (used under load)
+        
+        Returns:
+            (recommendations, tier) with tier one of TIER_ALGORITHMS
+        """
+        self._served.tier = None
+        if degraded:
+            recommendations = self._get_keyword_recommendations(user_prefs, available_jobs, top_n)
+        else:
+            recommendations = self.get_recommendations(user_prefs, available_jobs, top_n)
+        return recommendations, self._served.tier or 'keyword'
+    
+    def recommend_batch(self, requests):
+        """
+        Recommendations for several concurrent requests
+        
+        Requests against the same job list share one vectorizer call and one
+        sparse matrix product against the job index; bonuses and ranking stay
+        per request, so every result equals what recommend() returns.
+        
+        Args:
+            requests: list of (user_prefs, available_jobs, top_n)
+        
+        Returns:
+            list of (recommendations, tier, spans), in request order, where
+            spans are the shared and own spans to add to each caller's trace
+        """
+        results = [None] * len(requests)
+        groups = {}
+        for i, (_, jobs, _) in enumerate(requests):
+            groups.setdefault(id(jobs), []).append(i)
+        
+        for members in groups.values():
+            jobs = requests[members[0]][1]
+            batch = [(requests[i][0], requests[i][2]) for i in members]
+            try:
+                if len(batch) == 1 or not jobs:
+                    scored = [self._recommend_collected(user_prefs, jobs, top_n) for user_prefs, top_n in batch]
+                else:
+                    scored = self._score_batch(batch, jobs)
+            except Exception as e:
+                logger.error(f"Batched recommendation error: {e}")
+                scored = [self._recommend_collected(user_prefs, jobs, top_n) for user_prefs, top_n in batch]
+            for i, result in zip(members, scored):
+                results[i] = result
+        return results
+    
+    def _recommend_collected(self, user_prefs, jobs, top_n):
+        """recommend() with its spans collected for the caller"""
+        with collect_spans() as spans:
+            recommendations, tier = self.recommend(user_prefs, jobs, top_n)
+        return recommendations, tier, spans
+    
+    def _score_batch(self, batch, jobs):
+        """ML or fallback tier for a list of (user_prefs, top_n) against one job list"""
+        ml_mode = self.model_loaded and ml_model is not None
+        with collect_spans() as prepare_spans:
+            index = self._index_for(jobs)
+            with span('vectorize', queries=len(batch)):
+                if ml_mode:
+                    queries = index.vectorizer.transform([user_prefs.skills for user_prefs, _ in batch])
+                else:
+                    queries = index.vectorizer.transform([self._fallback_query(user_prefs) for user_prefs, _ in batch])
+        
+        # Similarities are dense (queries x jobs), so large catalogs are scored in blocks
+        block = max(1, BATCH_SCORE_CELLS // max(len(index), 1))
+        results = []
+        for start in range(0, len(batch), block):
+            with collect_spans() as block_spans:
+                with span('score_batch', queries=min(block, len(batch) - start), jobs=len(index)):
+                    similarities = index.similarities(queries[start:start + block])
+            
+            for similarity, (user_prefs, top_n) in zip(similarities, batch[start:start + block]):
+                with collect_spans() as own_spans:
+                    if ml_mode:
+                        with span('bonus'):
+                            bonus = self._ml_bonuses(index, user_prefs)
+                    else:
+                        user_skills = self._user_skills(user_prefs)
+                        with span('bonus'):
+                            bonus = self._fallback_bonus(index, user_prefs, user_skills)
+                    with span('score', jobs=len(index)):
+                        rows, scores = index.score(bonus=bonus, cap=1.0, similarity=similarity)
+                    with span('sort', top_n=top_n):
+                        positions, scores = index.rank(rows, scores, top_n=top_n)
+                    with span('results'):
+                        matching = None if ml_mode else self._matching_skills(jobs, positions, user_skills)
+                        recommendations = self._job_results(jobs, positions, scores, matching)
+                results.append((recommendations, 'ml' if ml_mode else 'tfidf',
+                                prepare_spans + block_spans + own_spans))
+        return results
+    
+    def index_jobs(self, jobs: List[JobData]):
+        """Build the shared job index (text vectors, category codes, skills) for a job list"""
+        ml_mode = self.model_loaded and ml_model is not None
+        fields = job_columns(jobs)
+        with span('vectorize_jobs', jobs=len(jobs)):
+            if ml_mode:
+                vectorizer = ml_model['tfidf_vectorizer']
+                texts = [f"{title} {' '.join(skills)} {industry}"
+                         for title, skills, industry in zip(fields['title'], fields['skills'], fields['industry'])]
+                vectors = vectorizer.transform(texts) if len(jobs) else None
+            else:
+                # A fresh fallback vectorizer is fitted once per job list instead of per request;
+                # requests still using the previous index keep transforming with its own one
+                vectorizer = clone(tfidf_vectorizer)
+                texts = [f"{title} {' '.join(skills)} {industry} {description}"
+                         for title, skills, industry, description
+                         in zip(fields['title'], fields['skills'], fields['industry'], fields['description'])]
+                vectors = vectorizer.fit_transform(texts) if len(jobs) else None
+        
+        with span('build_index'):
+            columns = {
+                'title': fields['title'],
+                'experience_level': fields['experience_level'],
+                'industry': fields['industry'],
+                'location': fields['location'],
+                'salary_min': np.array([salary or 0 for salary in fields['salary_min']], dtype=np.float64)
+            }
+            index = JobIndex(columns, vectors, code_columns=['title', 'experience_level', 'industry', 'location'],
+                             skill_sets=fields['skills'], vectorizer=vectorizer)
+        key = (id(jobs), len(jobs), ml_mode)
+        with self._index_lock:
+            if self._indexed_key != key:
+                self._previous_index = (self._indexed_key, self.job_index)
+            self.job_index = index
+            self.indexed_jobs = jobs
+            self._indexed_key = key
+        logger.info(f"Job index built for {len(jobs)} jobs")
+        return index
+    
+    def snapshot_jobs(self, jobs):
+        """Write the job store and its index to disk, unless a newer update replaced them"""
+        with self._index_lock:
+            index, indexed_jobs = self.job_index, self.indexed_jobs
+        if jobs is not indexed_jobs or not isinstance(jobs, JobStore):
+            return
+        try:
+            ml_mode = self.model_loaded and ml_model is not None
+            with span('snapshot', jobs=len(jobs)):
+                path = save_snapshot(jobs, index, 'ml' if ml_mode else 'fallback',
+                                     self.model_fingerprint, None if ml_mode else index.vectorizer)
+            logger.info(f"Job cache snapshot written to {path}")
+        except Exception as e:
+            logger.error(f"Snapshot error: {e}")
+    
+    def restore_snapshot(self):
+        """
+        Reload the last job cache snapshot
+        
+        The saved index is reused when it was built with the vectorizer in use
+        now (same model file, or the saved fallback vectorizer); otherwise it is
+        rebuilt from the restored jobs.
+        
+        Returns:
+            The restored JobStore, or None without a snapshot
+        """
+        snapshot = load_snapshot()
+        if snapshot is None:
+            return None
+        meta, store_state, index_state, vectorizer = snapshot
+        store = JobStore.from_state(store_state)
+        
+        ml_mode = self.model_loaded and ml_model is not None
+        if ml_mode:
+            reusable = meta['mode'] == 'ml' and meta['model_fingerprint'] == self.model_fingerprint
+        else:
+            reusable = meta['mode'] == 'fallback' and vectorizer is not None
+        
+        if index_state is not None and reusable:
+            index = JobIndex.from_state(index_state)
+            index.vectorizer = ml_model['tfidf_vectorizer'] if ml_mode else vectorizer
+            with self._index_lock:
+                self.job_index = index
+                self.indexed_jobs = store
+                self._indexed_key = (id(store), len(store), ml_mode)
+        else:
+            self.index_jobs(store)
+        
+        logger.info(f"✅ Restored {len(store)} jobs from snapshot of {meta['created']}")
+        return store
+    
+    def _index_for(self, jobs: List[JobData]):
+        """Index for the given job list, rebuilt only when the list changes"""
+        key = (id(jobs), len(jobs), self.model_loaded and ml_model is not None)
+        with self._index_lock:
+            if self._indexed_key == key:
+                return self.job_index
+            if self._previous_index[0] == key:
+                return self._previous_index[1]
+            return self.index_jobs(jobs)
+    
+    def _experience_bonus(self, index, user_experience):
+        """+0.2 for the same experience level, +0.1 for a compatible one"""
+        weights = {level: 0.1 for level in index.lookup['experience_level']
+                   if self._is_compatible_experience(level, user_experience)}
+        weights[user_experience] = 0.2
+        return index.category_weights('experience_level', weights)
+    
+    def _ml_bonuses(self, index, user_prefs):
+        """ML tier bonuses, in the order they are added to the similarity"""
+        user_location = user_prefs.location.lower()
+        return [
+            self._experience_bonus(index, user_prefs.experience),
+            index.category_weights('industry', {user_prefs.industry: 0.15}),
+            0.1 * (index.value_mask('location', lambda loc: user_location in loc.lower())
+                   | (user_location == 'remote')),
+            0.05 * ((index.columns['salary_min'] > 0) & (index.columns['salary_min'] >= user_prefs.min_salary))
+        ]
+    
+    @staticmethod
+    def _fallback_query(user_prefs):
+        """User preferences as query against the job text vectors"""
+        return f"{user_prefs.skills} {user_prefs.industry} {user_prefs.experience}"
+    
+    @staticmethod
+    def _user_skills(user_prefs):
+        return [skill.strip().lower() for skill in user_prefs.skills.split(',')]
+    
+    def _fallback_bonus(self, index, user_prefs, user_skills):
+        """Fallback tier bonus scoring, summed before it is added to the similarity"""
+        user_location = user_prefs.location.lower()
+        return (
+            self._experience_bonus(index, user_prefs.experience)
+            + index.category_weights('industry', {user_prefs.industry: 0.15})
+            + 0.1 * (index.value_mask('location', lambda loc: user_location in loc.lower() or 'remote' in loc.lower())
+                     | (user_location == 'remote'))
+            + 0.05 * index.skill_match_counts(user_skills)
+            + 0.05 * ((index.columns['salary_min'] > 0) & (index.columns['salary_min'] >= user_prefs.min_salary))
+        )
+    
+    @staticmethod
+    def _matching_skills(jobs, positions, user_skills):
+        """Matching skills, only listed for the returned jobs"""
+        user_skill_set = set(user_skills)
+        return [sorted(user_skill_set & {skill.lower() for skill in jobs[p].skills})
+                for p in positions.tolist()]
+    
+    def _job_results(self, jobs, positions, scores, matching=None):
+        results = []
+        for i, (position, score) in enumerate(zip(positions.tolist(), scores.tolist())):
+            job = jobs[position]
+            result = {
+                'job_id': job.job_id,
+                'title': job.title,
+                'company': job.company,
+                'location': job.location,
+                'similarity_score': score,
+                'industry': job.industry,
+                'experience_level': job.experience_level,
+                'salary_min': job.salary_min,
+                'skills': job.skills
+            }
+            if matching is not None:
+                result['matching_skills'] = matching[i]
+            results.append(result)
+        return results
+    
     def _get_ml_recommendations(self, user_prefs: UserPreferences, available_jobs: List[JobData], top_n: int):
         """Use trained ML model for recommendations"""
         try:
-            # Prepare user preferences for ML model
-            user_data = {
-                'skills': user_prefs.skills,
-                'experience': user_prefs.experience,
-                'industry': user_prefs.industry,
-                'location': user_prefs.location,
-                'min_salary': user_prefs.min_salary
-            }
-            
-            # Get recommendations from ML model
-            recommendations = ml_model['tfidf_vectorizer'].transform([user_prefs.skills])
-            
-            # Score available jobs
-            job_scores = []
-            for job in available_jobs:
-                job_text = f"{job.title} {' '.join(job.skills)} {job.industry}"
-                job_vector = ml_model['tfidf_vectorizer'].transform([job_text])
-                
-                # Calculate similarity
-                similarity = cosine_similarity(recommendations, job_vector)[0][0]
-                
-                # Apply additional scoring factors
-                score = similarity
-                
-                # Experience level bonus
-                if job.experience_level == user_prefs.experience:
-                    score += 0.2
-                elif self._is_compatible_experience(job.experience_level, user_prefs.experience):
-                    score += 0.1
-                
-                # Industry bonus
-                if job.industry == user_prefs.industry:
-                    score += 0.15
-                
-                # Location bonus
-                if user_prefs.location.lower() in job.location.lower() or user_prefs.location.lower() == 'remote':
-                    score += 0.1
-                
-                # Salary bonus
-                if job.salary_min and job.salary_min >= user_prefs.min_salary:
-                    score += 0.05
-                
-                job_scores.append({
-                    'job_id': job.job_id,
-                    'title': job.title,
-                    'company': job.company,
-                    'location': job.location,
-                    'similarity_score': min(score, 1.0),  # Cap at 1.0
-                    'industry': job.industry,
-                    'experience_level': job.experience_level,
-                    'salary_min': job.salary_min,
-                    'skills': job.skills
-                })
+            if not available_jobs:
+                return []
+            index = self._index_for(available_jobs)
+            with span('vectorize'):
+                user_vector = index.vectorizer.transform([user_prefs.skills])
+            with span('bonus'):
+                bonuses = self._ml_bonuses(index, user_prefs)
             
-            # Sort by score and return top N
-            job_scores.sort(key=lambda x: x['similarity_score'], reverse=True)
-            return job_scores[:top_n]
+            with span('score', jobs=len(index)):
+                rows, scores = index.score(user_vector, bonus=bonuses, cap=1.0)
+            with span('sort', top_n=top_n):
+                positions, scores = index.rank(rows, scores, top_n=top_n)
+            with span('results'):
+                results = self._job_results(available_jobs, positions, scores)
+            self._served.tier = 'ml'
+            return results
             
         except Exception as e:
             logger.error(f"ML recommendation error: {e}")
@@ -189,130 +521,111 @@ class JobRecommendationEngine:
         try:
             if not available_jobs:
                 return []
+            index = self._index_for(available_jobs)
             
-            # Prepare job texts for TF-IDF
-            job_texts = []
-            for job in available_jobs:
-                job_text = f"{job.title} {' '.join(job.skills)} {job.industry} {job.description}"
-                job_texts.append(job_text)
-            
-            # Add user preferences as query
-            user_query = f"{user_prefs.skills} {user_prefs.industry} {user_prefs.experience}"
-            
-            # Fit TF-IDF on job texts + user query
-            all_texts = job_texts + [user_query]
-            tfidf_matrix = tfidf_vectorizer.fit_transform(all_texts)
+            with span('vectorize'):
+                user_vector = index.vectorizer.transform([self._fallback_query(user_prefs)])
+            user_skills = self._user_skills(user_prefs)
+            with span('bonus'):
+                bonus = self._fallback_bonus(index, user_prefs, user_skills)
             
-            # Get similarity between user query and all jobs
-            user_vector = tfidf_matrix[-1]  # Last item is user query
-            job_vectors = tfidf_matrix[:-1]  # All except last
+            with span('score', jobs=len(index)):
+                rows, scores = index.score(user_vector, bonus=bonus, cap=1.0)
+            with span('sort', top_n=top_n):
+                positions, scores = index.rank(rows, scores, top_n=top_n)
             
-            similarities = cosine_similarity(user_vector, job_vectors)[0]
+            # Matching skills are only listed for the returned jobs
+            with span('results'):
+                matching = self._matching_skills(available_jobs, positions, user_skills)
+                results = self._job_results(available_jobs, positions, scores, matching)
+            self._served.tier = 'tfidf'
+            return results
             
-            # Create scored recommendations
-            job_scores = []
-            for i, job in enumerate(available_jobs):
-                base_score = similarities[i]
-                
-                # Apply bonus scoring
-                bonus = 0
-                
-                # Experience match bonus
-                if job.experience_level == user_prefs.experience:
-                    bonus += 0.2
-                elif self._is_compatible_experience(job.experience_level, user_prefs.experience):
-                    bonus += 0.1
-                
-                # Industry match bonus
-                if job.industry == user_prefs.industry:
-                    bonus += 0.15
-                
-                # Location match bonus
-                if (user_prefs.location.lower() in job.location.lower() or 
-                    user_prefs.location.lower() == 'remote' or 
-                    'remote' in job.location.lower()):
-                    bonus += 0.1
-                
-                # Skills match bonus
-                user_skills = [skill.strip().lower() for skill in user_prefs.skills.split(',')]
-                job_skills = [skill.lower() for skill in job.skills]
-                matching_skills = set(user_skills) & set(job_skills)
-                if matching_skills:
-                    bonus += len(matching_skills) * 0.05
-                
-                # Salary bonus
-                if job.salary_min and job.salary_min >= user_prefs.min_salary:
-                    bonus += 0.05
-                
-                final_score = min(base_score + bonus, 1.0)
-                
-                job_scores.append({
-                    'job_id': job.job_id,
-                    'title': job.title,
-                    'company': job.company,
-                    'location': job.location,
-                    'similarity_score': final_score,
-                    'industry': job.industry,
-                    'experience_level': job.experience_level,
-                    'salary_min': job.salary_min,
-                    'skills': job.skills,
-                    'matching_skills': list(matching_skills) if matching_skills else []
-                })
+        except Exception as e:
+            logger.error(f"Fallback recommendation error: {e}")
+            return self._get_simple_recommendations(user_prefs, available_jobs, top_n)
+    
+    def _get_keyword_recommendations(self, user_prefs: UserPreferences, available_jobs: List[JobData], top_n: int):
+        """Keyword scores of the simple tier, computed over the job index (cheap tier under load)"""
+        try:
+            if not available_jobs:
+                return []
+            index = self._index_for(available_jobs)
+            user_skills = self._user_skills(user_prefs)
+            user_location = user_prefs.location.lower()
             
-            # Sort by score and return top N
-            job_scores.sort(key=lambda x: x['similarity_score'], reverse=True)
-            return job_scores[:top_n]
+            with span('keyword_score', jobs=len(index)):
+                # Title keyword points are worked out once per distinct title
+                title_points = {title: 10 * sum(any(skill in word for word in title.lower().split())
+                                                for skill in user_skills)
+                                for title in index.lookup['title']}
+                score = (
+                    index.category_weights('title', title_points)
+                    + 15 * index.skill_match_counts(user_skills)
+                    + 20 * index.equals_mask('industry', user_prefs.industry)
+                    + 15 * index.equals_mask('experience_level', user_prefs.experience)
+                    + 10 * (index.value_mask('location', lambda loc: user_location in loc.lower())
+                            | (user_location == 'remote'))
+                )
+            with span('sort', top_n=top_n):
+                positions, scores = index.search(bonus=np.minimum(score / 100, 1.0), top_n=top_n)
+            results = self._job_results(available_jobs, positions, scores)
+            self._served.tier = 'keyword'
+            return results
             
         except Exception as e:
-            logger.error(f"Fallback recommendation error: {e}")
+            logger.error(f"Keyword recommendation error: {e}")
             return self._get_simple_recommendations(user_prefs, available_jobs, top_n)
     
     def _get_simple_recommendations(self, user_prefs: UserPreferences, available_jobs: List[JobData], top_n: int):
         """Simple keyword-based recommendations as last resort"""
         try:
-            user_skills = [skill.strip().lower() for skill in user_prefs.skills.split(',')]
-            
-            job_scores = []
-            for job in available_jobs:
-                score = 0
+            with span('keyword_score', jobs=len(available_jobs)):
+                user_skills = [skill.strip().lower() for skill in user_prefs.skills.split(',')]
                 
-                # Title keyword matching
-                title_words = job.title.lower().split()
-                for skill in user_skills:
-                    if any(skill in word for word in title_words):
+                job_scores = []
+                for job in available_jobs:
+                    score = 0
+                    
+                    # Title keyword matching
+                    title_words = job.title.lower().split()
+                    for skill in user_skills:
+                        if any(skill in word for word in title_words):
+                            score += 10
+                    
+                    # Skills matching
+                    job_skills = [skill.lower() for skill in job.skills]
+                    matching_skills = set(user_skills) & set(job_skills)
+                    score += len(matching_skills) * 15
+                    
+                    # Industry matching
+                    if job.industry == user_prefs.industry:
+                        score += 20
+                    
+                    # Experience matching
+                    if job.experience_level == user_prefs.experience:
+                        score += 15
+                    
+                    # Location matching
+                    if (user_prefs.location.lower() in job.location.lower() or 
+                        user_prefs.location.lower() == 'remote'):
                         score += 10
+                    
+                    job_scores.append({
+                        'job_id': job.job_id,
+                        'title': job.title,
+                        'company': job.company,
+                        'location': job.location,
+                        'similarity_score': min(score / 100, 1.0),  # Normalize to 0-1
+                        'industry': job.industry,
+                        'experience_level': job.experience_level,
+                        'salary_min': job.salary_min,
+                        'skills': job.skills
+                    })
                 
-                # Skills matching
-                job_skills = [skill.lower() for skill in job.skills]
-                matching_skills = set(user_skills) & set(job_skills)
-                score += len(matching_skills) * 15
-                
-                # Industry matching
-                if job.industry == user_prefs.industry:
-                    score += 20
-                
-                # Experience matching
-                if job.experience_level == user_prefs.experience:
-                    score += 15
-                
-                # Location matching
-                if (user_prefs.location.lower() in job.location.lower() or 
-                    user_prefs.location.lower() == 'remote'):
-                    score += 10
-                
-                job_scores.append({
-                    'job_id': job.job_id,
-                    'title': job.title,
-                    'company': job.company,
-                    'location': job.location,
-                    'similarity_score': min(score / 100, 1.0),  # Normalize to 0-1
-                    'industry': job.industry,
-                    'experience_level': job.experience_level,
-                    'salary_min': job.salary_min,
-                    'skills': job.skills
-                })
-            
-            job_scores.sort(key=lambda x: x['similarity_score'], reverse=True)
+            with span('sort', top_n=top_n):
+                job_scores.sort(key=lambda x: x['similarity_score'], reverse=True)
+            self._served.tier = 'keyword'
             return job_scores[:top_n]
             
         except Exception as e:
@@ -335,36 +648,38 @@ class JobRecommendationEngine:
             logger.info(f"Training model with {len(training_data)} data points")
             
             # Prepare training data
-            user_features = []
-            interaction_features = []
-            
-            for data in training_data:
-                # User features
-                user_feature = f"{data.user_preferences.skills} {data.user_preferences.industry} {data.user_preferences.experience}"
-                user_features.append(user_feature)
+            with span('prepare', samples=len(training_data)):
+                user_features = []
+                interaction_features = []
                 
-                # Interaction features (positive/negative feedback)
-                for interaction in data.interactions:
-                    interaction_type = interaction.get('type', 'view')  # apply, save, view
-                    job_info = interaction.get('job', {})
+                for data in training_data:
+                    # User features
+                    user_feature = f"{data.user_preferences.skills} {data.user_preferences.industry} {data.user_preferences.experience}"
+                    user_features.append(user_feature)
                     
-                    # Create feature vector for this interaction
-                    interaction_feature = {
-                        'user_id': data.user_id,
-                        'user_skills': data.user_preferences.skills,
-                        'job_title': job_info.get('title', ''),
-                        'job_skills': ' '.join(job_info.get('skills', [])),
-                        'job_industry': job_info.get('industry', ''),
-                        'interaction_type': interaction_type,
-                        'positive_feedback': interaction_type in ['apply', 'save']
-                    }
-                    interaction_features.append(interaction_feature)
-            
+                    # Interaction features (positive/negative feedback)
+                    for interaction in data.interactions:
+                        interaction_type = interaction.get('type', 'view')  # apply, save, view
+                        job_info = interaction.get('job', {})
+                        
+                        # Create feature vector for this interaction
+                        interaction_feature = {
+                            'user_id': data.user_id,
+                            'user_skills': data.user_preferences.skills,
+                            'job_title': job_info.get('title', ''),
+                            'job_skills': ' '.join(job_info.get('skills', [])),
+                            'job_industry': job_info.get('industry', ''),
+                            'interaction_type': interaction_type,
+                            'positive_feedback': interaction_type in ['apply', 'save']
+                        }
+                        interaction_features.append(interaction_feature)
+                
             # Save training data for future model updates
-            training_file = f"training_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            with open(training_file, 'w') as f:
-                json.dump([data.dict() for data in training_data], f, indent=2)
-            
+            with span('save_data'):
+                training_file = f"training_data_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+                with open(training_file, 'w') as f:
+                    json.dump([data.dict() for data in training_data], f, indent=2)
+                
             logger.info(f"✅ Training data saved to {training_file}")
             
             # Here you would implement actual ML training
@@ -375,7 +690,17 @@ class JobRecommendationEngine:
                 
                 if len(all_texts) > 10:  # Only retrain if we have enough data
                     global tfidf_vectorizer
-                    tfidf_vectorizer.fit(all_texts)
+                    # Fit a copy: requests in flight keep transforming with the current one
+                    with span('refit', texts=len(all_texts)):
+                        refitted = clone(tfidf_vectorizer).fit(all_texts)
+                    with self._index_lock:
+                        if ml_model is not None and ml_model['tfidf_vectorizer'] is tfidf_vectorizer:
+                            ml_model['tfidf_vectorizer'] = refitted
+                            # Indexes built now no longer match the model file's vectorizer
+                            self.model_fingerprint = None
+                        tfidf_vectorizer = refitted
+                        self._indexed_key = None  # Job vectors must be rebuilt with the new vocabulary
+                        self._previous_index = (None, None)
                     logger.info("✅ TF-IDF model updated with new training data")
             
             return {"status": "success", "message": f"Model trained with {len(training_data)} samples"}
@@ -387,6 +712,60 @@ class JobRecommendationEngine:
 # Initialize recommendation engine
 recommendation_engine = JobRecommendationEngine()
 
+# Concurrent ML/TF-IDF requests are scored together (ML_BATCH_MAX_SIZE=1 or ML_BATCH_WINDOW_MS=0 disables)
+recommend_batcher = (MicroBatcher(recommendation_engine.recommend_batch)
+                     if BATCH_MAX_SIZE > 1 and BATCH_WINDOW_MS > 0 else None)
+
+# Bounds concurrent /api/recommend work; degrades to the keyword tier under load.
+# With batching a running request may be one of a batch, so the limit covers full batches
+admission = AdmissionController(recommend_batcher.capacity if recommend_batcher else MAX_CONCURRENCY)
+
+# Identical concurrent /api/recommend requests share one computation
+recommend_flights = SingleFlight()
+
+def recommendation_key(request: RecommendationRequest, jobs):
+    """
+    Normalized form of a recommendation request, for coalescing
+    
+    Only differences no tier can see are removed: whitespace around each
+    skill, skill case when the vectorizer lowercases (every other tier
+    lowercases skills), and location case. The job list is part of the key
+    so requests made after a cache update never share older results.
+    """
+    prefs = request.user_preferences
+    skills = [skill.strip() for skill in prefs.skills.split(',')]
+    if getattr(tfidf_vectorizer, 'lowercase', False):
+        skills = [skill.lower() for skill in skills]
+    return (tuple(skills), prefs.experience, prefs.industry, prefs.location.lower(), prefs.min_salary,
+            request.top_n, id(jobs), len(jobs))
+
+async def compute_recommendations(request: RecommendationRequest, jobs):
+    """Recommendations off the event loop and within the admission limits"""
+    try:
+        ticket = admission.admit()
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    async with ticket:
+        if recommend_batcher is not None and not ticket.degraded:
+            with span('batch'):
+                recommendations, tier, batch_spans = await recommend_batcher.submit(
+                    (request.user_preferences, jobs, request.top_n))
+                record_spans(batch_spans)
+        else:
+            recommendations, tier = await run_in_threadpool(
+                recommendation_engine.recommend,
+                request.user_preferences,
+                jobs,
+                request.top_n,
+                ticket.degraded
+            )
+    return recommendations, tier, ticket.degraded
+
+# Serve the last snapshotted catalog until the main application pushes a new one
+if SNAPSHOT_DIR:
+    job_data_cache = recommendation_engine.restore_snapshot() or job_data_cache
+
 # API Endpoints
 @app.get("/")
 async def root():
@@ -399,7 +778,8 @@ async def root():
             "recommend": "/api/recommend",
             "train": "/api/train",
             "health": "/api/health",
-            "predict_salary": "/api/predict_salary"
+            "predict_salary": "/api/predict_salary",
+            "predict_salaries": "/api/predict_salaries"
         }
     }
 
@@ -416,6 +796,9 @@ async def health_check():
 async def get_recommendations(request: RecommendationRequest):
     """Get job recommendations for a user"""
     try:
+        # Body read and pydantic validation happen before the handler runs
+        record_span('parse', request_start_ns())
+        
         # In a real implementation, you'd fetch available jobs from your database
         # For now, we'll use cached job data or return a sample response
         
@@ -485,21 +868,28 @@ async def get_recommendations(request: RecommendationRequest):
             ]
             job_data_cache.extend(sample_jobs)
         
-        # Get recommendations
-        recommendations = recommendation_engine.get_recommendations(
-            request.user_preferences,
-            job_data_cache,
-            request.top_n
+        # Get recommendations (joining an identical request already in flight)
+        jobs = job_data_cache
+        (recommendations, tier, degraded), coalesced = await recommend_flights.run(
+            recommendation_key(request, jobs),
+            lambda: compute_recommendations(request, jobs)
         )
         
-        return {
+        response = {
             "success": True,
             "recommendations": recommendations,
             "total_count": len(recommendations),
-            "algorithm": "ml_based" if recommendation_engine.model_loaded else "tfidf_similarity",
+            "algorithm": TIER_ALGORITHMS[tier],
+            "tier": tier,
+            "degraded": degraded,
+            "coalesced": coalesced,
             "user_preferences": request.user_preferences.dict()
         }
+        with span('encode'):
+            return JSONResponse(jsonable_encoder(response), headers={"X-Recommendation-Tier": tier})
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Recommendation error: {e}")
         raise HTTPException(status_code=500, detail=f"Error generating recommendations: {str(e)}")
@@ -508,6 +898,7 @@ async def get_recommendations(request: RecommendationRequest):
 async def train_model(training_data: List[TrainingData]):
     """Train the ML model with user interaction data"""
     try:
+        record_span('parse', request_start_ns())
         result = recommendation_engine.train_model(training_data)
         return result
         
@@ -519,65 +910,39 @@ async def train_model(training_data: List[TrainingData]):
 async def predict_salary(job_data: JobData):
     """Predict salary for a job posting"""
     try:
-        if not recommendation_engine.model_loaded or not ml_model:
-            # Fallback salary prediction based on simple rules
-            base_salary = 70000
-            
-            # Experience level multiplier
-            exp_multipliers = {
-                'Entry-level': 1.0,
-                'Mid-level': 1.3,
-                'Senior': 1.6,
-                'Executive': 2.0
-            }
-            
-            # Industry multiplier
-            industry_multipliers = {
-                'Software': 1.2,
-                'AI/ML': 1.4,
-                'Fintech': 1.3,
-                'Healthcare': 1.1,
-                'Education': 0.9
-            }
-            
-            predicted_salary = base_salary * exp_multipliers.get(job_data.experience_level, 1.0) * industry_multipliers.get(job_data.industry, 1.0)
-            
-            return {
-                "predicted_salary": int(predicted_salary),
-                "method": "rule_based",
-                "confidence": 0.7
-            }
-        
-        # Use ML model for prediction
-        # This would use your trained salary prediction model
-        job_details = {
-            'experience': job_data.experience_level,
-            'industry': job_data.industry,
-            'location': job_data.location,
-            'skills': ', '.join(job_data.skills),
-            'title': job_data.title
-        }
-        
-        # Placeholder - replace with actual ML model prediction
-        predicted_salary = 95000  # Your ML model would predict this
+        with span('predict'):
+            return recommendation_engine.predict_salaries([job_data])[0]
         
-        return {
-            "predicted_salary": predicted_salary,
-            "method": "ml_model",
-            "confidence": 0.85,
-            "job_details": job_details
-        }
+    except Exception as e:
+        logger.error(f"Salary prediction error: {e}")
+        raise HTTPException(status_code=500, detail=f"Salary prediction failed: {str(e)}")
+
+@app.post("/api/predict_salaries")
+async def predict_salaries(jobs: List[JobData]):
+    """Predict salaries for many job postings in one batched model pass"""
+    try:
+        record_span('parse', request_start_ns(), jobs=len(jobs))
+        with span('predict', jobs=len(jobs)):
+            predictions = await run_in_threadpool(recommendation_engine.predict_salaries, jobs)
+        return {"predictions": predictions, "count": len(predictions)}
         
     except Exception as e:
         logger.error(f"Salary prediction error: {e}")
         raise HTTPException(status_code=500, detail=f"Salary prediction failed: {str(e)}")
 
 @app.post("/api/update_job_cache")
-async def update_job_cache(jobs: List[JobData]):
+async def update_job_cache(jobs: List[JobData], background_tasks: BackgroundTasks):
     """Update the job cache with latest job data from the main application"""
     try:
+        record_span('parse', request_start_ns(), jobs=len(jobs))
         global job_data_cache
-        job_data_cache = jobs
+        store = JobStore.from_jobs(jobs)
+        # Indexing takes seconds for large catalogs; keep the event loop serving meanwhile.
+        # The new jobs are published once their index is in place
+        await run_in_threadpool(recommendation_engine.index_jobs, store)
+        job_data_cache = store
+        if SNAPSHOT_DIR:
+            background_tasks.add_task(recommendation_engine.snapshot_jobs, job_data_cache)
         
         logger.info(f"Job cache updated with {len(jobs)} jobs")
         
@@ -591,18 +956,65 @@ async def update_job_cache(jobs: List[JobData]):
         logger.error(f"Cache update error: {e}")
         raise HTTPException(status_code=500, detail=f"Cache update failed: {str(e)}")
 
+@app.post("/api/update_job_cache/bulk")
+async def bulk_update_job_cache(request: Request, background_tasks: BackgroundTasks):
+    """
+    Replace the job cache from a streamed bulk upload
+    
+    Accepts NDJSON (one JobData object per line, application/x-ndjson) or an
+    Arrow IPC stream (application/vnd.apache.arrow.stream, needs pyarrow),
+    optionally compressed with Content-Encoding gzip, deflate or zstd. Records
+    are validated in batches straight into the columnar job store, without
+    building a pydantic object per job. Any invalid record (422) or body that
+    cannot be decoded (400) rejects the upload and the current cache is kept.
+    """
+    try:
+        with span('ingest'):
+            store = await ingest_jobs(request.stream(), request.headers.get('content-type'),
+                                      request.headers.get('content-encoding'))
+    except MalformedUpload as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except UnsupportedUpload as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except JobValidationError as e:
+        raise HTTPException(status_code=422, detail={"message": str(e), "errors": e.errors})
+    
+    try:
+        global job_data_cache
+        await run_in_threadpool(recommendation_engine.index_jobs, store)
+        job_data_cache = store
+        if SNAPSHOT_DIR:
+            background_tasks.add_task(recommendation_engine.snapshot_jobs, job_data_cache)
+        
+        logger.info(f"Job cache bulk-loaded with {len(store)} jobs")
+        
+        return {
+            "success": True,
+            "message": f"Job cache updated with {len(store)} jobs",
+            "cache_size": len(job_data_cache)
+        }
+        
+    except Exception as e:
+        logger.error(f"Bulk cache update error: {e}")
+        raise HTTPException(status_code=500, detail=f"Cache update failed: {str(e)}")
+
 @app.get("/api/stats")
 async def get_stats():
     """Get service statistics"""
     return {
         "model_loaded": recommendation_engine.model_loaded,
         "cache_size": len(job_data_cache),
+        "admission": admission.stats(),
+        "coalescing": recommend_flights.stats(),
+        "batching": recommend_batcher.stats() if recommend_batcher else None,
         "service_uptime": datetime.now().isoformat(),
         "available_endpoints": [
             "/api/recommend",
             "/api/train", 
             "/api/predict_salary",
+            "/api/predict_salaries",
             "/api/update_job_cache",
+            "/api/update_job_cache/bulk",
             "/api/health"
         ]
     }
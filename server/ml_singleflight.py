@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Single-Flight Request Coalescing for the ML Service
+Concurrent callers with the same key share one in-flight computation
+"""
+
+import asyncio
+
+
+class SingleFlight:
+    """
+    In-flight deduplication keyed by a normalized request
+
+    The first caller for a key starts the computation as its own task;
+    callers arriving while it runs await the same task instead of starting
+    another. Nothing is cached: once the task finishes the key is free and
+    the next caller computes again. Results (and exceptions) are shared, so
+    callers must not mutate them.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.counters = {'leaders': 0, 'coalesced': 0, 'errors': 0, 'max_group': 1}
+        self._group_sizes = {}
+
+    async def run(self, key, compute):
+        """
+        Result of compute() for this key, shared with concurrent callers
+
+        Args:
+            key: hashable normalized request
+            compute: zero-argument coroutine function doing the work
+
+        Returns:
+            (result, coalesced) where coalesced is True for callers that
+            reused another caller's computation
+        """
+        task = self._inflight.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self.counters['coalesced'] += 1
+            self._group_sizes[key] += 1
+            self.counters['max_group'] = max(self.counters['max_group'], self._group_sizes[key])
+        else:
+            # A separate task, so a disconnecting caller cannot cancel the others' work
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+            self._group_sizes[key] = 1
+            self.counters['leaders'] += 1
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        # shield: cancelling one waiter must not cancel the shared task
+        return await asyncio.shield(task), coalesced
+
+    def _finish(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+            del self._group_sizes[key]
+        if not task.cancelled() and task.exception() is not None:
+            # Also marks the exception as retrieved when every waiter has gone
+            self.counters['errors'] += 1
+
+    def stats(self):
+        return {'in_flight': len(self._inflight), **self.counters}
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Job Cache Snapshots for the ML Service
+Job store and job index written as memory-mappable .npy files and reloaded at startup
+"""
+
+import os
+import json
+import time
+import shutil
+import logging
+import threading
+import numpy as np
+import joblib
+from scipy.sparse import csr_matrix, issparse
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = os.environ.get('ML_SNAPSHOT_DIR', 'job_cache_snapshot')
+SNAPSHOT_VERSION = 1
+
+# Name of the file holding the directory name of the current snapshot
+CURRENT_FILE = 'CURRENT'
+
+_write_lock = threading.Lock()
+
+
+def _dump(value, directory, name):
+    """Write arrays (and CSR parts) under name, returning a JSON description of value"""
+    if issparse(value):
+        value = value.tocsr()
+        return {'__csr__': [_dump(getattr(value, part), directory, f"{name}.{part}")
+                            for part in ('data', 'indices', 'indptr')],
+                'shape': list(value.shape)}
+    if isinstance(value, np.ndarray):
+        file_name = f"{name}.npy"
+        np.save(os.path.join(directory, file_name), value, allow_pickle=value.dtype == object)
+        return {'__npy__': file_name}
+    if isinstance(value, dict):
+        return {key: _dump(item, directory, f"{name}.{key}") for key, item in value.items()}
+    return value
+
+
+def _restore(description, directory, mmap_mode):
+    if isinstance(description, dict):
+        if '__npy__' in description:
+            path = os.path.join(directory, description['__npy__'])
+            try:
+                return np.load(path, mmap_mode=mmap_mode)
+            except ValueError:
+                # Object arrays cannot be memory-mapped
+                return np.load(path, allow_pickle=True)
+        if '__csr__' in description:
+            data, indices, indptr = (_restore(part, directory, mmap_mode) for part in description['__csr__'])
+            return csr_matrix((data, indices, indptr), shape=tuple(description['shape']), copy=False)
+        return {key: _restore(item, directory, mmap_mode) for key, item in description.items()}
+    return description
+
+
+def save_snapshot(store, index, mode, model_fingerprint=None, vectorizer=None, directory=SNAPSHOT_DIR):
+    """
+    Write a new snapshot version and make it current
+
+    Each snapshot goes to its own sub-directory; the CURRENT pointer file is
+    replaced atomically once every file is written, so a crash mid-write
+    leaves the previous snapshot in place. Older versions are then removed.
+
+    Args:
+        store: JobStore of the cached jobs
+        index: JobIndex built for the store (None to snapshot only the jobs)
+        mode: 'ml' or 'fallback', the vectorizer family the index was built with
+        model_fingerprint: identifies the ML model file the vectors came from
+        vectorizer: fitted fallback vectorizer to restore with the index
+
+    Returns:
+        Path of the snapshot directory
+    """
+    with _write_lock:
+        os.makedirs(directory, exist_ok=True)
+        name = f"v{time.time_ns()}"
+        path = os.path.join(directory, name)
+        os.makedirs(path)
+
+        meta = {
+            'version': SNAPSHOT_VERSION,
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'jobs': len(store),
+            'mode': mode,
+            'model_fingerprint': model_fingerprint,
+            'store': _dump(store.to_state(), path, 'store'),
+            'index': _dump(index.to_state(), path, 'index') if index is not None else None,
+            'vectorizer': None
+        }
+        if vectorizer is not None:
+            joblib.dump(vectorizer, os.path.join(path, 'vectorizer.pkl'))
+            meta['vectorizer'] = 'vectorizer.pkl'
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+
+        pointer = os.path.join(directory, CURRENT_FILE)
+        with open(f"{pointer}.tmp", 'w') as f:
+            f.write(name)
+        os.replace(f"{pointer}.tmp", pointer)
+
+        for entry in os.listdir(directory):
+            if entry != name and entry.startswith('v'):
+                shutil.rmtree(os.path.join(directory, entry), ignore_errors=True)
+        return path
+
+
+def load_snapshot(directory=SNAPSHOT_DIR, mmap_mode='r'):
+    """
+    Open the current snapshot
+
+    Returns:
+        (meta, store_state, index_state, vectorizer) with arrays memory-mapped,
+        or None if there is no readable snapshot
+    """
+    pointer = os.path.join(directory, CURRENT_FILE)
+    if not os.path.exists(pointer):
+        return None
+    try:
+        with open(pointer) as f:
+            path = os.path.join(directory, f.read().strip())
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta.get('version') != SNAPSHOT_VERSION:
+            logger.warning(f"⚠️ Ignoring job cache snapshot version {meta.get('version')}")
+            return None
+
+        store_state = _restore(meta['store'], path, mmap_mode)
+        index_state = _restore(meta['index'], path, mmap_mode) if meta['index'] else None
+        vectorizer = joblib.load(os.path.join(path, meta['vectorizer'])) if meta['vectorizer'] else None
+        return meta, store_state, index_state, vectorizer
+    except Exception as e:
+        logger.error(f"❌ Could not read job cache snapshot: {e}")
+        return None
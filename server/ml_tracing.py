@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Request Tracing for the ML Service
+Timed spans per request, returned as a Server-Timing header and sampled to an OTLP JSON file
+"""
+
+import os
+import re
+import json
+import time
+import queue
+import random
+import logging
+import threading
+from contextlib import nullcontext, contextmanager
+from contextvars import ContextVar
+
+TRACE_SAMPLE_RATE = float(os.environ.get('ML_TRACE_SAMPLE_RATE', '0.01'))
+TRACE_FILE = os.environ.get('ML_TRACE_FILE', 'ml_traces.jsonl')
+# Incoming traceparent sampled flags honoured per second, beyond the sample rate
+TRACE_FORCED_PER_SEC = float(os.environ.get('ML_TRACE_FORCED_PER_SEC', '5'))
+# The trace file is rotated to <file>.1 once it grows past this size
+TRACE_MAX_BYTES = int(os.environ.get('ML_TRACE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Finished traces waiting for the export thread; more are dropped
+TRACE_QUEUE_SIZE = int(os.environ.get('ML_TRACE_QUEUE_SIZE', '1000'))
+SERVICE_NAME = 'ml-service'
+
+logger = logging.getLogger(__name__)
+
+_current_trace = ContextVar('ml_trace', default=None)
+_current_span = ContextVar('ml_span', default=None)
+
+# W3C trace context: version-traceid-parentid-flags
+_TRACEPARENT = re.compile(r'^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+_TOKEN_CHARS = re.compile(r'[^A-Za-z0-9_.-]')
+
+
+def _new_id(bits):
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Span:
+    """One timed operation; closing it adds it to its trace"""
+
+    __slots__ = ('trace', 'span_id', 'parent_id', 'name', 'start_ns', 'end_ns', 'attributes', '_token')
+
+    def __init__(self, trace, name, parent_id, attributes=None):
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.start_ns = None
+        self.end_ns = None
+        self.attributes = dict(attributes or {})
+        self._token = None
+
+    def __enter__(self):
+        self.start_ns = time.time_ns()
+        self._token = _current_span.set(self.span_id)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc_type is not None:
+            self.attributes['error'] = f"{exc_type.__name__}: {exc}"
+        self.trace.spans.append(self)
+        return False
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    @property
+    def duration_ms(self):
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+
+class Trace:
+    """Spans recorded while handling one request"""
+
+    def __init__(self, trace_id=None, parent_id=None, sampled=False):
+        self.trace_id = trace_id or _new_id(128)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.root = None
+        self.spans = []
+
+    @classmethod
+    def from_headers(cls, headers, sample_rate, forced=None):
+        """
+        Continue an incoming W3C traceparent, or start a new trace
+        
+        Args:
+            forced: RateLimiter bounding how many incoming sampled flags are
+                honoured (None honours none), so clients cannot force every
+                request to be exported
+        """
+        sampled = random.random() < sample_rate
+        match = _TRACEPARENT.match(headers.get(b'traceparent', b'').decode('latin-1').strip())
+        if match:
+            trace_id, parent_id, flags = match.groups()
+            if not sampled and int(flags, 16) & 1 and forced is not None:
+                sampled = forced.allow()
+            return cls(trace_id, parent_id, sampled)
+        return cls(sampled=sampled)
+
+    def server_timing(self):
+        """Server-Timing header value: finished spans in completion order, then the total"""
+        entries = [f"{_TOKEN_CHARS.sub('_', s.name)};dur={s.duration_ms:.2f}" for s in self.spans]
+        if self.root is not None:
+            entries.append(f"total;dur={self.root.duration_ms:.2f}")
+        return ', '.join(entries)
+
+    def to_otlp(self, service_name=SERVICE_NAME):
+        """OpenTelemetry (OTLP/JSON) ExportTraceServiceRequest for this trace"""
+        def attributes(values):
+            out = []
+            for key, value in values.items():
+                if isinstance(value, bool):
+                    typed = {'boolValue': value}
+                elif isinstance(value, int):
+                    typed = {'intValue': str(value)}
+                elif isinstance(value, float):
+                    typed = {'doubleValue': value}
+                else:
+                    typed = {'stringValue': str(value)}
+                out.append({'key': key, 'value': typed})
+            return out
+
+        spans = []
+        for span in self.spans:
+            entry = {
+                'traceId': self.trace_id,
+                'spanId': span.span_id,
+                'name': span.name,
+                # SERVER for the request itself, INTERNAL for its parts
+                'kind': 2 if span is self.root else 1,
+                'startTimeUnixNano': str(span.start_ns),
+                'endTimeUnixNano': str(span.end_ns),
+                'attributes': attributes(span.attributes),
+                'status': {'code': 2 if 'error' in span.attributes else 0}
+            }
+            if span.parent_id:
+                entry['parentSpanId'] = span.parent_id
+            spans.append(entry)
+
+        return {'resourceSpans': [{
+            'resource': {'attributes': attributes({'service.name': service_name})},
+            'scopeSpans': [{'scope': {'name': 'ml_tracing'}, 'spans': spans}]
+        }]}
+
+
+def span(name, **attributes):
+    """
+    Time a block as a child of the current span
+
+    Outside a traced request this is a no-op, so engine code can be
+    instrumented without affecting scripts and benchmarks.
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return nullcontext()
+    return Span(trace, name, _current_span.get(), attributes)
+
+
+def record_span(name, start_ns, end_ns=None, **attributes):
+    """Add an already finished span (e.g. work that happened before a handler ran)"""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    finished = Span(trace, name, _current_span.get(), attributes)
+    finished.start_ns = start_ns
+    finished.end_ns = end_ns or time.time_ns()
+    trace.spans.append(finished)
+
+
+@contextmanager
+def collect_spans():
+    """
+    Record the spans of a block into a list instead of the current trace
+
+    For work done on behalf of other requests (e.g. a batch serving several
+    callers); each caller adds the spans that concern it with record_spans().
+    """
+    trace_token = _current_trace.set(Trace())
+    span_token = _current_span.set(None)
+    try:
+        yield _current_trace.get().spans
+    finally:
+        _current_span.reset(span_token)
+        _current_trace.reset(trace_token)
+
+
+def record_spans(spans):
+    """Add spans gathered by collect_spans() to the current trace, under the current span"""
+    for finished in spans:
+        record_span(finished.name, finished.start_ns, finished.end_ns, **finished.attributes)
+
+
+def request_start_ns():
+    """Start time of the current request's root span (now if untraced)"""
+    trace = _current_trace.get()
+    return trace.root.start_ns if trace is not None and trace.root is not None else time.time_ns()
+
+
+class RateLimiter:
+    """Token bucket: allow() succeeds at most `rate` times per second on average, in bursts of up to `burst`"""
+
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def allow(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class JsonlTraceExporter:
+    """
+    Appends one OTLP/JSON trace per line, as the OpenTelemetry collector file exporter does
+
+    export() only queues the trace; a daemon thread encodes and writes it, so
+    the event loop never blocks on the file. When the file passes max_bytes
+    it is rotated to <path>.1 (replacing the previous one), bounding disk use
+    to about twice max_bytes. Traces arriving while the queue is full are
+    dropped and counted.
+    """
+
+    def __init__(self, path=TRACE_FILE, service_name=SERVICE_NAME, max_bytes=TRACE_MAX_BYTES,
+                 queue_size=TRACE_QUEUE_SIZE):
+        self.path = path
+        self.service_name = service_name
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._queue = queue.Queue(queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def export(self, trace):
+        self._ensure_thread()
+        try:
+            self._queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Wait until every queued trace has been written"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name='trace-exporter', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            trace = self._queue.get()
+            try:
+                self._write(json.dumps(trace.to_otlp(self.service_name), separators=(',', ':')) + '\n')
+            except Exception as e:
+                logger.error(f"Trace export failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def _write(self, line):
+        try:
+            if os.path.getsize(self.path) + len(line) > self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+        except FileNotFoundError:
+            pass
+        with open(self.path, 'a') as f:
+            f.write(line)
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware that traces every HTTP request
+
+    The request is the root span; handlers add child spans with span().
+    All spans finished before the response starts are reported in its
+    Server-Timing header, and sampled traces are handed to the exporter
+    when the response has been sent. A sampled traceparent flag from the
+    client is honoured at most forced_per_sec times per second.
+    """
+
+    def __init__(self, app, sample_rate=TRACE_SAMPLE_RATE, exporter=None, forced_per_sec=TRACE_FORCED_PER_SEC):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.exporter = exporter or JsonlTraceExporter()
+        self.forced = RateLimiter(forced_per_sec) if forced_per_sec > 0 else None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace.from_headers(dict(scope.get('headers', [])), self.sample_rate, self.forced)
+        trace_token = _current_trace.set(trace)
+        root = Span(trace, f"{scope['method']} {scope['path']}", trace.parent_id,
+                    {'http.method': scope['method'], 'http.target': scope['path']})
+        trace.root = root
+
+        async def send_with_timing(message):
+            if message['type'] == 'http.response.start':
+                root.set('http.status_code', message['status'])
+                headers = list(message.get('headers', []))
+                headers.append((b'server-timing', trace.server_timing().encode('latin-1')))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        root.__enter__()
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except Exception as e:
+            root.__exit__(type(e), e, None)
+            raise
+        else:
+            root.__exit__(None, None, None)
+        finally:
+            _current_trace.reset(trace_token)
+            if trace.sampled:
+                self.exporter.export(trace)
@@ -125,7 +125,10 @@ Thumbs.db
 # AI Model files (optional)
 ai/*.pkl
 ai/*.joblib
+ai/*.npy
+ai/*.npz
 ai/__pycache__/
+ai/.trainer_cache/
 
 # Uploads (in production, use cloud storage)
 public/uploads/*/
@@ -0,0 +1,62 @@
+"""
+Shared pytest setup for the ML service and trainer modules
+"""
+
+import os
+import sys
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules are imported the way ml_service imports them: server/ and server/ai/ on the path
+sys.path.insert(0, SERVER_DIR)
+sys.path.insert(0, os.path.join(SERVER_DIR, 'ai'))
+
+# Importing ml_service must not restore or overwrite a job cache snapshot, or write traces
+os.environ['ML_SNAPSHOT_DIR'] = ''
+os.environ['ML_TRACE_SAMPLE_RATE'] = '0'
+os.environ['ML_TRACE_FORCED_PER_SEC'] = '0'
+
+
+@pytest.fixture
+def service():
+    """The ml_service module, with its job cache emptied again after the test"""
+    import ml_service
+    yield ml_service
+    ml_service.job_data_cache = []
+
+
+@pytest.fixture
+def client(service):
+    from fastapi.testclient import TestClient
+    with TestClient(service.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def jobs():
+    """Deterministic payloads in the /api/update_job_cache schema"""
+    from ml_benchmark_load import synthetic_jobs
+    return synthetic_jobs(200)
+
+
+@pytest.fixture(scope='session')
+def trained_model_dir(tmp_path_factory):
+    """Directory with a small synthetic dataset and a model trained on it (shared, do not modify)"""
+    from benchmark_trainer import generate_synthetic_dataset
+    from memory_efficient_trainer import main
+    directory = tmp_path_factory.mktemp('trained')
+    csv_path, model_path = str(directory / 'dataset.csv'), str(directory / 'model.pkl')
+    generate_synthetic_dataset(2000, csv_path)
+    main(['--csv', csv_path, '--output', model_path, '--no-cache', '--cpus', '1', '--n-clusters', '5'])
+    return directory
+
+
+@pytest.fixture
+def model_path(trained_model_dir, tmp_path):
+    """Path of a private copy of the trained model, safe to update in place"""
+    import shutil
+    for entry in trained_model_dir.iterdir():
+        if entry.name.startswith('model'):
+            shutil.copy(entry, tmp_path / entry.name)
+    return str(tmp_path / 'model.pkl')
@@ -0,0 +1,184 @@
+"""
+Admission control: queue limits, 503 + Retry-After rejections and keyword-tier degradation
+"""
+
+import asyncio
+import pytest
+
+from ml_admission import AdmissionController, Overloaded
+
+RECOMMEND_REQUEST = {
+    'user_preferences': {'skills': 'Python, React', 'experience': 'Mid-level', 'industry': 'Software',
+                         'location': 'Remote', 'min_salary': 80000},
+    'top_n': 5
+}
+
+
+def test_full_queue_is_rejected():
+    controller = AdmissionController(max_concurrency=1, max_queue=1, degrade_queue=10)
+    outcome = {}
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold(ticket):
+            async with ticket:
+                await release.wait()
+
+        running = asyncio.ensure_future(hold(controller.admit()))
+        await asyncio.sleep(0)
+        queued = asyncio.ensure_future(hold(controller.admit()))
+        await asyncio.sleep(0)
+        outcome['stats'] = controller.stats()
+        with pytest.raises(Overloaded) as rejected:
+            controller.admit()
+        outcome['retry_after'] = rejected.value.retry_after
+        release.set()
+        await asyncio.gather(running, queued)
+
+    asyncio.run(scenario())
+    assert outcome['stats']['running'] == 1 and outcome['stats']['waiting'] == 1
+    assert outcome['retry_after'] >= controller.min_retry_after
+    stats = controller.stats()
+    assert (stats['admitted'], stats['rejected']) == (2, 1)
+    assert stats['running'] == stats['waiting'] == 0
+
+
+def test_concurrency_is_bounded():
+    controller = AdmissionController(max_concurrency=2, max_queue=100, degrade_queue=100)
+    peak = 0
+
+    async def work():
+        nonlocal peak
+        async with controller.admit():
+            peak = max(peak, controller.running)
+            await asyncio.sleep(0.001)
+
+    async def scenario():
+        await asyncio.gather(*(work() for _ in range(10)))
+
+    asyncio.run(scenario())
+    assert peak == 2
+    assert controller.stats()['admitted'] == 10
+
+
+def test_retry_after_tracks_backlog():
+    controller = AdmissionController(max_concurrency=2, min_retry_after=1)
+    assert controller.retry_after() == 1
+    controller.latency_ms = 1000
+    controller.waiting, controller.running = 5, 2
+    # 7 requests at 1s each over 2 slots
+    assert controller.retry_after() == 4
+
+
+def test_degrades_behind_queue():
+    controller = AdmissionController(max_concurrency=1, max_queue=10, degrade_queue=1)
+    assert not controller.admit().degraded
+    controller.waiting = 1
+    assert controller.admit().degraded
+    assert controller.stats()['degraded'] == 1
+
+
+def test_degrades_on_latency():
+    controller = AdmissionController(degrade_latency_ms=100, smoothing=1.0)
+    controller.running = 1
+    controller._observe(150)
+    assert controller.admit().degraded
+    controller._observe(50)
+    assert not controller.admit().degraded
+
+
+def test_slow_latency_is_remeasured_once_idle():
+    controller = AdmissionController(degrade_latency_ms=100, smoothing=1.0)
+    controller._observe(150)
+    # Nothing is running at full cost, so the next request measures it again
+    assert not controller.admit().degraded
+
+
+def test_degraded_requests_bypass_saturated_ml_slots():
+    controller = AdmissionController(max_concurrency=1, max_queue=4, degrade_queue=1, degraded_concurrency=2)
+    outcome = {}
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold(ticket):
+            async with ticket:
+                await release.wait()
+
+        full = [asyncio.ensure_future(hold(controller.admit())) for _ in range(2)]
+        await asyncio.sleep(0)
+        # One full-cost request runs and one waits, so the next is degraded and served at once
+        ticket = controller.admit()
+        assert ticket.degraded
+        async with ticket:
+            outcome['inside'] = controller.stats()
+        release.set()
+        await asyncio.gather(*full)
+
+    asyncio.run(scenario())
+    stats = outcome['inside']
+    assert (stats['running'], stats['waiting']) == (1, 1)
+    assert (stats['degraded_running'], stats['degraded_waiting']) == (1, 0)
+    stats = controller.stats()
+    assert stats['degraded_running'] == stats['running'] == 0
+    # Cheap requests do not count towards the full-cost latency
+    assert controller.latency_ms > 0
+
+
+def test_degraded_concurrency_is_bounded():
+    controller = AdmissionController(max_concurrency=1, max_queue=100, degrade_queue=0, degraded_concurrency=3)
+    peak = 0
+
+    async def work():
+        nonlocal peak
+        ticket = controller.admit()
+        assert ticket.degraded
+        async with ticket:
+            peak = max(peak, controller.degraded_running)
+            await asyncio.sleep(0.001)
+
+    async def scenario():
+        await asyncio.gather(*(work() for _ in range(10)))
+
+    asyncio.run(scenario())
+    assert peak == 3
+    assert controller.running == 0 and controller.latency_ms == 0
+
+
+def test_full_degraded_queue_is_rejected():
+    controller = AdmissionController(max_queue=2, degrade_queue=0)
+    controller.degraded_waiting = 2
+    with pytest.raises(Overloaded):
+        controller.admit()
+    assert controller.stats()['rejected'] == 1
+
+
+def test_overloaded_endpoint_returns_503(monkeypatch, service, client):
+    monkeypatch.setattr(service, 'admission', AdmissionController(max_queue=0, min_retry_after=3))
+    response = client.post('/api/recommend', json=RECOMMEND_REQUEST)
+
+    assert response.status_code == 503
+    assert response.headers['retry-after'] == '3'
+    assert service.admission.stats()['rejected'] == 1
+
+
+def test_degraded_endpoint_serves_keyword_tier(monkeypatch, service, client):
+    monkeypatch.setattr(service, 'admission', AdmissionController(degrade_queue=0))
+    response = client.post('/api/recommend', json=RECOMMEND_REQUEST)
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body['degraded'] is True
+    assert body['tier'] == 'keyword'
+    assert response.headers['x-recommendation-tier'] == 'keyword'
+    assert body['recommendations']
+
+
+def test_normal_load_is_not_degraded(monkeypatch, service, client):
+    monkeypatch.setattr(service, 'admission', AdmissionController())
+    response = client.post('/api/recommend', json=RECOMMEND_REQUEST)
+
+    assert response.status_code == 200
+    assert response.json()['degraded'] is False
+    assert response.headers['x-recommendation-tier'] != 'keyword'
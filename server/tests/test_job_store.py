@@ -0,0 +1,165 @@
+"""
+Streamed NDJSON / Arrow job uploads: validation and the bulk endpoint's 400/415/422 responses
+"""
+
+import gzip
+import json
+import asyncio
+import pytest
+
+from ml_job_store import JobStore, ingest_jobs, UnsupportedUpload, MalformedUpload, JobValidationError
+
+
+def ndjson(records):
+    return b''.join(json.dumps(record).encode() + b'\n' for record in records)
+
+
+def chunked(body, size=4096):
+    async def chunks():
+        for start in range(0, len(body), size):
+            yield body[start:start + size]
+    return chunks()
+
+
+def ingest(body, content_type, encoding=None, batch_rows=64):
+    return asyncio.run(ingest_jobs(chunked(body), content_type, encoding, batch_rows))
+
+
+def arrow_stream(jobs, batch_rows=50):
+    pa = pytest.importorskip('pyarrow')
+    table = pa.Table.from_pylist(jobs)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=batch_rows):
+            writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def test_ndjson_round_trip(jobs):
+    store = ingest(ndjson(jobs), 'application/x-ndjson; charset=utf-8')
+
+    assert isinstance(store, JobStore)
+    assert len(store) == len(jobs)
+    for row, job in zip(store, jobs):
+        assert row._asdict() == job
+
+
+def test_gzip_ndjson_split_across_chunks(jobs):
+    store = ingest(gzip.compress(ndjson(jobs)), 'application/x-ndjson', 'gzip')
+
+    assert [row.job_id for row in store] == [job['job_id'] for job in jobs]
+
+
+def test_arrow_round_trip(jobs):
+    store = ingest(arrow_stream(jobs), 'application/vnd.apache.arrow.stream')
+
+    assert [row._asdict() for row in store] == jobs
+
+
+def test_invalid_records_are_reported(jobs):
+    records = [dict(job) for job in jobs[:10]]
+    records[2]['skills'] = 'Python'
+    del records[5]['title']
+    records[7]['salary_min'] = '100k'
+    body = ndjson(records) + b'{not json\n' + b'[1, 2]\n'
+
+    with pytest.raises(JobValidationError) as error:
+        ingest(body, 'application/x-ndjson')
+
+    found = {(e['row'], e['field'], e['error']) for e in error.value.errors}
+    assert found == {
+        (2, 'skills', 'must be a list of strings'),
+        (5, 'title', 'field required'),
+        (7, 'salary_min', 'must be an integer'),
+        (10, None, 'invalid JSON'),
+        (11, None, 'must be a JSON object')
+    }
+    assert error.value.total == 5
+
+
+def test_invalid_arrow_column(jobs):
+    records = [dict(job, salary_max=str(job['salary_max'])) for job in jobs[:20]]
+
+    with pytest.raises(JobValidationError) as error:
+        ingest(arrow_stream(records), 'application/vnd.apache.arrow.stream')
+    assert error.value.total == 20
+
+
+def test_truncated_arrow_stream(jobs):
+    body = arrow_stream(jobs)
+
+    for cut in (len(body) // 2, 10):
+        with pytest.raises(MalformedUpload, match='Arrow'):
+            ingest(body[:cut], 'application/vnd.apache.arrow.stream')
+
+
+def test_corrupt_gzip_body(jobs):
+    body = gzip.compress(ndjson(jobs))
+
+    with pytest.raises(MalformedUpload, match='decompress'):
+        ingest(b'not gzip at all', 'application/x-ndjson', 'gzip')
+    with pytest.raises(MalformedUpload, match='Truncated'):
+        ingest(body[:len(body) // 2], 'application/x-ndjson', 'gzip')
+
+
+@pytest.mark.parametrize('content_type, encoding', [
+    ('text/csv', None),
+    (None, None),
+    ('application/x-ndjson', 'br')
+])
+def test_unsupported_uploads(content_type, encoding):
+    with pytest.raises(UnsupportedUpload):
+        ingest(b'{}\n', content_type, encoding)
+
+
+def test_bulk_endpoint_replaces_cache(client, service, jobs):
+    response = client.post('/api/update_job_cache/bulk', content=gzip.compress(ndjson(jobs)),
+                           headers={'Content-Type': 'application/x-ndjson', 'Content-Encoding': 'gzip'})
+
+    assert response.status_code == 200
+    assert response.json()['cache_size'] == len(jobs)
+    assert client.get('/api/stats').json()['cache_size'] == len(jobs)
+
+
+def test_bulk_endpoint_rejects_unsupported_type(client):
+    response = client.post('/api/update_job_cache/bulk', content=b'a,b\n1,2\n',
+                           headers={'Content-Type': 'text/csv'})
+
+    assert response.status_code == 415
+    assert 'text/csv' in response.json()['detail']
+
+
+def test_bulk_endpoint_rejects_invalid_jobs_and_keeps_cache(client, service, jobs):
+    client.post('/api/update_job_cache/bulk', content=ndjson(jobs[:30]),
+                headers={'Content-Type': 'application/x-ndjson'})
+    invalid = [dict(job) for job in jobs]
+    invalid[40]['industry'] = None
+
+    response = client.post('/api/update_job_cache/bulk', content=ndjson(invalid),
+                           headers={'Content-Type': 'application/x-ndjson'})
+
+    assert response.status_code == 422
+    detail = response.json()['detail']
+    assert detail['errors'] == [{'row': 40, 'field': 'industry', 'error': 'field required'}]
+    assert client.get('/api/stats').json()['cache_size'] == 30
+
+
+def test_bulk_endpoint_rejects_corrupt_gzip_and_keeps_cache(client, jobs):
+    client.post('/api/update_job_cache/bulk', content=ndjson(jobs[:30]),
+                headers={'Content-Type': 'application/x-ndjson'})
+
+    response = client.post('/api/update_job_cache/bulk', content=b'\x1f\x8b\x08garbage',
+                           headers={'Content-Type': 'application/x-ndjson', 'Content-Encoding': 'gzip'})
+
+    assert response.status_code == 400
+    assert 'decompress' in response.json()['detail']
+    assert client.get('/api/stats').json()['cache_size'] == 30
+
+
+def test_bulk_endpoint_rejects_truncated_arrow(client, jobs):
+    body = arrow_stream(jobs)
+    response = client.post('/api/update_job_cache/bulk', content=body[:len(body) // 2],
+                           headers={'Content-Type': 'application/vnd.apache.arrow.stream'})
+
+    assert response.status_code == 400
+    assert 'Arrow' in response.json()['detail']
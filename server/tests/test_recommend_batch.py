@@ -0,0 +1,107 @@
+"""
+Batched recommendation scoring against one recommend() call per request
+"""
+
+import asyncio
+import pytest
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+from ml_batching import MicroBatcher
+from ml_job_store import JobStore
+
+SKILL_SETS = ['Python, SQL', 'React, TypeScript', ' java ,Spring', 'Machine Learning, TensorFlow', 'Go']
+EXPERIENCE = ['Entry-level', 'Mid-level', 'Senior', 'Executive']
+INDUSTRIES = ['Software', 'AI/ML', 'Fintech', 'Healthcare']
+LOCATIONS = ['Remote', 'Austin', 'new york', 'Seattle']
+
+
+@pytest.fixture
+def store(service, jobs):
+    return JobStore.from_jobs([service.JobData(**job) for job in jobs])
+
+
+@pytest.fixture(params=['fallback', 'ml'])
+def engine(request, monkeypatch, service, store):
+    """Engine serving the TF-IDF fallback tier, or the ML tier with a vectorizer fitted on the jobs"""
+    engine = service.JobRecommendationEngine()
+    if request.param == 'ml':
+        vectorizer = TfidfVectorizer(stop_words='english')
+        vectorizer.fit([f"{job.title} {' '.join(job.skills)} {job.industry}" for job in store])
+        monkeypatch.setattr(service, 'ml_model', {'tfidf_vectorizer': vectorizer})
+        engine.model_loaded = True
+    else:
+        engine.model_loaded = False
+    return engine
+
+
+def preferences(service, count):
+    return [service.UserPreferences(skills=SKILL_SETS[i % len(SKILL_SETS)], experience=EXPERIENCE[i % 4],
+                                    industry=INDUSTRIES[i % 3], location=LOCATIONS[i % 4],
+                                    min_salary=[50000, 80000, 100000][i % 3])
+            for i in range(count)]
+
+
+def expected(engine, requests):
+    return [engine.recommend(user_prefs, jobs, top_n) for user_prefs, jobs, top_n in requests]
+
+
+def served(results):
+    return [(recommendations, tier) for recommendations, tier, _ in results]
+
+
+def test_batch_equals_recommend(service, engine, store):
+    requests = [(user_prefs, store, 5 + i % 3) for i, user_prefs in enumerate(preferences(service, 12))]
+    results = engine.recommend_batch(requests)
+
+    assert served(results) == expected(engine, requests)
+    assert {tier for _, tier, _ in results} == {'ml' if engine.model_loaded else 'tfidf'}
+    assert all(recommendations for recommendations, _, _ in results)
+
+
+def test_scoring_in_blocks_equals_recommend(monkeypatch, service, engine, store):
+    # Two queries per similarity block
+    monkeypatch.setattr(service, 'BATCH_SCORE_CELLS', 2 * len(store))
+    requests = [(user_prefs, store, 10) for user_prefs in preferences(service, 7)]
+
+    assert served(engine.recommend_batch(requests)) == expected(engine, requests)
+
+
+def test_requests_against_different_job_lists(service, engine, store):
+    smaller = JobStore.from_jobs(list(store)[:50])
+    prefs = preferences(service, 6)
+    requests = [(user_prefs, store if i % 2 else smaller, 5) for i, user_prefs in enumerate(prefs)]
+    results = engine.recommend_batch(requests)
+
+    assert served(results) == expected(engine, requests)
+    smaller_ids = {job.job_id for job in smaller}
+    assert all(rec['job_id'] in smaller_ids for recommendations, _, _ in results[::2] for rec in recommendations)
+
+
+def test_single_and_empty_requests(service, engine, store):
+    prefs = preferences(service, 2)
+    requests = [(prefs[0], store, 5), (prefs[1], JobStore(), 5)]
+    results = engine.recommend_batch(requests)
+
+    assert served(results) == expected(engine, requests)
+    assert results[1][0] == []
+
+
+def test_scoring_error_falls_back_per_request(monkeypatch, service, engine, store):
+    def broken(*args):
+        raise RuntimeError('batch scoring failed')
+    monkeypatch.setattr(engine, '_score_batch', broken)
+    requests = [(user_prefs, store, 5) for user_prefs in preferences(service, 3)]
+
+    assert served(engine.recommend_batch(requests)) == expected(engine, requests)
+
+
+def test_micro_batcher_results_match(service, engine, store):
+    batcher = MicroBatcher(engine.recommend_batch, window_ms=20, max_batch=8, workers=1)
+    requests = [(user_prefs, store, 5) for user_prefs in preferences(service, 8)]
+
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(request) for request in requests))
+
+    results = asyncio.run(scenario())
+    assert served(results) == expected(engine, requests)
+    assert batcher.stats()['max_batch_seen'] > 1
@@ -0,0 +1,122 @@
+"""
+Flattened forest and salary lookup table parity with the sklearn model
+"""
+
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
+from sklearn.preprocessing import LabelEncoder
+
+from salary_predictor import SalaryLookupTable, FlatForest, SalaryPredictor
+
+CATEGORIES = {
+    'Experience Level': ['Entry Level', 'Mid Level', 'Senior Level'],
+    'Industry': ['Finance', 'Retail', 'Software'],
+    'Location': ['Austin', 'Remote']
+}
+
+
+@pytest.fixture(scope='module')
+def training():
+    """Encoded [exp, ind, loc, skills_count, title_length] rows and salaries"""
+    rng = np.random.default_rng(5)
+    n = 3000
+    encoded = np.column_stack([rng.integers(0, len(values), n) for values in CATEGORIES.values()])
+    skills_count = rng.integers(1, 8, n)
+    title_length = rng.integers(8, 30, n)
+    X = np.column_stack([encoded, skills_count, title_length]).astype(np.float64)
+    y = 40000 + 25000 * X[:, 0] + 8000 * X[:, 1] + 3000 * X[:, 3] + rng.normal(0, 5000, n)
+    return X, y
+
+
+@pytest.fixture(scope='module')
+def forest(training):
+    X, y = training
+    return RandomForestRegressor(n_estimators=12, max_depth=10, random_state=0).fit(X, y)
+
+
+def test_flat_forest_matches_sklearn(training, forest):
+    X, _ = training
+    flat = FlatForest.from_sklearn(forest)
+
+    np.testing.assert_allclose(flat.predict(X), forest.predict(X), rtol=1e-12)
+    # Single rows and out-of-range values take the same paths
+    np.testing.assert_allclose(flat.predict(X[0]), forest.predict(X[:1]), rtol=1e-12)
+    extreme = np.array([[2, 2, 1, 50, 200], [0, 0, 0, 0, 0]], dtype=np.float64)
+    np.testing.assert_allclose(flat.predict(extreme), forest.predict(extreme), rtol=1e-12)
+
+
+def test_flat_forest_state_round_trip(training, forest):
+    X, _ = training
+    flat = FlatForest.from_sklearn(forest)
+    restored = FlatForest.from_state(flat.to_state())
+
+    np.testing.assert_array_equal(restored.predict(X), flat.predict(X))
+
+
+def test_non_tree_models_are_not_flattened(training):
+    X, y = training
+    assert FlatForest.from_sklearn(HistGradientBoostingRegressor(max_iter=10).fit(X, y)) is None
+
+
+def test_lookup_table_matches_model(training, forest):
+    X, _ = training
+    table = SalaryLookupTable.build(forest, X[:, :3], X[:, 3], X[:, 4], clip_quantile=1.0)
+    expected = forest.predict(X).astype(np.int64)
+
+    looked_up = [table.lookup(*row) for row in X.astype(int).tolist()]
+    assert looked_up == expected.tolist()
+
+
+def test_lookup_table_misses_outside_ranges(training, forest):
+    X, _ = training
+    table = SalaryLookupTable.build(forest, X[:, :3], X[:, 3], X[:, 4], clip_quantile=1.0)
+
+    assert table.lookup(0, 0, 0, 99, 10) is None
+    assert table.lookup(0, 0, 0, 3, 500) is None
+    assert table.lookup(9, 0, 0, 3, 10) is None
+    assert SalaryLookupTable.from_state(table.to_state()).lookup(1, 2, 0, 3, 12) == table.lookup(1, 2, 0, 3, 12)
+
+
+def model_data(training, model):
+    X, _ = training
+    encoders = {col: LabelEncoder().fit(values) for col, values in CATEGORIES.items()}
+    table = SalaryLookupTable.build(model, X[:, :3], X[:, 3], X[:, 4])
+    return {'label_encoders': encoders, 'salary_model': model, 'salary_table': table.to_state()}
+
+
+def job(experience='Senior Level', industry='Software', location='Remote', skills='Python, SQL', title='Engineer'):
+    return {'experience': experience, 'industry': industry, 'location': location, 'skills': skills, 'title': title}
+
+
+@pytest.mark.parametrize('model_type', ['forest', 'hist'])
+def test_predictor_matches_model(training, forest, model_type):
+    X, y = training
+    model = forest if model_type == 'forest' else HistGradientBoostingRegressor(max_iter=20).fit(X, y)
+    predictor = SalaryPredictor.from_model_data(model_data(training, model))
+    jobs = [
+        job(),
+        job('Entry Level', 'Finance', 'Austin', 'Excel'),
+        job(skills='', title=''),
+        job(skills=', '.join(['Skill'] * 40), title='T' * 120)  # outside the table
+    ]
+
+    expected = []
+    for details in jobs:
+        codes = [CATEGORIES[col].index(details[key]) for col, key in
+                 zip(SalaryPredictor.FEATURE_COLUMNS, SalaryPredictor.DETAIL_KEYS)]
+        skills_count = details['skills'].count(',') + 1 if details['skills'] else 1
+        row = np.array([codes + [skills_count, len(details['title'])]], dtype=np.float64)
+        expected.append(int(model.predict(row)[0]))
+
+    assert predictor.predict(jobs) == expected
+
+
+def test_predictor_unknown_category(training, forest, capsys):
+    predictor = SalaryPredictor.from_model_data(model_data(training, forest))
+
+    predictions = predictor.predict([job(industry='Mining'), job()] * 50)
+    assert predictions[::2] == [None] * 50
+    assert all(isinstance(prediction, int) for prediction in predictions[1::2])
+    # Batches of unknown categories must not write a line per row
+    assert capsys.readouterr().out == ''
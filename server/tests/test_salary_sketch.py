@@ -0,0 +1,106 @@
+"""
+KLL salary sketches: quantile rank error, merging and serialisation
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from salary_sketch import SalaryQuantileSketch, build_salary_sketches, merge_salary_sketches
+
+QS = [0.01, 0.1, 0.25, 0.5, 0.75, 0.9, 0.99]
+# KLL's normalised rank error is about 1.7/k; k=200 keeps it under 1%, asserted with headroom
+RANK_TOLERANCE = 0.02
+
+
+def rank_errors(sketch, values):
+    """|true rank - q| of each estimated quantile, ranks normalised to 0..1"""
+    values = np.sort(values)
+    estimates = sketch.quantiles(QS)
+    ranks = np.searchsorted(values, estimates, side='right') / len(values)
+    return np.abs(ranks - np.asarray(QS))
+
+
+@pytest.fixture
+def salaries():
+    rng = np.random.default_rng(7)
+    return np.round(rng.lognormal(11.3, 0.4, 200000))
+
+
+def test_quantiles_within_rank_error(salaries):
+    sketch = SalaryQuantileSketch(k=200)
+    sketch.update_many(salaries)
+
+    assert rank_errors(sketch, salaries).max() < RANK_TOLERANCE
+    assert sketch.size < 2000
+
+
+def test_exact_summary_statistics(salaries):
+    sketch = SalaryQuantileSketch()
+    for batch in np.array_split(salaries, 37):
+        sketch.update_many(batch)
+
+    assert sketch.count == len(salaries)
+    assert sketch.min == salaries.min()
+    assert sketch.max == salaries.max()
+    assert sketch.mean == pytest.approx(salaries.mean())
+    assert sketch.quantiles([0.0, 1.0]) == [salaries.min(), salaries.max()]
+
+
+def test_merged_sketches_match_union(salaries):
+    parts = np.array_split(salaries, 8)
+    merged = SalaryQuantileSketch()
+    for i, part in enumerate(parts):
+        sketch = SalaryQuantileSketch(seed=i)
+        sketch.update_many(part)
+        merged.merge(sketch)
+
+    assert merged.count == len(salaries)
+    assert rank_errors(merged, salaries).max() < RANK_TOLERANCE
+
+
+def test_single_updates(salaries):
+    values = salaries[:20000]
+    sketch = SalaryQuantileSketch()
+    for value in values:
+        sketch.update(value)
+
+    assert rank_errors(sketch, values).max() < RANK_TOLERANCE
+
+
+def test_empty_sketch():
+    sketch = SalaryQuantileSketch()
+
+    assert sketch.quantiles([0.5]) == [None]
+    assert sketch.mean is None
+    assert sketch.merge(SalaryQuantileSketch()).count == 0
+
+
+def test_state_round_trip(salaries):
+    sketch = SalaryQuantileSketch()
+    sketch.update_many(salaries)
+    restored = SalaryQuantileSketch.from_state(sketch.to_state())
+
+    assert restored.count == sketch.count
+    # Compactors are stored as float32; salaries are exact in float32
+    assert restored.quantiles(QS) == sketch.quantiles(QS)
+
+
+def test_cell_sketches_merge_by_filter():
+    rng = np.random.default_rng(3)
+    n = 30000
+    df = pd.DataFrame({
+        'Experience Level': rng.choice(['Entry Level', 'Senior Level'], n),
+        'Industry': rng.choice(['Software', 'Finance', 'Retail'], n),
+        'Location': rng.choice(['Remote', 'Austin'], n),
+        'Salary': rng.integers(30000, 200000, n)
+    })
+    sketches = build_salary_sketches(df)
+
+    merged, cell_counts = merge_salary_sketches(sketches, industry='Software')
+    software = df.loc[df['Industry'] == 'Software', 'Salary'].to_numpy()
+
+    assert merged.count == len(software)
+    assert sum(cell_counts.values()) == len(software)
+    assert {cell[1] for cell in cell_counts} == {'Software'}
+    assert rank_errors(merged, software).max() < RANK_TOLERANCE
@@ -0,0 +1,44 @@
+"""
+Similar and trending jobs after incremental deletions from a trained model
+"""
+
+import numpy as np
+
+from job_recommendation_model import JobRecommendationAPI, SIMILAR_JOB_FIELDS, RESULT_COLUMN_SOURCES
+from memory_efficient_trainer import update_model_similarity
+
+
+def job_record(api, sample_row):
+    """Result fields (without the score) identifying a sample job"""
+    row = api.model_data['df_sample'].iloc[sample_row]
+    return {field: row[RESULT_COLUMN_SOURCES[field]] for field in SIMILAR_JOB_FIELDS if field != 'similarity_score'}
+
+
+def without_score(results):
+    return [{k: v for k, v in result.items() if k != 'similarity_score'} for result in results]
+
+
+def test_deleted_jobs_are_not_returned_after_reload(model_path):
+    api = JobRecommendationAPI(model_path)
+    assert api.embedding_index is not None
+    query_row = 0
+    query = int(api.sample_positions[query_row])
+    similar = without_score(api.get_similar_jobs(query, top_n=5))
+
+    # Delete the query's five most similar jobs from the saved model
+    records = [job_record(api, row) for row in range(len(api.sample_positions))]
+    deleted_rows = [row for row, record in enumerate(records) if record in similar and row != query_row]
+    assert len(deleted_rows) >= 5
+    assert update_model_similarity(model_path, deleted_rows=api.sample_positions[deleted_rows].tolist())
+
+    reloaded = JobRecommendationAPI(model_path)
+    assert not reloaded.live[deleted_rows].any()
+    assert reloaded.live.sum() == len(reloaded.live) - len(deleted_rows)
+
+    results = without_score(reloaded.get_similar_jobs(query, top_n=len(reloaded.live)))
+    deleted_records = [records[row] for row in deleted_rows]
+    assert len(results) == reloaded.live.sum() - 1
+    assert not any(record in deleted_records for record in results)
+
+    trending, _ = reloaded.trending.top(len(reloaded.live))
+    assert not np.isin(trending, deleted_rows).any()
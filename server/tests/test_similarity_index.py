@@ -0,0 +1,76 @@
+"""
+Incremental similarity index updates against a full rebuild
+"""
+
+import numpy as np
+import pytest
+from scipy.sparse import csr_matrix
+
+from similarity_index import build_similarity_index, update_similarity_index, top_k_neighbors
+
+TOP_K = 10
+
+
+def build(matrix):
+    # float32 scores, so update and rebuild compare the same precision
+    return build_similarity_index(matrix, top_k=TOP_K, batch_size=64, n_jobs=1,
+                                  score_dtype=np.float32, report_every=2)
+
+
+def rebuild_live(matrix, deleted):
+    """Full rebuild over the live rows, with positions mapped back to the corpus"""
+    live = np.flatnonzero(~np.isin(np.arange(matrix.shape[0]), deleted))
+    index = build(matrix[live])
+    neighbors = np.full((matrix.shape[0], TOP_K), -1, dtype=np.int64)
+    scores = np.zeros((matrix.shape[0], TOP_K), dtype=np.float32)
+    neighbors[live] = np.where(index['neighbors'] >= 0, live[index['neighbors']], -1)
+    scores[live] = index['scores']
+    return neighbors, scores
+
+
+def assert_same_index(updated, neighbors, scores):
+    # Dense random vectors have no tied scores, so neighbour order is unique
+    np.testing.assert_array_equal(updated['neighbors'], neighbors)
+    np.testing.assert_allclose(updated['scores'], scores, rtol=0, atol=1e-6)
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(11)
+    return csr_matrix(rng.random((300, 24)).astype(np.float32))
+
+
+def test_added_jobs_match_rebuild(corpus):
+    index = build(corpus[:240])
+    updated = update_similarity_index(index, corpus, new_rows=np.arange(240, 300), batch_size=16)
+
+    assert_same_index(updated, *rebuild_live(corpus, []))
+    assert not updated['deleted'].any()
+
+
+def test_added_and_deleted_jobs_match_rebuild(corpus):
+    index = build(corpus[:250])
+    deleted = [3, 17, 120, 260]
+    updated = update_similarity_index(index, corpus, new_rows=np.arange(250, 300), deleted_rows=deleted,
+                                      batch_size=16)
+
+    assert_same_index(updated, *rebuild_live(corpus, deleted))
+    assert updated['deleted'][deleted].all()
+    assert not np.isin(updated['neighbors'], deleted).any()
+
+
+def test_successive_updates_match_rebuild(corpus):
+    index = build(corpus[:200])
+    index = update_similarity_index(index, corpus[:260], new_rows=np.arange(200, 260), deleted_rows=[5])
+    index = update_similarity_index(index, corpus, new_rows=np.arange(260, 300), deleted_rows=[5, 42, 270])
+
+    assert_same_index(index, *rebuild_live(corpus, [5, 42, 270]))
+
+
+def test_top_k_neighbors_excludes_self():
+    similarities = np.array([[1.0, 0.2, 0.9, 0.5],
+                             [0.2, 1.0, 0.1, 0.7]])
+    indices, scores = top_k_neighbors(similarities.copy(), 2, exclude=np.array([0, 1]))
+
+    np.testing.assert_array_equal(indices, [[2, 3], [3, 0]])
+    np.testing.assert_allclose(scores, [[0.9, 0.5], [0.7, 0.2]])
@@ -0,0 +1,123 @@
+"""
+Single-flight coalescing: shared results, error propagation and cancellation
+"""
+
+import asyncio
+import pytest
+
+from ml_singleflight import SingleFlight
+
+
+def counting(result=None, error=None, delay=0.01):
+    """Coroutine function that counts its calls, then returns result or raises error"""
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        if error is not None:
+            raise error
+        return result if result is not None else {'call': len(calls)}
+    return compute, calls
+
+
+def test_concurrent_callers_share_one_computation():
+    flights = SingleFlight()
+    compute, calls = counting()
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run('key', compute) for _ in range(5)))
+
+    outcomes = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert [coalesced for _, coalesced in outcomes] == [False, True, True, True, True]
+    assert all(result is outcomes[0][0] for result, _ in outcomes)
+    assert flights.stats() == {'in_flight': 0, 'leaders': 1, 'coalesced': 4, 'errors': 0, 'max_group': 5}
+
+
+def test_different_keys_compute_separately():
+    flights = SingleFlight()
+    compute, calls = counting()
+
+    async def scenario():
+        return await asyncio.gather(flights.run('a', compute), flights.run('b', compute))
+
+    outcomes = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert [coalesced for _, coalesced in outcomes] == [False, False]
+
+
+def test_results_are_not_cached():
+    flights = SingleFlight()
+    compute, calls = counting()
+
+    async def scenario():
+        first = await flights.run('key', compute)
+        second = await flights.run('key', compute)
+        return first, second
+
+    (first, first_coalesced), (second, second_coalesced) = asyncio.run(scenario())
+    assert len(calls) == 2
+    assert not first_coalesced and not second_coalesced
+    assert first != second
+
+
+def test_errors_reach_every_caller():
+    flights = SingleFlight()
+    compute, calls = counting(error=ValueError('boom'))
+
+    async def scenario():
+        return await asyncio.gather(*(flights.run('key', compute) for _ in range(3)), return_exceptions=True)
+
+    outcomes = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(isinstance(outcome, ValueError) for outcome in outcomes)
+    assert outcomes[0] is outcomes[1] is outcomes[2]
+    stats = flights.stats()
+    assert stats['errors'] == 1 and stats['in_flight'] == 0
+
+
+def test_key_is_free_after_an_error():
+    flights = SingleFlight()
+    failing, _ = counting(error=RuntimeError('down'))
+    working, calls = counting(result='ok')
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await flights.run('key', failing)
+        return await flights.run('key', working)
+
+    assert asyncio.run(scenario()) == ('ok', False)
+    assert len(calls) == 1
+
+
+def test_cancelled_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+    compute, calls = counting(result='done', delay=0.05)
+
+    async def scenario():
+        leader = asyncio.ensure_future(flights.run('key', compute))
+        follower = asyncio.ensure_future(flights.run('key', compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await follower
+
+    assert asyncio.run(scenario()) == ('done', True)
+    assert len(calls) == 1
+
+
+def test_recommendation_key_normalizes_invisible_differences(service):
+    jobs = []
+    base = {'skills': 'Python, React', 'experience': 'Senior', 'industry': 'Software',
+            'location': 'Remote', 'min_salary': 80000}
+    request = service.RecommendationRequest(user_preferences=base, top_n=5)
+    spaced = service.RecommendationRequest(
+        user_preferences={**base, 'skills': ' Python ,React ', 'location': 'REMOTE'}, top_n=5)
+    other_top_n = service.RecommendationRequest(user_preferences=base, top_n=10)
+
+    assert service.recommendation_key(request, jobs) == service.recommendation_key(spaced, jobs)
+    assert service.recommendation_key(request, jobs) != service.recommendation_key(other_top_n, jobs)
+    # A new job list never shares results computed for the old one
+    assert service.recommendation_key(request, jobs) != service.recommendation_key(request, [])
@@ -0,0 +1,109 @@
+"""
+Job cache snapshots: save/load round trips, version handling and engine restore
+"""
+
+import functools
+import json
+import os
+
+import numpy as np
+import pytest
+
+import ml_snapshot
+from job_index import JobIndex
+from ml_job_store import JobStore
+
+
+@pytest.fixture
+def store(service, jobs):
+    return JobStore.from_jobs([service.JobData(**job) for job in jobs])
+
+
+@pytest.fixture
+def indexed(service, store):
+    """Store indexed by a fresh (fallback mode) engine"""
+    engine = service.JobRecommendationEngine()
+    engine.index_jobs(store)
+    return engine, store
+
+
+def test_store_round_trip(tmp_path, store):
+    ml_snapshot.save_snapshot(store, None, 'fallback', directory=str(tmp_path))
+    meta, store_state, index_state, vectorizer = ml_snapshot.load_snapshot(str(tmp_path))
+
+    assert meta['jobs'] == len(store)
+    assert index_state is None and vectorizer is None
+    restored = JobStore.from_state(store_state)
+    assert list(restored) == list(store)
+
+
+def test_index_round_trip_is_memory_mapped(tmp_path, indexed):
+    engine, store = indexed
+    index = engine.job_index
+    ml_snapshot.save_snapshot(store, index, 'fallback', vectorizer=index.vectorizer, directory=str(tmp_path))
+    _, _, index_state, vectorizer = ml_snapshot.load_snapshot(str(tmp_path))
+
+    assert isinstance(index_state['codes']['industry'], np.memmap)
+    restored = JobIndex.from_state(index_state)
+    assert list(restored.columns) == list(index.columns)
+    for name, values in index.columns.items():
+        np.testing.assert_array_equal(restored.columns[name], values)
+    assert (restored.vectors != index.vectors).nnz == 0
+    assert restored.skill_vocabulary == index.skill_vocabulary
+    assert vectorizer.vocabulary_ == index.vectorizer.vocabulary_
+
+
+def test_new_snapshot_replaces_old(tmp_path, store):
+    first = ml_snapshot.save_snapshot(store, None, 'fallback', directory=str(tmp_path))
+    smaller = JobStore.from_jobs(list(store)[:10])
+    second = ml_snapshot.save_snapshot(smaller, None, 'fallback', directory=str(tmp_path))
+
+    assert not os.path.exists(first)
+    assert sorted(os.listdir(tmp_path)) == [ml_snapshot.CURRENT_FILE, os.path.basename(second)]
+    meta, store_state, _, _ = ml_snapshot.load_snapshot(str(tmp_path))
+    assert meta['jobs'] == 10
+    assert list(JobStore.from_state(store_state)) == list(store)[:10]
+
+
+def test_missing_or_other_version_is_ignored(tmp_path, store):
+    assert ml_snapshot.load_snapshot(str(tmp_path)) is None
+
+    path = ml_snapshot.save_snapshot(store, None, 'fallback', directory=str(tmp_path))
+    meta_path = os.path.join(path, 'meta.json')
+    with open(meta_path) as f:
+        meta = json.load(f)
+    meta['version'] = ml_snapshot.SNAPSHOT_VERSION + 1
+    with open(meta_path, 'w') as f:
+        json.dump(meta, f)
+    assert ml_snapshot.load_snapshot(str(tmp_path)) is None
+
+
+def test_unreadable_snapshot_is_ignored(tmp_path):
+    (tmp_path / ml_snapshot.CURRENT_FILE).write_text('v-missing')
+    assert ml_snapshot.load_snapshot(str(tmp_path)) is None
+
+
+def test_engine_restore_serves_same_recommendations(monkeypatch, tmp_path, service, indexed):
+    engine, store = indexed
+    monkeypatch.setattr(service, 'save_snapshot', functools.partial(ml_snapshot.save_snapshot, directory=str(tmp_path)))
+    monkeypatch.setattr(service, 'load_snapshot', functools.partial(ml_snapshot.load_snapshot, str(tmp_path)))
+    engine.snapshot_jobs(store)
+
+    restarted = service.JobRecommendationEngine()
+    restored = restarted.restore_snapshot()
+    assert list(restored) == list(store)
+    # The saved index is reused as-is rather than rebuilt from the jobs
+    assert isinstance(restarted.job_index.codes['industry'], np.memmap)
+
+    prefs = service.UserPreferences(skills='Python, SQL', experience='Senior', industry='Fintech',
+                                    location='Remote', min_salary=80000)
+    expected, _ = engine.recommend(prefs, store, top_n=10)
+    actual, _ = restarted.recommend(prefs, restored, top_n=10)
+    assert expected and actual == expected
+
+
+def test_snapshot_skipped_for_replaced_jobs(monkeypatch, tmp_path, service, indexed):
+    engine, store = indexed
+    monkeypatch.setattr(service, 'save_snapshot', functools.partial(ml_snapshot.save_snapshot, directory=str(tmp_path)))
+    engine.snapshot_jobs(JobStore.from_jobs(list(store)))
+    assert ml_snapshot.load_snapshot(str(tmp_path)) is None
@@ -0,0 +1,134 @@
+"""
+Trainer stage cache: keys, hits and misses, pruning, and the trainer's use of it
+"""
+
+import os
+import time
+
+import numpy as np
+import pytest
+
+from stage_cache import StageCache
+
+
+def stage_a():
+    return 'a'
+
+
+def stage_b():
+    return 'b'
+
+
+class Calls:
+    """Stage function that counts its calls and returns a fresh array each time"""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self):
+        self.count += 1
+        return {'values': np.arange(5) * self.count, 'call': self.count}
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return StageCache(str(tmp_path / 'cache'))
+
+
+def test_hit_returns_stored_artifact(cache):
+    fn = Calls()
+    first, key = cache.run('load', fn, params={'csv': 'abc'}, code=[stage_a])
+    second, second_key = cache.run('load', fn, params={'csv': 'abc'}, code=[stage_a])
+
+    assert fn.count == 1
+    assert second_key == key
+    assert second['call'] == 1
+    np.testing.assert_array_equal(second['values'], first['values'])
+    assert [r['hit'] for r in cache.results] == [False, True]
+
+
+@pytest.mark.parametrize('changed', [
+    {'params': {'csv': 'other'}},
+    {'params': {'csv': 'abc', 'extra': 1}},
+    {'inputs': ['upstream-changed']},
+    {'code': [stage_b]},
+])
+def test_changed_fingerprint_misses(cache, changed):
+    fn = Calls()
+    base = {'params': {'csv': 'abc'}, 'inputs': ['upstream'], 'code': [stage_a]}
+    cache.run('features', fn, **base)
+    output, _ = cache.run('features', fn, **{**base, **changed})
+
+    assert fn.count == 2
+    assert output['call'] == 2
+
+
+def test_param_order_does_not_matter(cache):
+    fn = Calls()
+    cache.run('salary', fn, params={'backend': 'forest', 'columns': ['a', 'b']})
+    cache.run('salary', fn, params={'columns': ['a', 'b'], 'backend': 'forest'})
+    assert fn.count == 1
+
+
+def test_disabled_cache_always_recomputes(tmp_path):
+    cache = StageCache(str(tmp_path / 'cache'), enabled=False)
+    fn = Calls()
+    cache.run('load', fn)
+    cache.run('load', fn)
+
+    assert fn.count == 2
+    assert not os.path.exists(tmp_path / 'cache')
+
+
+def test_unreadable_entry_is_recomputed(cache):
+    fn = Calls()
+    _, key = cache.run('load', fn)
+    with open(cache.path('load', key), 'wb') as f:
+        f.write(b'not a joblib file')
+
+    output, _ = cache.run('load', fn)
+    assert fn.count == 2 and output['call'] == 2
+    # The bad entry was overwritten with a readable one
+    assert cache.run('load', fn)[0]['call'] == 2
+
+
+def test_prune_keeps_most_recently_used(cache):
+    keys = []
+    for version in range(4):
+        _, key = cache.run('clusters', stage_a, params={'version': version})
+        keys.append(key)
+        # Distinct modification times, oldest first
+        os.utime(cache.path('clusters', key), (time.time() - 100 + version, time.time() - 100 + version))
+    _, other = cache.run('sketches', stage_b)
+    with open(os.path.join(cache.cache_dir, 'similarity-abc.joblib.tmp'), 'wb') as f:
+        f.write(b'interrupted')
+
+    # A hit refreshes the entry, so the oldest one survives as recently used
+    cache.run('clusters', stage_a, params={'version': 0})
+    assert cache.prune(keep=2) > 0
+
+    remaining = sorted(os.listdir(cache.cache_dir))
+    expected = sorted(os.path.basename(cache.path('clusters', k)) for k in (keys[0], keys[3]))
+    assert remaining == sorted(expected + [os.path.basename(cache.path('sketches', other))])
+
+
+def test_prune_on_disabled_cache_is_a_no_op(tmp_path):
+    assert StageCache(str(tmp_path / 'cache'), enabled=False).prune() == 0
+
+
+def test_trainer_ignores_the_unused_featurizer_flag(trained_model_dir, tmp_path, capsys):
+    from memory_efficient_trainer import main
+    args = ['--csv', str(trained_model_dir / 'dataset.csv'), '--output', str(tmp_path / 'model.pkl'),
+            '--cache-dir', str(tmp_path / 'cache'), '--cpus', '1', '--n-clusters', '5']
+    main(args)
+    capsys.readouterr()
+
+    main(args + ['--hash-features', '1024'])
+    out = capsys.readouterr().out
+    assert 'features: cache hit' in out
+    assert 'similarity: cache hit' in out
+
+    main(args + ['--featurizer', 'hashing', '--hash-features', '1024'])
+    out = capsys.readouterr().out
+    assert 'features: cache hit' not in out
+    assert 'load: cache hit' in out
@@ -0,0 +1,130 @@
+"""
+Trainer stage scheduler: concurrent stages match serial execution, shared memory-mapped inputs
+"""
+
+import os
+import hashlib
+
+import numpy as np
+import pytest
+from scipy.sparse import random as sparse_random
+
+from stage_cache import StageCache
+from stage_scheduler import StageScheduler, Stage, SharedArrays, load_shared
+
+
+# Stage functions live at module level so spawned workers can import them
+
+def dense_stage(shared, scale=1.0):
+    values = shared['values']
+    return {
+        'pid': os.getpid(),
+        'memmap': isinstance(values, np.memmap),
+        'digest': hashlib.sha256(np.ascontiguousarray(values).tobytes()).hexdigest(),
+        'meta': shared['values__meta'],
+        'result': values.sum(axis=0) * scale
+    }
+
+
+def sparse_stage(shared, n_jobs=1):
+    matrix = shared['matrix']
+    return {
+        'pid': os.getpid(),
+        # csr_matrix keeps the mapped arrays as read-only views; a copy would be writeable
+        'memmap': not matrix.data.flags.writeable and not matrix.indices.flags.writeable,
+        'n_jobs': n_jobs,
+        'result': np.asarray(matrix @ matrix.T.sum(axis=1)).ravel()
+    }
+
+
+def combine_stage(shared, dense, sparse):
+    return float(dense['result'].sum() + sparse['result'].sum())
+
+
+@pytest.fixture
+def inputs():
+    rng = np.random.default_rng(3)
+    values = rng.random((500, 8))
+    matrix = sparse_random(400, 60, density=0.05, format='csr', random_state=4, dtype=np.float32)
+    return values, matrix
+
+
+@pytest.fixture
+def shared(inputs):
+    values, matrix = inputs
+    shared = SharedArrays()
+    shared.put('values', values, categories=['a', 'b'])
+    shared.put_sparse('matrix', matrix)
+    yield shared
+    shared.cleanup()
+
+
+def serial(inputs):
+    """The stages called directly on the in-memory inputs"""
+    values, matrix = inputs
+    arrays = {'values': values, 'values__meta': {'categories': ['a', 'b']}, 'matrix': matrix}
+    dense = dense_stage(arrays, scale=2.0)
+    sparse = sparse_stage(arrays)
+    return dense, sparse, combine_stage(arrays, dense, sparse)
+
+
+def build(shared, cache, budget):
+    scheduler = StageScheduler(cache, shared, cpu_budget=budget)
+    scheduler.add(Stage('dense', dense_stage, kwargs={'scale': 2.0}, params={'scale': 2.0}))
+    scheduler.add(Stage('sparse', sparse_stage, cpus=2))
+    scheduler.add(Stage('combine', combine_stage, deps=['dense', 'sparse']))
+    return scheduler
+
+
+@pytest.mark.parametrize('budget', [1, 2])
+def test_results_match_serial_execution(tmp_path, capsys, inputs, shared, budget):
+    cache = StageCache(str(tmp_path / 'cache'), enabled=False)
+    outputs, keys = build(shared, cache, budget).run()
+    dense, sparse, combined = serial(inputs)
+
+    np.testing.assert_array_equal(outputs['dense']['result'], dense['result'])
+    np.testing.assert_allclose(outputs['sparse']['result'], sparse['result'], rtol=1e-6)
+    assert outputs['combine'] == pytest.approx(combined)
+    assert set(keys) == {'dense', 'sparse', 'combine'}
+
+    # The worker read the same bytes through a memory map, with the metadata attached
+    assert outputs['dense']['memmap'] and outputs['sparse']['memmap']
+    assert outputs['dense']['digest'] == dense['digest']
+    assert outputs['dense']['meta'] == {'categories': ['a', 'b']}
+
+    # The sparse stage asks for two CPUs but only gets what is left of the budget
+    assert outputs['sparse']['n_jobs'] == 1
+    in_process = {outputs[name]['pid'] == os.getpid() for name in ('dense', 'sparse')}
+    log = capsys.readouterr().out
+    if budget == 1:
+        assert in_process == {True}
+    else:
+        assert in_process == {False}
+        # Both independent stages were started before either finished
+        assert log.index('🚀 sparse') < log.index('✓ dense') and log.index('🚀 dense') < log.index('✓ sparse')
+
+
+def test_cached_stages_are_not_rerun(tmp_path, shared):
+    cache = StageCache(str(tmp_path / 'cache'))
+    first, _ = build(shared, cache, 2).run()
+    second, _ = build(shared, cache, 2).run()
+
+    assert [r['hit'] for r in cache.results] == [False] * 3 + [True] * 3
+    assert second['dense']['pid'] == first['dense']['pid']
+
+
+def test_unknown_dependency_is_rejected(tmp_path, shared):
+    scheduler = StageScheduler(StageCache(str(tmp_path), enabled=False), shared, cpu_budget=1)
+    scheduler.add(Stage('combine', combine_stage, deps=['dense', 'sparse']))
+    with pytest.raises(ValueError, match='unknown stage'):
+        scheduler.run()
+
+
+def test_shared_arrays_round_trip(shared, inputs):
+    values, matrix = inputs
+    loaded = load_shared(shared.spec())
+
+    np.testing.assert_array_equal(loaded['values'], values)
+    assert (loaded['matrix'] != matrix).nnz == 0
+    with pytest.raises(ValueError):
+        loaded['values'][0, 0] = 1.0  # read-only
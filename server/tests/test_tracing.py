@@ -0,0 +1,159 @@
+"""
+Request tracing: Server-Timing headers, span names, sampling and the JSONL exporter
+"""
+
+import json
+import time
+import logging
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from ml_tracing import TracingMiddleware, JsonlTraceExporter, Trace, span, record_span
+
+TRACEPARENT = '00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01'
+
+
+class RecordingExporter:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+def traced_app(exporter, sample_rate=0.0, forced_per_sec=0):
+    app = FastAPI()
+
+    @app.get('/work')
+    async def work():
+        record_span('parse', time.time_ns())
+        with span('score', jobs=3):
+            with span('sort step'):
+                pass
+        return {'ok': True}
+
+    @app.get('/fail')
+    async def fail():
+        with span('score'):
+            raise RuntimeError('boom')
+
+    return TracingMiddleware(app, sample_rate=sample_rate, exporter=exporter, forced_per_sec=forced_per_sec)
+
+
+def timing_entries(response):
+    return [entry.split(';')[0] for entry in response.headers['server-timing'].split(', ')]
+
+
+def test_server_timing_lists_spans_then_total():
+    exporter = RecordingExporter()
+    response = TestClient(traced_app(exporter)).get('/work')
+
+    assert response.status_code == 200
+    # Completion order; names are made header-safe
+    assert timing_entries(response) == ['parse', 'sort_step', 'score', 'total']
+    for entry in response.headers['server-timing'].split(', '):
+        assert float(entry.split(';dur=')[1]) >= 0
+
+
+def test_sampling_off_exports_nothing():
+    exporter = RecordingExporter()
+    client = TestClient(traced_app(exporter, sample_rate=0.0))
+    for _ in range(5):
+        client.get('/work')
+    assert exporter.traces == []
+
+
+def test_sampled_trace_has_nested_spans():
+    exporter = RecordingExporter()
+    TestClient(traced_app(exporter, sample_rate=1.0)).get('/work')
+
+    (trace,) = exporter.traces
+    spans = {s.name: s for s in trace.spans}
+    assert set(spans) == {'parse', 'sort step', 'score', 'GET /work'}
+    root = spans['GET /work']
+    assert trace.root is root and root.attributes['http.status_code'] == 200
+    assert spans['score'].parent_id == root.span_id
+    assert spans['sort step'].parent_id == spans['score'].span_id
+    assert spans['score'].attributes == {'jobs': 3}
+
+    otlp_spans = trace.to_otlp()['resourceSpans'][0]['scopeSpans'][0]['spans']
+    assert [s['kind'] for s in otlp_spans if s['name'] == 'GET /work'] == [2]
+
+
+def test_errors_are_recorded_on_spans():
+    exporter = RecordingExporter()
+    client = TestClient(traced_app(exporter, sample_rate=1.0), raise_server_exceptions=False)
+    assert client.get('/fail').status_code == 500
+
+    spans = {s.name: s for s in exporter.traces[0].spans}
+    assert spans['score'].attributes['error'] == 'RuntimeError: boom'
+
+
+def test_incoming_sampled_flag_is_rate_limited():
+    exporter = RecordingExporter()
+    client = TestClient(traced_app(exporter, sample_rate=0.0, forced_per_sec=2))
+    for _ in range(6):
+        client.get('/work', headers={'traceparent': TRACEPARENT})
+
+    # Burst of two, refilled at 2/s: far fewer than the six requests
+    assert 2 <= len(exporter.traces) < 6
+    trace = exporter.traces[0]
+    assert trace.trace_id == '0af7651916cd43dd8448eb211c80319c'
+    assert trace.root.parent_id == 'b7ad6b7169203331'
+
+
+def test_incoming_sampled_flag_ignored_without_forcing():
+    exporter = RecordingExporter()
+    client = TestClient(traced_app(exporter, sample_rate=0.0, forced_per_sec=0))
+    client.get('/work', headers={'traceparent': TRACEPARENT})
+    assert exporter.traces == []
+
+
+def test_invalid_traceparent_starts_a_new_trace():
+    trace = Trace.from_headers({b'traceparent': b'not-a-trace'}, sample_rate=0.0)
+    assert len(trace.trace_id) == 32 and trace.parent_id is None and not trace.sampled
+
+
+def test_spans_outside_requests_are_no_ops():
+    with span('offline') as s:
+        assert s is None
+    record_span('offline', 0)
+
+
+def test_exporter_writes_and_rotates(tmp_path):
+    path = str(tmp_path / 'traces.jsonl')
+    exporter = JsonlTraceExporter(path, max_bytes=1500)
+    client = TestClient(traced_app(exporter, sample_rate=1.0))
+    for _ in range(10):
+        client.get('/work')
+    exporter.flush()
+
+    with open(path) as f:
+        lines = [json.loads(line) for line in f]
+    assert lines and all(line['resourceSpans'][0]['scopeSpans'][0]['spans'] for line in lines)
+    assert (tmp_path / 'traces.jsonl.1').exists()
+
+
+def test_exporter_failure_is_logged(tmp_path, caplog, capsys):
+    class Broken:
+        def to_otlp(self, service_name):
+            raise ValueError('cannot encode')
+
+    exporter = JsonlTraceExporter(str(tmp_path / 'traces.jsonl'))
+    with caplog.at_level(logging.ERROR, logger='ml_tracing'):
+        exporter.export(Broken())
+        exporter.flush()
+
+    assert 'Trace export failed: cannot encode' in caplog.text
+    assert capsys.readouterr().out == ''
+
+
+def test_service_reports_request_spans(client):
+    response = client.post('/api/recommend', json={
+        'user_preferences': {'skills': 'Python, React', 'experience': 'Mid-level'}, 'top_n': 3})
+
+    assert response.status_code == 200
+    names = timing_entries(response)
+    assert names[0] == 'parse' and names[-1] == 'total'
+    assert {'queue', 'encode'} <= set(names)
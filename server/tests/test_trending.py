@@ -0,0 +1,91 @@
+"""
+Materialized trending order against a pandas ranking recomputed from scratch
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from job_recommendation_model import JobRecommendationAPI, TrendingRanking
+
+INDUSTRIES = ['Software', 'Finance', 'Healthcare', 'Retail', 'Energy']
+
+
+def reference_top(salaries, industries, live, top_n):
+    """trend_score over the live jobs as the original pandas version computed it, best first"""
+    df = pd.DataFrame({'Salary': salaries, 'Industry': industries})[live]
+    popularity = df['Industry'].map(df['Industry'].value_counts())
+    salary_range = (df['Salary'].max() - df['Salary'].min()) or 1.0
+    popularity_range = (popularity.max() - popularity.min()) or 1.0
+    df['trend_score'] = ((df['Salary'] - df['Salary'].min()) / salary_range * 0.7
+                         + (popularity - popularity.min()) / popularity_range * 0.3)
+    # Ties keep sample order
+    ranked = df.assign(position=df.index).sort_values(['trend_score', 'position'], ascending=[False, True])
+    return ranked['position'].to_numpy()[:top_n], ranked['trend_score'].to_numpy()[:top_n]
+
+
+def assert_matches(ranking, salaries, industries, live, top_n):
+    positions, scores = ranking.top(top_n)
+    expected_positions, expected_scores = reference_top(salaries, industries, live, top_n)
+    np.testing.assert_array_equal(positions, expected_positions)
+    np.testing.assert_allclose(scores, expected_scores, rtol=1e-12)
+
+
+def random_jobs(rng, n):
+    # Salaries rounded to thousands, so equal trend scores occur
+    return (rng.integers(30, 200, n) * 1000).astype(np.float64), rng.choice(INDUSTRIES, n, p=[.4, .25, .2, .1, .05])
+
+
+@pytest.mark.parametrize('seed', [0, 1, 2])
+def test_add_and_remove_match_recompute(seed):
+    rng = np.random.default_rng(seed)
+    salaries, industries = random_jobs(rng, 300)
+    live = np.ones(len(salaries), dtype=bool)
+    ranking = TrendingRanking(salaries, industries)
+    assert_matches(ranking, salaries, industries, live, 25)
+
+    for step in range(12):
+        if step % 3 == 2:
+            new_salaries, new_industries = random_jobs(rng, int(rng.integers(1, 40)))
+            ranking.add(new_salaries, new_industries)
+            salaries = np.concatenate([salaries, new_salaries])
+            industries = np.concatenate([industries, new_industries])
+            live = np.concatenate([live, np.ones(len(new_salaries), dtype=bool)])
+        else:
+            # Often includes the current leaders, which moves the normalisation bounds
+            leaders, _ = ranking.top(5)
+            removed = np.concatenate([leaders[:2], rng.choice(np.flatnonzero(live), 20, replace=False)])
+            ranking.remove(removed)
+            live[removed] = False
+        assert_matches(ranking, salaries, industries, live, int(rng.integers(1, 60)))
+
+
+def test_emptied_industry_and_single_industry():
+    salaries = np.array([100.0, 90, 80, 70, 60])
+    industries = np.array(['Retail', 'Software', 'Software', 'Software', 'Finance'])
+    live = np.ones(5, dtype=bool)
+    ranking = TrendingRanking(salaries, industries)
+
+    ranking.remove([0, 4])
+    live[[0, 4]] = False
+    # One industry left: its popularity range is zero
+    assert_matches(ranking, salaries, industries, live, 5)
+
+    ranking.remove([1, 2, 3])
+    assert [len(values) for values in ranking.top(5)] == [0, 0]
+
+
+def test_api_trending_after_updates(model_path):
+    api = JobRecommendationAPI(model_path)
+    df_sample = api.model_data['df_sample']
+    api.remove_jobs(np.arange(0, len(df_sample), 7))
+    new_jobs = df_sample.iloc[:30].astype({col: str for col in ['Experience Level', 'Industry', 'Location']})
+    api.add_jobs(new_jobs.assign(Salary=new_jobs['Salary'] + 50000).drop(columns=['job_text']).to_dict('records'))
+
+    df_sample = api.model_data['df_sample']
+    expected_positions, expected_scores = reference_top(
+        df_sample['Salary'].to_numpy(np.float64), df_sample['Industry'].astype(str).to_numpy(), api.live, 20)
+    trending = api.get_trending_jobs(top_n=20)
+
+    assert [job['job_title'] for job in trending] == df_sample['Job Title'].iloc[expected_positions].tolist()
+    np.testing.assert_allclose([job['trend_score'] for job in trending], expected_scores, rtol=1e-6)